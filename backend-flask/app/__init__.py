@@ -10,6 +10,9 @@ load_dotenv()
 # Importer les instances d'extensions partagées (créées dans extensions.py)
 from .extensions import mongo, cors, bcrypt 
 from .utils.audit_logger import log_action 
+from .utils.indexes import ensure_indexes
+from .utils.json_provider import MongoJSONProvider
+from .utils.compression import init_compression
 
 
 # --- Application Factory ---
@@ -29,6 +32,16 @@ def create_app():
     app.config['UPLOAD_FOLDER_CARS'] = os.path.join(app.static_folder, 'uploads', 'cars')
     app.config['ALLOWED_IMAGE_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  
+    # Variantes redimensionnées (WebP + JPEG) générées en arrière-plan par un pool de threads borné
+    app.config['IMAGE_VARIANT_WIDTHS'] = tuple(int(w) for w in os.environ.get('IMAGE_VARIANT_WIDTHS', '320,960').split(','))
+    app.config['IMAGE_PIPELINE_WORKERS'] = int(os.environ.get('IMAGE_PIPELINE_WORKERS', 2))
+    app.config['IMAGE_PIPELINE_MAX_PENDING'] = int(os.environ.get('IMAGE_PIPELINE_MAX_PENDING', 32))
+    app.config['IMAGE_PIPELINE_SYNC'] = os.environ.get('IMAGE_PIPELINE_SYNC', 'False').lower() == 'true'
+    # Service des images : '' (Flask), 'x-accel-redirect' (nginx, location interne MEDIA_X_ACCEL_PREFIX) ou 'x-sendfile'
+    app.config['MEDIA_SENDFILE'] = os.environ.get('MEDIA_SENDFILE', '').lower()
+    app.config['MEDIA_X_ACCEL_PREFIX'] = os.environ.get('MEDIA_X_ACCEL_PREFIX', '/_protected/uploads/cars/')
+    # Durée de cache des anciennes images (noms non dérivés du contenu) ; les autres sont immuables
+    app.config['MEDIA_DEFAULT_MAX_AGE'] = int(os.environ.get('MEDIA_DEFAULT_MAX_AGE', 3600))
 
     # Configuration de la session
     app.config['SESSION_COOKIE_SAMESITE'] = os.environ.get('SESSION_COOKIE_SAMESITE', 'Lax')
@@ -36,12 +49,40 @@ def create_app():
     app.config['SESSION_COOKIE_HTTPONLY'] = True
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=int(os.environ.get('SESSION_LIFETIME_DAYS', 7)))
 
+    # Tarification : multiplicateur appliqué au tarif journalier les samedis et dimanches
+    app.config['PRICING_WEEKEND_MULTIPLIER'] = float(os.environ.get('PRICING_WEEKEND_MULTIPLIER', 1.0))
+
+    # Durée (secondes) de mise en cache des statistiques de flotte par fenêtre ; 0 désactive le cache
+    app.config['ANALYTICS_CACHE_TTL'] = int(os.environ.get('ANALYTICS_CACHE_TTL', 300))
+
+    # Sérialisation JSON des réponses : 'auto' (orjson s'il est installé), 'orjson' ou 'json'
+    app.config['JSON_BACKEND'] = os.environ.get('JSON_BACKEND', 'auto').lower()
+
+    # Compression gzip / brotli des réponses (négociée via Accept-Encoding) ; à désactiver si le frontal compresse déjà
+    app.config['COMPRESSION_ENABLED'] = os.environ.get('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    app.config['COMPRESSION_MIN_SIZE'] = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    app.config['COMPRESSION_LEVEL'] = int(os.environ.get('COMPRESSION_LEVEL', 6))
+    app.config['COMPRESSION_BROTLI_QUALITY'] = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+    # Création automatique des index MongoDB au démarrage
+    app.config['MONGO_ENSURE_INDEXES'] = os.environ.get('MONGO_ENSURE_INDEXES', 'True').lower() == 'true'
+
 
     # --- Initialisation des Extensions ---
     mongo.init_app(app) 
+    # Après mongo.init_app, qui installe son propre fournisseur JSON (format étendu BSON)
+    app.json = MongoJSONProvider(app)
+    init_compression(app)
     bcrypt.init_app(app) 
     cors.init_app(app, resources={r"/api/*": {"origins": os.environ.get('CORS_ORIGINS', '*')}}, supports_credentials=True) 
 
+    # Créer les index déclarés (idempotent) pour que les requêtes des routes restent indexées
+    if app.config['MONGO_ENSURE_INDEXES']:
+        try:
+            ensure_indexes(app)
+        except Exception as e:
+            app.logger.error(f"Error ensuring MongoDB indexes: {e}")
+
     # Créer le dossier d'upload s'il n'existe pas déjà
     if not os.path.exists(app.config['UPLOAD_FOLDER_CARS']):
         try:
@@ -80,6 +121,17 @@ def create_app():
     from .routes.manager_dashboard_routes import manager_dashboard_bp 
     app.register_blueprint(manager_dashboard_bp) 
 
+    from .routes.analytics_routes import analytics_bp
+    app.register_blueprint(analytics_bp)
+
+    from .routes.media import media_bp
+    app.register_blueprint(media_bp)
+
+
+    # --- Commandes CLI (flask ledger ...) ---
+    from .commands import register_commands
+    register_commands(app)
+
 
     # --- Routes de Test (Utiles pour le développement) ---
     @app.route('/api/ping')
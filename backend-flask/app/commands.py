@@ -0,0 +1,355 @@
+# app/commands.py
+import os
+import re
+import time
+import click
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import AppGroup
+from pymongo import UpdateOne
+
+from .extensions import mongo
+from .utils.booking_ledger import SLOT_HOLDING_STATUSES, BookingConflictError, sync_slots
+from .utils.helpers import parse_datetime
+from .utils.indexes import apply_indexes, check_indexes, explain_route_queries
+from .utils.client_stats import rebuild_client_stats
+from .utils.image_store import TEMP_UPLOAD_PREFIX, image_refs_collection, upload_folder, url_for_key, key_for_url
+from .utils.search import car_search_keys, client_search_fields, CLIENT_SEARCH_SOURCE_FIELDS
+from .utils.car_import import IMPORT_FORMATS, DEFAULT_IMPORT_CHUNK_SIZE, CarImporter, detect_format, iter_rows
+from .utils.versions import bump_versions
+
+# --- flask ledger ... (registre des jours réservés) ---
+ledger_cli = AppGroup('ledger', help="Manage the per-day booking slot ledger.")
+
+@ledger_cli.command('rebuild')
+def rebuild_ledger():
+    """Reconstruit le registre des jours réservés à partir des réservations existantes."""
+    synced, conflicts, invalid = 0, 0, 0
+    reservations_cursor = mongo.db.reservations.find(
+        {'status': {'$in': list(SLOT_HOLDING_STATUSES)}},
+        {'carId': 1, 'startDate': 1, 'endDate': 1, 'reservationNumber': 1}
+    ).sort('reservationDate', 1)
+
+    for res in reservations_cursor:
+        try:
+            sync_slots(res['_id'], res.get('carId'), res.get('startDate'), res.get('endDate'))
+            synced += 1
+        except BookingConflictError as bce:
+            conflicts += 1
+            click.echo(f"Conflict for reservation {res.get('reservationNumber')}: {bce}")
+        except (ValueError, TypeError) as e:
+            invalid += 1
+            click.echo(f"Invalid dates for reservation {res.get('reservationNumber')}: {e}")
+
+    # Le registre alimente /api/cars/available, validé par la version des réservations
+    bump_versions('reservations')
+    click.echo(f"Ledger rebuilt: {synced} reservation(s) synced, {conflicts} conflict(s), {invalid} invalid.")
+
+
+# --- flask migrate ... (migrations de données) ---
+migrate_cli = AppGroup('migrate', help="Run resumable data migrations.")
+
+# Champs date des réservations à stocker en BSON Date
+RESERVATION_DATE_FIELDS = ['startDate', 'endDate', 'actualPickupDate', 'actualReturnDate',
+                           'reservationDate', 'lastModifiedAt', 'paymentDetails.transactionDate']
+RESERVATION_DATES_MIGRATION_ID = 'reservation_dates_to_bson'
+
+def _get_field(doc, path):
+    """Lit un champ éventuellement imbriqué ('a.b') dans un document."""
+    for part in path.split('.'):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+@migrate_cli.command('reservation-dates')
+@click.option('--batch-size', default=1000, show_default=True, help="Number of reservations per bulk_write.")
+@click.option('--restart', is_flag=True, help="Ignore the saved checkpoint and scan from the beginning.")
+def migrate_reservation_dates(batch_size, restart):
+    """Convertit les dates des réservations stockées en chaînes ISO en BSON Date natives."""
+    reservations = mongo.db.reservations
+    migrations = mongo.db.migrations
+
+    # Reprise : on repart du dernier _id traité, enregistré après chaque lot
+    checkpoint = None if restart else migrations.find_one({'_id': RESERVATION_DATES_MIGRATION_ID})
+    last_id = checkpoint.get('lastId') if checkpoint else None
+    if last_id:
+        click.echo(f"Resuming after reservation {last_id}.")
+
+    projection = {field: 1 for field in RESERVATION_DATE_FIELDS}
+    scanned, updated, invalid = 0, 0, 0
+    while True:
+        query = {'_id': {'$gt': last_id}} if last_id else {}
+        batch = list(reservations.find(query, projection).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            updates = {}
+            for field in RESERVATION_DATE_FIELDS:
+                value = _get_field(doc, field)
+                if not isinstance(value, str):
+                    continue
+                try:
+                    updates[field] = parse_datetime(value)
+                except ValueError:
+                    invalid += 1
+                    click.echo(f"Invalid {field} '{value}' on reservation {doc['_id']}, left unchanged.")
+            if updates:
+                operations.append(UpdateOne({'_id': doc['_id']}, {'$set': updates}))
+
+        if operations:
+            reservations.bulk_write(operations, ordered=False)
+            updated += len(operations)
+
+        scanned += len(batch)
+        last_id = batch[-1]['_id']
+        migrations.update_one(
+            {'_id': RESERVATION_DATES_MIGRATION_ID},
+            {'$set': {'lastId': last_id, 'updatedAt': datetime.utcnow()}},
+            upsert=True
+        )
+        click.echo(f"Processed {scanned} reservation(s), {updated} updated.")
+
+    migrations.update_one(
+        {'_id': RESERVATION_DATES_MIGRATION_ID},
+        {'$set': {'completedAt': datetime.utcnow()}},
+        upsert=True
+    )
+    if updated:
+        bump_versions('reservations')
+    click.echo(f"Migration done: {scanned} scanned, {updated} updated, {invalid} invalid value(s).")
+
+
+# --- flask images ... (fichiers d'images des voitures) ---
+images_cli = AppGroup('images', help="Maintain uploaded car image files.")
+
+# Variantes générées par le pipeline d'images : '<nom de l'original>_w<largeur>.<webp|jpeg>'
+VARIANT_FILE_RE = re.compile(r'^(?P<base>.+)_w\d+\.(?:webp|jpeg)$')
+
+def _iter_upload_files(root):
+    """Parcourt récursivement le dossier avec os.scandir, sans construire la liste complète des fichiers."""
+    directories = [root]
+    while directories:
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _owner_urls(key, extensions):
+    """URLs d'image de voiture qui rendent ce fichier utile : lui-même, ou son original pour une variante."""
+    directory, _, name = key.rpartition('/')
+    match = VARIANT_FILE_RE.match(name)
+    if not match:
+        return [url_for_key(key)]
+    prefix = f"{directory}/" if directory else ''
+    return [url_for_key(f"{prefix}{match['base']}.{extension}") for extension in extensions]
+
+@images_cli.command('gc')
+@click.option('--dry-run', is_flag=True, help="Report orphaned files without deleting them.")
+@click.option('--batch-size', default=1000, show_default=True, help="Number of files checked per database query.")
+@click.option('--min-age', default=3600, show_default=True, help="Skip files modified less than this many seconds ago.")
+def gc_images(dry_run, batch_size, min_age):
+    """
+    Supprime les fichiers de UPLOAD_FOLDER_CARS qu'aucune voiture ne référence (à planifier, ex. cron quotidien).
+
+    Le dossier est parcouru en flux et comparé par lots aux imageUrl des voitures (une requête projetée
+    par lot) : la mémoire utilisée ne dépend que de --batch-size, pas du nombre de fichiers.
+    """
+    root = upload_folder()
+    if not os.path.isdir(root):
+        click.echo(f"Upload folder {root} does not exist, nothing to do.")
+        return
+
+    extensions = sorted(current_app.config.get('ALLOWED_IMAGE_EXTENSIONS', {'png', 'jpg', 'jpeg', 'gif'}))
+    # Les fichiers récents peuvent appartenir à un upload dont la voiture n'est pas encore écrite
+    cutoff = time.time() - min_age
+    cutoff_date = datetime.utcnow() - timedelta(seconds=min_age)
+    scanned, recent, orphans, orphan_bytes, reclaimed_bytes, errors = 0, 0, 0, 0, 0, 0
+
+    for batch in _batched(_iter_upload_files(root), batch_size):
+        candidates = []
+        for entry in batch:
+            scanned += 1
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > cutoff:
+                recent += 1
+                continue
+            key = os.path.relpath(entry.path, root).replace(os.sep, '/')
+            # Fichier temporaire d'un upload ou d'une variante interrompus : toujours orphelin
+            owner_urls = [] if entry.name.startswith(TEMP_UPLOAD_PREFIX) else _owner_urls(key, extensions)
+            candidates.append((entry.path, key, stat.st_size, owner_urls))
+
+        urls = list({url for _, _, _, owner_urls in candidates for url in owner_urls})
+        referenced = {car['imageUrl'] for car in mongo.db.cars.find({'imageUrl': {'$in': urls}}, {'imageUrl': 1, '_id': 0})}
+        # Contenu ancien tout juste ré-uploadé (store_upload a réutilisé le fichier existant)
+        referenced.update(url_for_key(ref['_id']) for ref in image_refs_collection().find(
+            {'_id': {'$in': [key_for_url(url) for url in urls]}, 'lastAcquiredAt': {'$gt': cutoff_date}}, {'_id': 1}
+        ))
+
+        for path, key, size, owner_urls in candidates:
+            if any(url in referenced for url in owner_urls):
+                continue
+            orphans += 1
+            orphan_bytes += size
+            if dry_run:
+                click.echo(f"Orphan: {key} ({size} bytes)")
+                continue
+            try:
+                os.remove(path)
+                reclaimed_bytes += size
+            except OSError as e:
+                errors += 1
+                click.echo(f"Could not delete {key}: {e}")
+                continue
+            # Compteur d'un original orphelin (crash entre l'upload et l'écriture de la voiture)
+            if owner_urls == [url_for_key(key)]:
+                image_refs_collection().delete_one({'_id': key})
+
+        click.echo(f"Scanned {scanned} file(s), {orphans} orphan(s) so far.")
+
+    click.echo(
+        f"{'Dry run: ' if dry_run else ''}{scanned} file(s) scanned, {recent} skipped as recent, "
+        f"{orphans} orphan(s) totalling {orphan_bytes} bytes ({orphan_bytes / (1024 * 1024):.1f} MB), "
+        f"{reclaimed_bytes} bytes reclaimed, {errors} error(s)."
+    )
+
+
+# --- flask search ... (clés de recherche normalisées) ---
+search_cli = AppGroup('search', help="Maintain normalized search fields.")
+
+def _backfill(collection, projection, compute_fields, batch_size):
+    """Recalcule des champs dérivés par lots (ordre _id, un bulk_write par lot) ; renvoie (parcourus, modifiés)."""
+    scanned, updated, last_id = 0, 0, None
+    while True:
+        query = {'_id': {'$gt': last_id}} if last_id else {}
+        batch = list(collection.find(query, projection).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        operations = [UpdateOne({'_id': doc['_id']}, {'$set': compute_fields(doc)}) for doc in batch]
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+        scanned += len(batch)
+        last_id = batch[-1]['_id']
+        click.echo(f"Processed {scanned} document(s), {updated} updated.")
+    return scanned, updated
+
+@search_cli.command('backfill-cars')
+@click.option('--batch-size', default=1000, show_default=True, help="Number of cars per bulk_write.")
+def backfill_car_search_keys(batch_size):
+    """Calcule searchKeys pour toutes les voitures (après l'ajout de la recherche ou un import direct en base)."""
+    scanned, updated = _backfill(
+        mongo.db.cars, {'make': 1, 'model': 1, 'licensePlate': 1, 'vin': 1},
+        lambda car: {'searchKeys': car_search_keys(car)}, batch_size
+    )
+    if updated:
+        bump_versions('cars')
+    click.echo(f"Car search keys backfilled: {scanned} scanned, {updated} updated.")
+
+@search_cli.command('backfill-clients')
+@click.option('--batch-size', default=1000, show_default=True, help="Number of clients per bulk_write.")
+def backfill_client_search_fields(batch_size):
+    """Calcule phoneDigits, cinUpper, emailLower et nameKeys pour tous les clients."""
+    scanned, updated = _backfill(
+        mongo.db.clients, {field: 1 for field in CLIENT_SEARCH_SOURCE_FIELDS}, client_search_fields, batch_size
+    )
+    if updated:
+        bump_versions('clients')
+    click.echo(f"Client search fields backfilled: {scanned} scanned, {updated} updated.")
+
+
+# --- flask cars ... (flotte) ---
+cars_cli = AppGroup('cars', help="Manage the car fleet.")
+
+@cars_cli.command('import')
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', 'import_format', type=click.Choice(IMPORT_FORMATS), help="Defaults to the file extension.")
+@click.option('--chunk-size', default=DEFAULT_IMPORT_CHUNK_SIZE, show_default=True, help="Number of cars per insert_many.")
+@click.option('--dry-run', is_flag=True, help="Validate the rows without inserting anything.")
+def import_cars(file, import_format, chunk_size, dry_run):
+    """Importe des voitures depuis un fichier CSV ou NDJSON ('-' pour l'entrée standard)."""
+    import_format = import_format or detect_format(file.name)
+    if import_format is None:
+        raise click.UsageError("Cannot infer the format from the file name; use --format.")
+
+    report = CarImporter(chunk_size=chunk_size, dry_run=dry_run, user_username='cli').run(iter_rows(file, import_format))
+    if report['created'] and not dry_run:
+        bump_versions('cars')
+    for error in report['errors']:
+        click.echo(f"Row {error['row']}: {error['message']}")
+    if report['readError']:
+        click.echo(f"Import stopped: {report['readError']}")
+    verb = "would be imported" if dry_run else "imported"
+    click.echo(f"{report['created']} car(s) {verb}, {report['failed']} row(s) rejected.")
+
+
+# --- flask clients ... ---
+clients_cli = AppGroup('clients', help="Maintain client data.")
+
+@clients_cli.command('rebuild-stats')
+@click.option('--batch-size', default=1000, show_default=True, help="Number of clients per bulk_write.")
+def rebuild_stats(batch_size):
+    """Recalcule les compteurs des clients (stats) depuis les réservations."""
+    updated = rebuild_client_stats(batch_size)
+    if updated:
+        bump_versions('clients')
+    click.echo(f"Client stats rebuilt: {updated} client(s) updated.")
+
+
+# --- flask indexes ... (index déclarés dans utils/indexes.py) ---
+indexes_cli = AppGroup('indexes', help="Apply and verify the declared MongoDB indexes.")
+
+@indexes_cli.command('apply')
+def apply_declared_indexes():
+    """Crée les index déclarés manquants (idempotent)."""
+    failures = apply_indexes()
+    for collection_name, name, error in failures:
+        click.echo(f"FAILED {collection_name}.{name}: {error}")
+    click.echo(f"Indexes applied, {len(failures)} failure(s).")
+    if failures:
+        raise SystemExit(1)
+
+@indexes_cli.command('check')
+def check_declared_indexes():
+    """Signale les index manquants, différents des déclarations, non déclarés ou jamais utilisés."""
+    report = check_indexes()
+    for category, entries in report.items():
+        for entry in entries:
+            click.echo(f"{category:10s} {entry}")
+    click.echo(", ".join(f"{len(entries)} {category}" for category, entries in report.items()) + ".")
+    if report['missing'] or report['mismatched']:
+        raise SystemExit(1)
+
+@indexes_cli.command('explain')
+def explain_queries():
+    """Vérifie que chaque requête représentative des routes est servie par un index (aucun COLLSCAN)."""
+    results = explain_route_queries()
+    for label, stages, indexed in results:
+        click.echo(f"{'OK  ' if indexed else 'FAIL'} {label}: {' <- '.join(stages)}")
+    failed = sum(1 for _, _, indexed in results if not indexed)
+    click.echo(f"{len(results) - failed}/{len(results)} queries use an index.")
+    if failed:
+        raise SystemExit(1)
+
+
+def register_commands(app):
+    """Enregistre les commandes CLI de l'application (flask <groupe> <commande>)."""
+    app.cli.add_command(ledger_cli)
+    app.cli.add_command(migrate_cli)
+    app.cli.add_command(images_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(cars_cli)
+    app.cli.add_command(indexes_cli)
+    app.cli.add_command(clients_cli)
@@ -0,0 +1,172 @@
+from flask import Blueprint, jsonify, current_app, request
+from app.extensions import mongo
+from ..utils.helpers import login_required, parse_datetime
+from ..utils.ttl_cache import TTLCache
+from datetime import datetime, timedelta
+
+analytics_bp = Blueprint('analytics_bp', __name__, url_prefix='/api/manager/analytics')
+
+# Regroupement par période : format commun à $dateToString (MongoDB) et strftime (Python)
+PERIOD_FORMATS = {'day': '%Y-%m-%d', 'week': '%G-W%V', 'month': '%Y-%m'}
+DEFAULT_PERIOD = 'month'
+DEFAULT_WINDOW_DAYS = 30
+MAX_WINDOW_DAYS = 731
+
+# Résultats mis en cache par fenêtre (début, fin, période) pendant ANALYTICS_CACHE_TTL secondes
+_fleet_cache = TTLCache(max_entries=64)
+
+
+def _parse_window(args):
+    """Fenêtre [start, end] (jours entiers, fin incluse) et période demandées ; lève ValueError si invalides."""
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    end = parse_datetime(args.get('end')) or today
+    start = parse_datetime(args.get('start')) or end - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    start = datetime.combine(start.date(), datetime.min.time())
+    end = datetime.combine(end.date(), datetime.min.time())
+    if end < start:
+        raise ValueError("End date cannot be before start date.")
+    if (end - start).days + 1 > MAX_WINDOW_DAYS:
+        raise ValueError(f"The window cannot exceed {MAX_WINDOW_DAYS} days.")
+    period = args.get('period', DEFAULT_PERIOD)
+    if period not in PERIOD_FORMATS:
+        raise ValueError(f"Invalid period. Allowed: {', '.join(PERIOD_FORMATS)}.")
+    return start, end, period
+
+
+def _days_per_period(start, end, period_format):
+    """Nombre de jours de la fenêtre dans chaque période, dans l'ordre chronologique."""
+    days = {}
+    for offset in range((end - start).days + 1):
+        label = (start + timedelta(days=offset)).strftime(period_format)
+        days[label] = days.get(label, 0) + 1
+    return days
+
+
+def _rented_days_by_car(start, end, period_format):
+    """Jours loués par (voiture, période), comptés dans le registre des jours réservés (un document par jour)."""
+    pipeline = [
+        {"$match": {"day": {"$gte": start, "$lte": end}}},
+        # Seuls les champs de l'index day_carId sont lus : la requête est couverte par l'index
+        {"$project": {"_id": 0, "carId": 1, "day": 1}},
+        {"$group": {
+            "_id": {"carId": "$carId", "period": {"$dateToString": {"format": period_format, "date": "$day"}}},
+            "rentedDays": {"$sum": 1}
+        }}
+    ]
+    return mongo.db.booking_slots.aggregate(pipeline, allowDiskUse=True)
+
+
+def _revenue_by_car(start, end, period_format):
+    """Revenu des réservations terminées, attribué à la période de leur retour effectif."""
+    pipeline = [
+        {"$match": {
+            "status": "completed",
+            "actualReturnDate": {"$gte": start, "$lt": end + timedelta(days=1)},
+            "finalTotalCost": {"$type": "number"}
+        }},
+        {"$group": {
+            "_id": {"carId": "$carId", "period": {"$dateToString": {"format": period_format, "date": "$actualReturnDate"}}},
+            "revenue": {"$sum": "$finalTotalCost"},
+            "completedReservations": {"$sum": 1}
+        }}
+    ]
+    return mongo.db.reservations.aggregate(pipeline, allowDiskUse=True)
+
+
+def _ratio(part, whole):
+    return round(part / whole, 4) if whole else 0.0
+
+
+def compute_fleet_analytics(start, end, period):
+    """
+    Utilisation (jours loués / jours de la fenêtre) et revenu par voiture et par période.
+
+    Les regroupements sont faits par MongoDB ; Python ne fusionne que les lignes agrégées
+    (au plus voitures x périodes) avec la liste des voitures.
+    """
+    period_format = PERIOD_FORMATS[period]
+    days_per_period = _days_per_period(start, end, period_format)
+    window_days = (end - start).days + 1
+
+    cars = {}
+    for car in mongo.db.cars.find({}, {'make': 1, 'model': 1, 'licensePlate': 1, 'status': 1}):
+        cars[car['_id']] = {
+            'id': str(car['_id']), 'make': car.get('make'), 'model': car.get('model'),
+            'licensePlate': car.get('licensePlate'), 'status': car.get('status'),
+            'rentedDays': 0, 'availableDays': window_days, 'revenue': 0.0, 'completedReservations': 0,
+            'periods': {}
+        }
+    fleet_periods = {label: {'period': label, 'availableDays': days, 'rentedDays': 0, 'revenue': 0.0}
+                     for label, days in days_per_period.items()}
+
+    def car_period(row):
+        car = cars.get(row['_id']['carId'])
+        label = row['_id']['period']
+        if car is None or label not in fleet_periods:
+            # Voiture supprimée depuis : ses lignes ne sont pas rattachées à la flotte actuelle
+            return None, None
+        return car, car['periods'].setdefault(label, {'rentedDays': 0, 'revenue': 0.0, 'completedReservations': 0})
+
+    for row in _rented_days_by_car(start, end, period_format):
+        car, entry = car_period(row)
+        if car is None:
+            continue
+        entry['rentedDays'] = row['rentedDays']
+        car['rentedDays'] += row['rentedDays']
+        fleet_periods[row['_id']['period']]['rentedDays'] += row['rentedDays']
+
+    for row in _revenue_by_car(start, end, period_format):
+        car, entry = car_period(row)
+        if car is None:
+            continue
+        entry['revenue'] = row['revenue']
+        entry['completedReservations'] = row['completedReservations']
+        car['revenue'] += row['revenue']
+        car['completedReservations'] += row['completedReservations']
+        fleet_periods[row['_id']['period']]['revenue'] += row['revenue']
+
+    for car in cars.values():
+        car['utilization'] = _ratio(car['rentedDays'], car['availableDays'])
+        for label, entry in car['periods'].items():
+            entry['utilization'] = _ratio(entry['rentedDays'], days_per_period[label])
+    for entry in fleet_periods.values():
+        entry['utilization'] = _ratio(entry['rentedDays'], entry['availableDays'] * len(cars))
+
+    rented_days = sum(car['rentedDays'] for car in cars.values())
+    return {
+        'start': start,
+        'end': end,
+        'period': period,
+        'totals': {
+            'cars': len(cars),
+            'availableDays': window_days * len(cars),
+            'rentedDays': rented_days,
+            'utilization': _ratio(rented_days, window_days * len(cars)),
+            'revenue': sum(car['revenue'] for car in cars.values()),
+        },
+        'periods': list(fleet_periods.values()),
+        'cars': sorted(cars.values(), key=lambda car: (-car['utilization'], -car['revenue'], car['id'])),
+        'generatedAt': datetime.utcnow(),
+    }
+
+
+# --- GET /fleet (Utilisation et revenu par voiture sur une fenêtre) ---
+@analytics_bp.route('/fleet', methods=['GET'])
+@login_required(role="manager")
+def get_fleet_analytics():
+    try:
+        start, end, period = _parse_window(request.args)
+    except ValueError as ve:
+        return jsonify(message=f"Invalid query parameter: {str(ve)}"), 400
+
+    cache_key = (start, end, period)
+    refresh = request.args.get('refresh', 'false').lower() == 'true'
+    try:
+        result = None if refresh else _fleet_cache.get(cache_key)
+        if result is None:
+            result = compute_fleet_analytics(start, end, period)
+            _fleet_cache.set(cache_key, result, current_app.config.get('ANALYTICS_CACHE_TTL', 300))
+        return jsonify(result), 200
+    except Exception as e:
+        current_app.logger.error(f"Error computing fleet analytics: {e}")
+        return jsonify(message=f"Error computing fleet analytics: {str(e)}"), 500
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, current_app, session
 from ..extensions import mongo
-from ..utils.helpers import bson_to_json, mongo_to_dict 
+from ..utils.helpers import mongo_to_dict 
+from ..utils.export import export_response, parse_export_options
 from bson import ObjectId
 from datetime import datetime, timedelta
 from functools import wraps
@@ -25,6 +26,64 @@ def login_required(role=None):
 
 audit_log_bp = Blueprint('audit_log', __name__, url_prefix='/api/audit-logs')
 
+AUDIT_LOG_EXPORT_COLUMNS = ['id', 'timestamp', 'action', 'status', 'entityType', 'entityId', 'userId', 'userUsername', 'details']
+
+def _build_audit_log_filter(args):
+    """Builds the audit log query from the request filters (raises ValueError on invalid input)."""
+    query = {}
+
+    # Filtering options
+    user_id_str = args.get('userId')
+    if user_id_str:
+        try:
+            query['userId'] = ObjectId(user_id_str)
+        except Exception:
+            raise ValueError("Invalid userId format. Must be a valid ObjectId.")
+
+    user_username = args.get('userUsername')
+    if user_username:
+        query['userUsername'] = {'$regex': user_username, '$options': 'i'}
+
+    action = args.get('action')
+    if action:
+        query['action'] = {'$regex': action, '$options': 'i'}
+
+    entity_type = args.get('entityType')
+    if entity_type:
+        query['entityType'] = {'$regex': entity_type, '$options': 'i'}
+
+    entity_id_str = args.get('entityId')
+    if entity_id_str:
+        try:
+            query['entityId'] = ObjectId(entity_id_str)
+        except Exception:
+            raise ValueError("Invalid entityId format. Must be a valid ObjectId.")
+
+    start_date_str = args.get('startDate')
+    end_date_str = args.get('endDate')
+
+    date_filter = {}
+    if start_date_str:
+        try:
+            # Expecting YYYY-MM-DD format for date part
+            dt_start = datetime.fromisoformat(start_date_str.split('T')[0] + 'T00:00:00')
+            date_filter['$gte'] = dt_start
+        except ValueError:
+            raise ValueError("Invalid startDate format. Use YYYY-MM-DD or ISO format e.g., YYYY-MM-DDTHH:MM:SSZ")
+
+    if end_date_str:
+        try:
+            # Expecting YYYY-MM-DD format for date part, set to end of that day
+            dt_end = datetime.fromisoformat(end_date_str.split('T')[0] + 'T00:00:00') + timedelta(days=1, microseconds=-1)
+            date_filter['$lte'] = dt_end
+        except ValueError:
+            raise ValueError("Invalid endDate format. Use YYYY-MM-DD or ISO format e.g., YYYY-MM-DDTHH:MM:SSZ")
+
+    if date_filter:
+        query['timestamp'] = date_filter
+
+    return query
+
 @audit_log_bp.route('/', methods=['GET'])
 @login_required(role="admin")
 def get_audit_logs():
@@ -35,58 +94,11 @@ def get_audit_logs():
         if per_page < 1: per_page = 1
         if per_page > 100: per_page = 100 
 
-        query = {}
-
-        # Filtering options
-        user_id_str = request.args.get('userId')
-        if user_id_str:
-            try:
-                query['userId'] = ObjectId(user_id_str)
-            except Exception:
-                return jsonify(message="Invalid userId format. Must be a valid ObjectId."), 400
+        try:
+            query = _build_audit_log_filter(request.args)
+        except ValueError as ve:
+            return jsonify(message=str(ve)), 400
 
-        user_username = request.args.get('userUsername')
-        if user_username:
-            query['userUsername'] = {'$regex': user_username, '$options': 'i'}
-
-        action = request.args.get('action')
-        if action:
-            query['action'] = {'$regex': action, '$options': 'i'}
-
-        entity_type = request.args.get('entityType')
-        if entity_type:
-            query['entityType'] = {'$regex': entity_type, '$options': 'i'}
-        
-        entity_id_str = request.args.get('entityId')
-        if entity_id_str:
-            try:
-                query['entityId'] = ObjectId(entity_id_str)
-            except Exception:
-                return jsonify(message="Invalid entityId format. Must be a valid ObjectId."), 400
-
-        start_date_str = request.args.get('startDate')
-        end_date_str = request.args.get('endDate')
-        
-        date_filter = {}
-        if start_date_str:
-            try:
-                # Expecting YYYY-MM-DD format for date part
-                dt_start = datetime.fromisoformat(start_date_str.split('T')[0] + 'T00:00:00')
-                date_filter['$gte'] = dt_start
-            except ValueError:
-                return jsonify(message="Invalid startDate format. Use YYYY-MM-DD or ISO format e.g., YYYY-MM-DDTHH:MM:SSZ"), 400
-        
-        if end_date_str:
-            try:
-                # Expecting YYYY-MM-DD format for date part, set to end of that day
-                dt_end = datetime.fromisoformat(end_date_str.split('T')[0] + 'T00:00:00') + timedelta(days=1, microseconds=-1)
-                date_filter['$lte'] = dt_end
-            except ValueError:
-                return jsonify(message="Invalid endDate format. Use YYYY-MM-DD or ISO format e.g., YYYY-MM-DDTHH:MM:SSZ"), 400
-
-        if date_filter:
-            query['timestamp'] = date_filter
-            
         current_app.logger.debug(f"Audit log query: {query}")
 
         total_logs = mongo.db.audit_log.count_documents(query)
@@ -96,7 +108,7 @@ def get_audit_logs():
         logs_list = [mongo_to_dict(log) for log in logs_cursor]
 
         return jsonify({
-            "logs": bson_to_json(logs_list),
+            "logs": logs_list,
             "page": page,
             "per_page": per_page,
             "total": total_logs,
@@ -107,3 +119,20 @@ def get_audit_logs():
         current_app.logger.error(f"Error fetching audit logs: {e}", exc_info=True)
         return jsonify(message="An error occurred while fetching audit logs.", error=str(e)), 500
 
+
+@audit_log_bp.route('/export', methods=['GET'])
+@login_required(role="admin")
+def export_audit_logs():
+    """Streams the filtered audit log (same filters as the listing) as NDJSON or CSV, newest first."""
+    try:
+        export_format, batch_size = parse_export_options(request.args)
+        query = _build_audit_log_filter(request.args)
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+
+    try:
+        cursor = mongo.db.audit_log.find(query, batch_size=batch_size).sort([('timestamp', -1), ('_id', -1)])
+        return export_response(cursor, export_format, AUDIT_LOG_EXPORT_COLUMNS, 'audit-log', batch_size)
+    except Exception as e:
+        current_app.logger.error(f"Error exporting audit logs: {e}", exc_info=True)
+        return jsonify(message="An error occurred while exporting audit logs."), 500
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify, session, current_app
+from pymongo.errors import DuplicateKeyError
 from ..extensions import mongo
-from ..utils.helpers import check_password, hash_password, mongo_to_dict, bson_to_json
+from ..utils.helpers import check_password, hash_password, mongo_to_dict
 from ..utils.audit_logger import log_action 
+from ..utils.writes import insert_and_fetch, duplicate_key_message
+from ..utils.versions import bumps_versions
 from datetime import datetime
 
 # Création du Blueprint pour l'authentification
@@ -83,6 +86,7 @@ def status():
 
 # --- POST /create_test_user (Créer un utilisateur - DÉVELOPPEMENT SEULEMENT !) ---
 @auth_bp.route('/create_test_user', methods=['POST'])
+@bumps_versions('users')
 def create_test_user():
     # Ne fonctionne que si Flask est en mode DEBUG
     if not current_app.debug:
@@ -121,15 +125,11 @@ def create_test_user():
 
     # Insérer dans la base de données
     try:
-        result = mongo.db.users.insert_one(new_user)
-        if result.inserted_id:
-            # Récupérer et renvoyer l'utilisateur créé (sans le hash)
-            created_user_doc = mongo.db.users.find_one(
-                {'_id': result.inserted_id}, {'password_hash': 0}
-            )
-            return bson_to_json(mongo_to_dict(created_user_doc)), 201 
-        else:
-            return jsonify(message="Failed to insert test user."), 500
+        # Insérer et renvoyer l'utilisateur créé (sans le hash)
+        created_user_doc = insert_and_fetch(mongo.db.users, new_user, exclude_fields=('password_hash',))
+        return mongo_to_dict(created_user_doc), 201 
+    except DuplicateKeyError as dke:
+        return jsonify(message=duplicate_key_message(dke.details)), 409
     except Exception as e:
         current_app.logger.error(f"Error inserting test user {username}: {e}")
         return jsonify(message="Error inserting test user into database."), 500
\ No newline at end of file
@@ -1,74 +1,242 @@
 from flask import Blueprint, request, jsonify, current_app, session 
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
-import os 
-from werkzeug.utils import secure_filename 
-import uuid 
 
 # Importer mongo et les helpers
 from ..extensions import mongo
-from ..utils.helpers import mongo_to_dict, bson_to_json, login_required 
+from ..utils.helpers import mongo_to_dict, login_required, parse_datetime
 from ..utils.audit_logger import log_action 
+from ..utils.pagination import parse_page_size, apply_cursor, split_page
+from ..utils.booking_ledger import occupied_car_ids
+from ..utils.writes import insert_and_fetch, update_and_fetch, duplicate_key_message
+from ..utils.image_pipeline import initial_image_status, schedule_variants
+from ..utils.image_store import store_upload, release_image, replace_image
+from ..utils.search import SEARCH_CANDIDATE_LIMIT, car_search_keys, prefix_match_query
+from ..utils.car_import import IMPORT_FORMATS, DEFAULT_IMPORT_CHUNK_SIZE, CarImporter, detect_format, iter_rows
+from ..utils.export import export_response, parse_export_options
+from ..utils.versions import versioned, bumps_versions, mark_written
 
 cars_bp = Blueprint('cars', __name__)
 
 cars_collection = lambda: mongo.db.cars
 reservations_collection = lambda: mongo.db.reservations 
 
-# Helper function pour sauvegarder l'image de la voiture
-def _save_car_image(file_storage, entity_identifier_for_log: str):
-    """Sauvegarde l'image et retourne l'URL de l'image ou lève une exception."""
-    if not file_storage or file_storage.filename == '':
-        return None 
+# --- GET / (Liste paginée des voitures) ---
+# Champs renvoyés par défaut (colonnes du tableau) ; fields=full renvoie le document complet
+CAR_LIST_PROJECTION = {'make': 1, 'model': 1, 'year': 1, 'licensePlate': 1, 'vin': 1, 'color': 1, 'status': 1, 'dailyRate': 1,
+                       'imageUrl': 1, 'imageVariants': 1, 'imageStatus': 1}
+# Champs triables (paramètre sort=champ ou sort=-champ) ; _id départage toujours (keyset)
+CAR_LIST_SORT_FIELDS = ('make', 'year', 'dailyRate')
+DEFAULT_CAR_LIST_SORT = [('_id', 1)]
+# Champs internes (clés de recherche normalisées) jamais renvoyés aux clients de l'API
+CAR_INTERNAL_FIELDS = ('searchKeys',)
+CAR_PUBLIC_PROJECTION = {field: 0 for field in CAR_INTERNAL_FIELDS}
+
+def _parse_cars_sort(value):
+    """Convertit le paramètre 'sort' en tri composé terminé par _id."""
+    if not value:
+        return DEFAULT_CAR_LIST_SORT
+    direction = -1 if value.startswith('-') else 1
+    field = value.lstrip('-')
+    if field not in CAR_LIST_SORT_FIELDS:
+        raise ValueError(f"sort must be one of: {', '.join(CAR_LIST_SORT_FIELDS)} (prefix with '-' for descending).")
+    return [(field, direction), ('_id', direction)]
+
+def _build_cars_filter(args):
+    """Construit le filtre du listing (status, make, plage d'années, plage de tarifs)."""
+    query = {}
+
+    status = args.get('status')
+    if status:
+        statuses = [s for s in status.split(',') if s]
+        query['status'] = statuses[0] if len(statuses) == 1 else {'$in': statuses}
+
+    if args.get('make'):
+        query['make'] = args['make']
+
+    for field, min_param, max_param, cast in (('year', 'minYear', 'maxYear', int), ('dailyRate', 'minRate', 'maxRate', float)):
+        range_filter = {}
+        if args.get(min_param):
+            range_filter['$gte'] = cast(args[min_param])
+        if args.get(max_param):
+            range_filter['$lte'] = cast(args[max_param])
+        if range_filter:
+            query[field] = range_filter
+
+    return query
 
+@cars_bp.route('', methods=['GET'])
+@login_required(role="manager") 
+@versioned('cars')
+def get_cars():
+    try:
+        limit = parse_page_size(request.args.get('limit'))
+        sort = _parse_cars_sort(request.args.get('sort'))
+        query = _build_cars_filter(request.args)
+        query = apply_cursor(query, sort, request.args.get('cursor'))
+    except ValueError as ve:
+        return jsonify(message=f"Invalid query parameter: {str(ve)}"), 400
 
-    upload_folder = current_app.config.get('UPLOAD_FOLDER_CARS', os.path.join(current_app.static_folder, 'uploads', 'cars'))
-    allowed_extensions = current_app.config.get('ALLOWED_IMAGE_EXTENSIONS', {'png', 'jpg', 'jpeg', 'gif'})
+    try:
+        projection = CAR_PUBLIC_PROJECTION if request.args.get('fields') == 'full' else CAR_LIST_PROJECTION
+        # Récupérer limit + 1 éléments pour savoir s'il existe une page suivante
+        cars_cursor = cars_collection().find(query, projection).sort(sort).limit(limit + 1)
+        cars_list, next_cursor = split_page(list(cars_cursor), limit, sort)
+        return jsonify({
+            "cars": [mongo_to_dict(car) for car in cars_list],
+            "nextCursor": next_cursor,
+            "limit": limit
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching cars: {e}")
+        return jsonify(message="Error fetching cars."), 500
 
-    filename = file_storage.filename
-    if not ('.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions):
-        raise ValueError(f"File type not allowed. Allowed: {', '.join(allowed_extensions)}")
+# --- GET /search (Recherche par marque, modèle, plaque ou VIN) ---
+CAR_SEARCH_PAGE_SIZE = 20
+MAX_CAR_SEARCH_PAGE_SIZE = 50
+# Champs modifiant les clés de recherche (searchKeys)
+CAR_SEARCH_FIELDS = ('make', 'model', 'licensePlate', 'vin')
+
+def _search_cars_page(query_text, mode, offset, limit):
+    """
+    Renvoie jusqu'à limit + 1 voitures classées pour la requête.
+      - prefix (défaut, saisie semi-automatique) : chaque mot est le préfixe d'une clé de searchKeys (index multiclé) ;
+        au plus SEARCH_CANDIDATE_LIMIT candidats sont lus puis classés par nombre de mots égaux à une clé.
+      - text : mots entiers via l'index texte, classés par textScore (plaque et VIN pondérés plus fort).
+    """
+    if mode == 'text':
+        cursor = cars_collection().find(
+            {'$text': {'$search': query_text}}, {**CAR_LIST_PROJECTION, 'score': {'$meta': 'textScore'}}
+        ).sort([('score', {'$meta': 'textScore'}), ('_id', 1)]).skip(offset).limit(limit + 1)
+        return [{key: value for key, value in car.items() if key != 'score'} for car in cursor]
+
+    match, terms = prefix_match_query('searchKeys', query_text)
+    if match is None:
+        return []
+    candidates = list(cars_collection().find(match, {**CAR_LIST_PROJECTION, 'searchKeys': 1}).limit(SEARCH_CANDIDATE_LIMIT))
+    exact_terms = set(terms)
+    candidates.sort(key=lambda car: (-len(exact_terms.intersection(car.get('searchKeys') or [])),
+                                     str(car.get('make', '')), str(car.get('model', '')), str(car['_id'])))
+    page = candidates[offset:offset + limit + 1]
+    for car in page:
+        car.pop('searchKeys', None)
+    return page
+
+@cars_bp.route('/search', methods=['GET'])
+@login_required(role="manager")
+@versioned('cars')
+def search_cars():
+    query_text = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'prefix')
+    if not query_text:
+        return jsonify(message="Query parameter 'q' is required."), 400
+    if mode not in ('prefix', 'text'):
+        return jsonify(message="mode must be 'prefix' or 'text'."), 400
+    try:
+        limit = parse_page_size(request.args.get('limit'), default=CAR_SEARCH_PAGE_SIZE, maximum=MAX_CAR_SEARCH_PAGE_SIZE)
+        offset = int(request.args.get('offset') or 0)
+        if offset < 0:
+            raise ValueError("offset must be a non-negative integer.")
+    except ValueError as ve:
+        return jsonify(message=f"Invalid query parameter: {str(ve)}"), 400
 
-    original_filename = secure_filename(filename)
-    extension = original_filename.rsplit('.', 1)[1].lower()
-    unique_filename = f"{uuid.uuid4()}.{extension}"
-    
-    if not os.path.exists(upload_folder):
-        try:
-            os.makedirs(upload_folder)
-        except OSError as e:
-            current_app.logger.error(f"Error creating upload directory {upload_folder}: {e}")
-            raise IOError(f"Server error: Could not create upload directory.")
-    
-    file_path = os.path.join(upload_folder, unique_filename)
     try:
-        file_storage.save(file_path)
-        static_url_path = os.path.join('uploads', 'cars', unique_filename).replace('\\\\', '/') 
-        image_url = f"/{current_app.static_url_path}/{static_url_path}"
-        if not image_url.startswith('/static/'):
-             image_url = f"/static/{static_url_path}"
+        cars_list = _search_cars_page(query_text, mode, offset, limit)
+        has_more = len(cars_list) > limit
+        # En mode préfixe, les résultats sont limités aux SEARCH_CANDIDATE_LIMIT premiers candidats
+        if mode == 'prefix' and offset + limit >= SEARCH_CANDIDATE_LIMIT:
+            has_more = False
+        return jsonify({
+            "cars": [mongo_to_dict(car) for car in cars_list[:limit]],
+            "nextOffset": offset + limit if has_more else None,
+            "limit": limit
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error searching cars: {e}")
+        return jsonify(message="Error searching cars."), 500
+
+# Tri de la recherche de disponibilité : tarif journalier croissant, _id pour départager (keyset)
+AVAILABLE_CARS_SORT = [('dailyRate', 1), ('_id', 1)]
+# Champs renvoyés par la recherche de disponibilité
+AVAILABLE_CARS_PROJECTION = {'make': 1, 'model': 1, 'year': 1, 'licensePlate': 1, 'color': 1, 'status': 1, 'dailyRate': 1,
+                             'imageUrl': 1, 'imageVariants': 1, 'imageStatus': 1}
 
+# --- GET /available (Voitures libres sur une période) ---
+@cars_bp.route('/available', methods=['GET'])
+@login_required(role="manager")
+@versioned('cars', 'reservations')
+def get_available_cars():
+    start_str = request.args.get('start')
+    end_str = request.args.get('end')
+    if not start_str or not end_str:
+        return jsonify(message="Query parameters 'start' and 'end' are required."), 400
+
+    try:
+        # Dates ramenées en UTC naïf comme à l'enregistrement des réservations : les jours comparés
+        # sont ceux du registre, même si la requête porte un fuseau (ex: 2025-07-01T23:30-02:00 -> 07-02)
+        start_date = parse_datetime(start_str)
+        end_date = parse_datetime(end_str)
+        if end_date.date() < start_date.date():
+            return jsonify(message="End date cannot be before start date."), 400
+
+        limit = parse_page_size(request.args.get('limit'))
+        query = {'status': {'$nin': ['maintenance', 'out_of_service']}}
+        if request.args.get('make'):
+            query['make'] = request.args['make']
+        rate_filter = {}
+        if request.args.get('minRate'):
+            rate_filter['$gte'] = float(request.args['minRate'])
+        if request.args.get('maxRate'):
+            rate_filter['$lte'] = float(request.args['maxRate'])
+        if rate_filter:
+            query['dailyRate'] = rate_filter
+        query = apply_cursor(query, AVAILABLE_CARS_SORT, request.args.get('cursor'))
+    except ValueError as ve:
+        return jsonify(message=f"Invalid query parameter: {str(ve)}"), 400
 
-        return image_url
+    try:
+        # Voitures occupées sur la période, lues dans le registre des jours réservés (pas de scan des réservations)
+        occupied_ids = occupied_car_ids(start_date, end_date)
+        if occupied_ids:
+            query = {'$and': [query, {'_id': {'$nin': occupied_ids}}]}
+
+        cars_cursor = cars_collection().find(query, AVAILABLE_CARS_PROJECTION).sort(AVAILABLE_CARS_SORT).limit(limit + 1)
+        cars_list, next_cursor = split_page(list(cars_cursor), limit, AVAILABLE_CARS_SORT)
+        return jsonify({
+            "cars": [mongo_to_dict(car) for car in cars_list],
+            "nextCursor": next_cursor,
+            "limit": limit
+        }), 200
     except Exception as e:
-        current_app.logger.error(f"Error saving uploaded file {unique_filename}: {e}")
-        raise IOError(f"Error saving file.")
+        current_app.logger.error(f"Error fetching available cars: {e}")
+        return jsonify(message="Error fetching available cars."), 500
+
+# --- GET /export (Export en flux NDJSON ou CSV, mêmes filtres que le listing) ---
+CAR_EXPORT_COLUMNS = ['id', 'make', 'model', 'year', 'licensePlate', 'vin', 'color', 'status', 'dailyRate',
+                      'addedAt', 'updatedAt']
+
+@cars_bp.route('/export', methods=['GET'])
+@login_required(role="manager")
+def export_cars():
+    try:
+        export_format, batch_size = parse_export_options(request.args)
+        query = _build_cars_filter(request.args)
+    except ValueError as ve:
+        return jsonify(message=f"Invalid query parameter: {str(ve)}"), 400
 
-# --- GET / (Liste toutes les voitures) ---
-@cars_bp.route('', methods=['GET'])
-@login_required(role="manager") 
-def get_cars():
     try:
-        cars_cursor = cars_collection().find()
-        cars_list = [mongo_to_dict(car) for car in cars_cursor]
-        return bson_to_json(cars_list), 200
+        cursor = cars_collection().find(query, CAR_PUBLIC_PROJECTION, batch_size=batch_size).sort('_id', 1)
+        log_action('export_cars', 'car', details={'format': export_format, 'filters': request.args.to_dict()})
+        return export_response(cursor, export_format, CAR_EXPORT_COLUMNS, 'cars', batch_size)
     except Exception as e:
-        current_app.logger.error(f"Error fetching cars: {e}")
-        return jsonify(message="Error fetching cars."), 500
+        current_app.logger.error(f"Error exporting cars: {e}")
+        return jsonify(message="Error exporting cars."), 500
 
 # --- GET /<id> (Récupère UNE voiture) ---
 @cars_bp.route('/<string:car_id>', methods=['GET'])
 @login_required(role="manager")
+@versioned('cars')
 def get_car_by_id(car_id):
     try:
         oid = ObjectId(car_id)
@@ -76,9 +244,9 @@ def get_car_by_id(car_id):
         return jsonify(message="Invalid car ID format."), 400
 
     try:
-        car_doc = cars_collection().find_one({'_id': oid})
+        car_doc = cars_collection().find_one({'_id': oid}, CAR_PUBLIC_PROJECTION)
         if car_doc:
-            return bson_to_json(mongo_to_dict(car_doc)), 200
+            return mongo_to_dict(car_doc), 200
         else:
             return jsonify(message="Car not found."), 404
     except Exception as e:
@@ -88,8 +256,10 @@ def get_car_by_id(car_id):
 # --- POST / (Crée une nouvelle voiture) ---
 @cars_bp.route('', methods=['POST'])
 @login_required(role="manager")
+@bumps_versions('cars')
 def create_car():
     image_url_for_db = None 
+    image_path = None
     data = {}
     try:
         # Pour multipart/form-data, les données textuelles sont dans request.form
@@ -101,13 +271,7 @@ def create_car():
         if not all(field in data for field in required_fields):
             return jsonify(message="Missing required fields. Required: " + ", ".join(required_fields)), 400
 
-        # Vérifications d'unicité pour licensePlate et vin
-        if cars_collection().find_one({"licensePlate": data['licensePlate']}):
-            return jsonify(message=f"License plate '{data['licensePlate']}' already exists."), 409
-
-        if cars_collection().find_one({"vin": data['vin']}):
-            return jsonify(message=f"VIN '{data['vin']}' already exists."), 409
-        
+        # Unicité de licensePlate et vin : garantie par les index uniques (DuplicateKeyError -> 409)
         user_id_from_session = session.get('user_id')
         try:
             added_by_oid = ObjectId(user_id_from_session) if user_id_from_session else None
@@ -117,7 +281,8 @@ def create_car():
 
         if image_file:
             try:
-                image_url_for_db = _save_car_image(image_file, data.get('vin', 'new_car_creation'))
+                # Écriture de l'original uniquement ; les variantes sont générées en arrière-plan
+                image_path, image_url_for_db = store_upload(image_file)
             except ValueError as ve:
                 return jsonify(message=str(ve)), 400
             except IOError as ioe: 
@@ -132,6 +297,8 @@ def create_car():
             "status": data['status'],
             "description": data.get('description'),
             "imageUrl": image_url_for_db,
+            "imageVariants": {},
+            "imageStatus": initial_image_status() if image_url_for_db else None,
             "addedAt": datetime.utcnow(),
             "addedBy": added_by_oid,
             "updatedAt": None,
@@ -142,57 +309,83 @@ def create_car():
             new_car_data["year"] = int(data['year'])
             new_car_data["dailyRate"] = float(data['dailyRate'])
         except ValueError:
-            if image_url_for_db:
-                try:
-                    filename_to_delete = image_url_for_db.split('/')[-1]
-                    upload_folder = current_app.config.get('UPLOAD_FOLDER_CARS', os.path.join(current_app.static_folder, 'uploads', 'cars'))
-                    filepath_to_delete = os.path.join(upload_folder, filename_to_delete)
-                    if os.path.exists(filepath_to_delete):
-                        os.remove(filepath_to_delete)
-                except Exception as e_remove:
-                    current_app.logger.error(f"Error deleting orphaned image {image_url_for_db} during car creation failure: {e_remove}")
+            release_image(image_url_for_db)
             return jsonify(message="Invalid data type for year or dailyRate."), 400
 
-        result = cars_collection().insert_one(new_car_data)
-        if result.inserted_id:
-            log_action('create_car', 'car', entity_id=result.inserted_id, status='success', 
-                       details={
-                           'vin': new_car_data['vin'], 
-                           'licensePlate': new_car_data['licensePlate'],
-                           'imageUrl': new_car_data.get('imageUrl')
-                        })
-            created_car_doc = cars_collection().find_one({'_id': result.inserted_id})
-            return bson_to_json(mongo_to_dict(created_car_doc)), 201
-        else:
-
-            if image_url_for_db:
-                try:
-                    filename_to_delete = image_url_for_db.split('/')[-1]
-                    upload_folder = current_app.config.get('UPLOAD_FOLDER_CARS', os.path.join(current_app.static_folder, 'uploads', 'cars'))
-                    filepath_to_delete = os.path.join(upload_folder, filename_to_delete)
-                    if os.path.exists(filepath_to_delete):
-                        os.remove(filepath_to_delete)
-                except Exception as e_remove:
-                    current_app.logger.error(f"Error deleting orphaned image {image_url_for_db} during car creation failure (DB insert): {e_remove}")
-            return jsonify(message="Failed to create car."), 500
-
+        new_car_data["searchKeys"] = car_search_keys(new_car_data)
+        created_car_doc = insert_and_fetch(cars_collection(), new_car_data, exclude_fields=CAR_INTERNAL_FIELDS)
+        if image_url_for_db:
+            schedule_variants(created_car_doc['_id'], image_path, image_url_for_db)
+        log_action('create_car', 'car', entity_id=created_car_doc['_id'], status='success', 
+                   details={
+                       'vin': new_car_data['vin'], 
+                       'licensePlate': new_car_data['licensePlate'],
+                       'imageUrl': new_car_data.get('imageUrl')
+                    })
+        return mongo_to_dict(created_car_doc), 201
+
+    except DuplicateKeyError as dke:
+        release_image(image_url_for_db)
+        return jsonify(message=duplicate_key_message(dke.details)), 409
     except Exception as e:
         current_app.logger.error(f"Error creating car: {e}")
 
-        if image_url_for_db: 
-            try:
-                filename_to_delete = image_url_for_db.split('/')[-1]
-                upload_folder = current_app.config.get('UPLOAD_FOLDER_CARS', os.path.join(current_app.static_folder, 'uploads', 'cars'))
-                filepath_to_delete = os.path.join(upload_folder, filename_to_delete)
-                if os.path.exists(filepath_to_delete):
-                    os.remove(filepath_to_delete)
-            except Exception as e_remove:
-                current_app.logger.error(f"Error deleting orphaned image {image_url_for_db} during general car creation exception: {e_remove}")
+        release_image(image_url_for_db)
         return jsonify(message="Error creating car."), 500
 
+# --- POST /import (Import en masse CSV / NDJSON) ---
+MAX_IMPORT_CHUNK_SIZE = 1000
+
+@cars_bp.route('/import', methods=['POST'])
+@login_required(role="manager")
+@bumps_versions('cars')
+def import_cars():
+    """
+    Importe un fichier CSV (en-tête : make,model,year,licensePlate,vin,status,dailyRate[,color,description])
+    ou NDJSON (un objet par ligne), envoyé en multipart (champ 'file') ou comme corps brut.
+    Le fichier est lu au fil de l'eau ; la réponse détaille les lignes refusées.
+    """
+    upload = request.files.get('file')
+    if upload:
+        stream, filename, content_type = upload.stream, upload.filename, upload.mimetype
+    else:
+        stream, filename, content_type = request.stream, None, request.mimetype
+    import_format = request.args.get('format') or detect_format(filename, content_type)
+    if import_format not in IMPORT_FORMATS:
+        return jsonify(message=f"Unknown import format. Use format={' or format='.join(IMPORT_FORMATS)}, a .csv/.ndjson file or a text/csv / application/x-ndjson body."), 400
+
+    try:
+        chunk_size = min(int(request.args.get('chunkSize', DEFAULT_IMPORT_CHUNK_SIZE)), MAX_IMPORT_CHUNK_SIZE)
+        if chunk_size < 1:
+            raise ValueError("chunkSize must be a positive integer.")
+    except ValueError as ve:
+        return jsonify(message=f"Invalid query parameter: {str(ve)}"), 400
+    dry_run = request.args.get('dryRun', 'false').lower() == 'true'
+
+    user_id_from_session = session.get('user_id')
+    try:
+        added_by_oid = ObjectId(user_id_from_session) if user_id_from_session else None
+    except Exception:
+        added_by_oid = None
+
+    try:
+        report = CarImporter(chunk_size=chunk_size, dry_run=dry_run, added_by=added_by_oid).run(iter_rows(stream, import_format))
+    except Exception as e:
+        current_app.logger.error(f"Error importing cars: {e}")
+        return jsonify(message="Error importing cars."), 500
+
+    if report['readError']:
+        # Lecture interrompue : le rapport indique les voitures déjà créées par les lots précédents
+        report['message'] = report['readError']
+        return jsonify(report), (207 if report['created'] and not dry_run else 400)
+    if not report['failed']:
+        return jsonify(report), (200 if dry_run else 201)
+    return jsonify(report), (207 if report['created'] else 400)
+
 # --- PUT /<id> (Met à jour UNE voiture) ---
 @cars_bp.route('/<string:car_id>', methods=['PUT'])
 @login_required(role="manager")
+@bumps_versions('cars')
 def update_car(car_id):
     try:
         oid = ObjectId(car_id)
@@ -228,59 +421,36 @@ def update_car(car_id):
                         return jsonify(message=f"Invalid dailyRate format: {new_value}"), 400
                 
                 # Vérifier si la valeur a réellement changé avant de l'ajouter aux champs à mettre à jour
+                # (unicité de licensePlate et vin : index uniques, DuplicateKeyError -> 409)
                 if new_value != current_car_doc.get(key):
-                    # Vérifications d'unicité pour licensePlate et vin
-                    if key == 'licensePlate':
-                        if cars_collection().find_one({"licensePlate": new_value, "_id": {"$ne": oid}}):
-                            return jsonify(message=f"License plate '{new_value}' already exists for another car."), 409
-                    elif key == 'vin':
-                        if cars_collection().find_one({"vin": new_value, "_id": {"$ne": oid}}):
-                            return jsonify(message=f"VIN '{new_value}' already exists for another car."), 409
-                    
                     before_details_log[key] = current_car_doc.get(key)
                     update_fields[key] = new_value
 
-        new_image_url = None
+        # L'ancienne image n'est libérée (image_store) qu'après la mise à jour
+        old_image_url = current_car_doc.get('imageUrl')
+        image_replaced = False
+        new_image_path, new_image_url = None, None
         if image_file:
             try:
-                new_image_url = _save_car_image(image_file, car_id)
-                if new_image_url:
-
-                    old_image_url = current_car_doc.get('imageUrl')
-                    if old_image_url != new_image_url :
-                         before_details_log['imageUrl'] = old_image_url
-                         update_fields['imageUrl'] = new_image_url
-                    
-                    # Supprimer l'ancien fichier image du serveur si old_image_url existe et est différent de new_image_url
-                    if old_image_url and old_image_url != new_image_url:
-                        try:
-                            old_filename = old_image_url.split('/')[-1]
-                            upload_folder = current_app.config.get('UPLOAD_FOLDER_CARS', os.path.join(current_app.static_folder, 'uploads', 'cars'))
-                            old_filepath = os.path.join(upload_folder, old_filename)
-                            if os.path.exists(old_filepath):
-                                os.remove(old_filepath)
-                        except Exception as e_remove:
-                            current_app.logger.error(f"Error deleting old car image {old_image_url}: {e_remove}")
-
+                new_image_path, new_image_url = store_upload(image_file)
             except ValueError as ve:
                 return jsonify(message=str(ve)), 400
             except IOError as ioe:
                 return jsonify(message=f"Could not save image: {str(ioe)}"), 500
-        
+            if new_image_url:
+                before_details_log['imageUrl'] = old_image_url
+                update_fields['imageUrl'] = new_image_url
+                update_fields['imageVariants'] = {}
+                update_fields['imageStatus'] = initial_image_status()
+                image_replaced = True
 
         if 'imageUrl' in data and (data['imageUrl'] is None or data['imageUrl'] == '') and not image_file:
-            old_image_url = current_car_doc.get('imageUrl')
             if old_image_url:
                 before_details_log['imageUrl'] = old_image_url
                 update_fields['imageUrl'] = None
-                try:
-                    old_filename = old_image_url.split('/')[-1]
-                    upload_folder = current_app.config.get('UPLOAD_FOLDER_CARS', os.path.join(current_app.static_folder, 'uploads', 'cars'))
-                    old_filepath = os.path.join(upload_folder, old_filename)
-                    if os.path.exists(old_filepath):
-                        os.remove(old_filepath)
-                except Exception as e_remove:
-                    current_app.logger.error(f"Error deleting existing car image {old_image_url}: {e_remove}")
+                update_fields['imageVariants'] = {}
+                update_fields['imageStatus'] = None
+                image_replaced = True
 
 
         if not update_fields:
@@ -292,14 +462,23 @@ def update_car(car_id):
             current_app.logger.warn(f"Could not convert session user_id to ObjectId for car update: {user_id_from_session}")
             updated_by_oid = None
 
+        if any(field in update_fields for field in CAR_SEARCH_FIELDS):
+            update_fields['searchKeys'] = car_search_keys({**current_car_doc, **update_fields})
         update_fields['updatedAt'] = datetime.utcnow()
         update_fields['updatedBy'] = updated_by_oid
 
-        result = cars_collection().update_one({'_id': oid}, {'$set': update_fields})
-
-        if result.matched_count:
-            updated_car_doc_for_log = cars_collection().find_one({'_id': oid})
-            after_details_log = {key: updated_car_doc_for_log.get(key) for key in update_fields}
+        try:
+            updated_car_doc = update_and_fetch(cars_collection(), {'_id': oid}, update_fields, projection=CAR_PUBLIC_PROJECTION)
+        except Exception:
+            release_image(new_image_url)
+            raise
+
+        if updated_car_doc:
+            if image_replaced:
+                replace_image(old_image_url, new_image_url, current_car_doc.get('imageVariants'))
+            if new_image_url:
+                schedule_variants(oid, new_image_path, new_image_url)
+            after_details_log = {key: updated_car_doc.get(key) for key in update_fields if key not in CAR_INTERNAL_FIELDS}
             
             log_action('update_car', 'car', entity_id=oid, status='success', 
                        details={
@@ -307,10 +486,13 @@ def update_car(car_id):
                            'before': before_details_log, 
                            'after': after_details_log  
                         })
-            return bson_to_json(mongo_to_dict(updated_car_doc_for_log)), 200
+            return mongo_to_dict(updated_car_doc), 200
         else:
+            release_image(new_image_url)
             return jsonify(message="Car not found during update operation."), 404 
 
+    except DuplicateKeyError as dke:
+        return jsonify(message=duplicate_key_message(dke.details)), 409
     except Exception as e:
         current_app.logger.error(f"Error updating car {car_id}: {e}")
         return jsonify(message="Error updating car."), 500
@@ -318,6 +500,7 @@ def update_car(car_id):
 # --- DELETE /<id> (Supprime UNE voiture) ---
 @cars_bp.route('/<string:car_id>', methods=['DELETE'])
 @login_required(role="manager") 
+@bumps_versions('cars')
 def delete_car(car_id):
     try:
         oid = ObjectId(car_id)
@@ -325,7 +508,7 @@ def delete_car(car_id):
         return jsonify(message="Invalid car ID format."), 400
 
     try:
-        car_to_delete = cars_collection().find_one({'_id': oid}, {'vin': 1, 'licensePlate': 1, 'status': 1, 'imageUrl': 1}) 
+        car_to_delete = cars_collection().find_one({'_id': oid}, {'vin': 1, 'licensePlate': 1, 'status': 1, 'imageUrl': 1, 'imageVariants': 1}) 
         if not car_to_delete:
             return jsonify(message="Car not found."), 404
 
@@ -344,22 +527,12 @@ def delete_car(car_id):
 
             pass 
         
-        # Sauvegarder l'URL de l'image avant de supprimer le document de la DB
-        image_url_to_delete = car_to_delete.get('imageUrl')
-
         result = cars_collection().delete_one({'_id': oid})
 
         if result.deleted_count:
-            # Si la voiture est supprimée de la DB, supprimer aussi son image du serveur
-            if image_url_to_delete:
-                try:
-                    filename_to_delete = image_url_to_delete.split('/')[-1]
-                    upload_folder = current_app.config.get('UPLOAD_FOLDER_CARS', os.path.join(current_app.static_folder, 'uploads', 'cars'))
-                    filepath_to_delete = os.path.join(upload_folder, filename_to_delete)
-                    if os.path.exists(filepath_to_delete):
-                        os.remove(filepath_to_delete)
-                except Exception as e_remove_img:
-                    current_app.logger.error(f"Error deleting image file {image_url_to_delete} for deleted car {oid}: {e_remove_img}")
+            mark_written()
+            # Si la voiture est supprimée de la DB, supprimer aussi son image (et ses variantes) du serveur
+            release_image(car_to_delete.get('imageUrl'), car_to_delete.get('imageVariants'))
             log_action('delete_car', 'car', entity_id=oid, status='success', details={'deleted_car_vin': car_to_delete.get('vin'), 'deleted_car_licensePlate': car_to_delete.get('licensePlate')})
             return jsonify(message="Car deleted successfully."), 200
         else:
@@ -1,31 +1,121 @@
 from flask import Blueprint, request, jsonify, current_app, session 
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
 
 from ..extensions import mongo
-from ..utils.helpers import mongo_to_dict, bson_to_json, login_required
+from ..utils.helpers import mongo_to_dict, login_required, parse_datetime
 from ..utils.audit_logger import log_action
+from ..utils.writes import insert_and_fetch, update_and_fetch, duplicate_key_message
+from ..utils.pagination import parse_page_size, apply_cursor, split_page
+from ..utils.client_stats import EMPTY_CLIENT_STATS
+from ..utils.export import export_response, parse_export_options
+from ..utils.search import (SEARCH_CANDIDATE_LIMIT, CLIENT_SEARCH_SOURCE_FIELDS, client_search_fields,
+                            client_match_query, client_exact_query, client_match_rank)
+from ..utils.versions import versioned, bumps_versions, mark_written
 
 clients_bp = Blueprint('clients', __name__)
 
 clients_collection = lambda: mongo.db.clients
 reservations_collection = lambda: mongo.db.reservations 
 
+# Champs normalisés internes à la recherche (voir utils/search.py), jamais renvoyés par l'API
+CLIENT_INTERNAL_FIELDS = ('phoneDigits', 'cinUpper', 'emailLower', 'nameKeys')
+CLIENT_PUBLIC_PROJECTION = {field: 0 for field in CLIENT_INTERNAL_FIELDS}
+
 # --- GET / (Liste tous les clients) ---
 @clients_bp.route('', methods=['GET'])
 @login_required(role="manager")
+@versioned('clients')
 def get_clients():
     try:
-        clients_cursor = clients_collection().find().sort("registeredAt", 1) 
+        clients_cursor = clients_collection().find({}, CLIENT_PUBLIC_PROJECTION).sort("registeredAt", 1) 
         clients_list = [mongo_to_dict(client) for client in clients_cursor]
-        return bson_to_json(clients_list), 200
+        return clients_list, 200
     except Exception as e:
         current_app.logger.error(f"Error fetching clients: {e}")
         return jsonify(message="Error fetching clients."), 500
 
+# --- GET /search (Recherche par nom, téléphone, CIN ou email) ---
+CLIENT_SEARCH_PAGE_SIZE = 10
+MAX_CLIENT_SEARCH_PAGE_SIZE = 50
+# Champs renvoyés aux sélecteurs de clients
+CLIENT_SEARCH_PROJECTION = {'firstName': 1, 'lastName': 1, 'phone': 1, 'CIN': 1, 'email': 1}
+CLIENT_SEARCH_RANK_FIELDS = {field: 1 for field in CLIENT_INTERNAL_FIELDS}
+
+@clients_bp.route('/search', methods=['GET'])
+@login_required(role="manager")
+@versioned('clients')
+def search_clients():
+    query_text = request.args.get('q', '').strip()
+    if not query_text:
+        return jsonify(message="Query parameter 'q' is required."), 400
+    try:
+        limit = parse_page_size(request.args.get('limit'), default=CLIENT_SEARCH_PAGE_SIZE, maximum=MAX_CLIENT_SEARCH_PAGE_SIZE)
+    except ValueError as ve:
+        return jsonify(message=f"Invalid query parameter: {str(ve)}"), 400
+
+    try:
+        match, normalized = client_match_query(query_text)
+        if match is None:
+            return jsonify({"clients": [], "limit": limit}), 200
+        # Correspondances exactes (téléphone, CIN, email) d'abord, puis au plus SEARCH_CANDIDATE_LIMIT
+        # candidats par préfixe (indexés) ; l'ensemble est classé puis tronqué à limit
+        projection = {**CLIENT_SEARCH_PROJECTION, **CLIENT_SEARCH_RANK_FIELDS}
+        exact_query = client_exact_query(normalized)
+        candidates = list(clients_collection().find(exact_query, projection).limit(SEARCH_CANDIDATE_LIMIT)) if exact_query else []
+        seen_ids = {client['_id'] for client in candidates}
+        for client in clients_collection().find(match, projection).limit(SEARCH_CANDIDATE_LIMIT):
+            if client['_id'] not in seen_ids:
+                candidates.append(client)
+        candidates.sort(key=lambda client: (*client_match_rank(client, normalized), str(client.get('lastName', '')),
+                                            str(client.get('firstName', '')), str(client['_id'])))
+        clients_list = []
+        for client in candidates[:limit]:
+            for field in CLIENT_SEARCH_RANK_FIELDS:
+                client.pop(field, None)
+            clients_list.append(mongo_to_dict(client))
+        return jsonify({"clients": clients_list, "limit": limit}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error searching clients: {e}")
+        return jsonify(message="Error searching clients."), 500
+
+# --- GET /export (Export en flux NDJSON ou CSV) ---
+CLIENT_EXPORT_COLUMNS = ['id', 'firstName', 'lastName', 'phone', 'CIN', 'email', 'driverLicenseNumber', 'registeredAt',
+                         'stats.reservationCount', 'stats.totalSpent', 'stats.outstandingBalance', 'stats.lastRentalAt']
+
+def _build_clients_export_filter(args):
+    """Filtre de l'export : fenêtre d'inscription registeredFrom / registeredTo (bornes incluses)."""
+    registered = {}
+    for param, operator in (('registeredFrom', '$gte'), ('registeredTo', '$lte')):
+        if args.get(param):
+            try:
+                registered[operator] = parse_datetime(args[param])
+            except ValueError:
+                raise ValueError(f"Invalid {param} format. Use YYYY-MM-DD or ISO format.")
+    return {'registeredAt': registered} if registered else {}
+
+@clients_bp.route('/export', methods=['GET'])
+@login_required(role="manager")
+def export_clients():
+    try:
+        export_format, batch_size = parse_export_options(request.args)
+        query = _build_clients_export_filter(request.args)
+    except ValueError as ve:
+        return jsonify(message=f"Invalid query parameter: {str(ve)}"), 400
+
+    try:
+        cursor = clients_collection().find(query, CLIENT_PUBLIC_PROJECTION, batch_size=batch_size).sort([('registeredAt', 1), ('_id', 1)])
+        log_action('export_clients', 'client', details={'format': export_format, 'filters': request.args.to_dict()})
+        return export_response(cursor, export_format, CLIENT_EXPORT_COLUMNS, 'clients', batch_size)
+    except Exception as e:
+        current_app.logger.error(f"Error exporting clients: {e}")
+        return jsonify(message="Error exporting clients."), 500
+
 # --- GET /<id> (Récupère UN client) ---
 @clients_bp.route('/<string:client_id>', methods=['GET'])
 @login_required(role="manager") 
+@versioned('clients')
 def get_client_by_id(client_id):
     try:
         oid = ObjectId(client_id)
@@ -33,9 +123,9 @@ def get_client_by_id(client_id):
         return jsonify(message="Invalid client ID format."), 400
 
     try:
-        client_doc = clients_collection().find_one({'_id': oid})
+        client_doc = clients_collection().find_one({'_id': oid}, CLIENT_PUBLIC_PROJECTION)
         if client_doc:
-            return bson_to_json(mongo_to_dict(client_doc)), 200
+            return mongo_to_dict(client_doc), 200
         else:
             return jsonify(message="Client not found."), 404
     except Exception as e:
@@ -45,6 +135,7 @@ def get_client_by_id(client_id):
 # --- POST / (Crée un nouveau client) ---
 @clients_bp.route('', methods=['POST'])
 @login_required(role="manager") 
+@bumps_versions('clients')
 def create_client():
     try:
         data = request.get_json()
@@ -52,16 +143,7 @@ def create_client():
         if not data or not all(field in data for field in required_fields):
             return jsonify(message="Missing required fields: " + ", ".join(required_fields)), 400
 
-        if clients_collection().find_one({'phone': data['phone']}):
-            return jsonify(message=f"Client with phone number '{data['phone']}' already exists."), 409
-        
-        if clients_collection().find_one({'CIN': data['CIN']}):
-            return jsonify(message=f"Client with CIN '{data['CIN']}' already exists."), 409
-
-        if data.get('email'): 
-            if clients_collection().find_one({'email': data['email']}):
-                return jsonify(message=f"Client with email '{data['email']}' already exists."), 409
-
+        # Unicité de phone, CIN et email : garantie par les index uniques (DuplicateKeyError -> 409)
         user_id_from_session = session.get('user_id')
         try:
             registered_by_oid = ObjectId(user_id_from_session) if user_id_from_session else None
@@ -82,15 +164,15 @@ def create_client():
             "updatedAt": None, 
             "updatedBy": None 
         }
+        new_client.update(client_search_fields(new_client))
+        new_client['stats'] = dict(EMPTY_CLIENT_STATS)
 
-        result = clients_collection().insert_one(new_client)
-        if result.inserted_id:
-            log_action('create_client', 'client', entity_id=result.inserted_id, status='success', details={'CIN': data['CIN'], 'name': f"{data['firstName']} {data['lastName']}"})
-            created_client_doc = clients_collection().find_one({'_id': result.inserted_id})
-            return bson_to_json(mongo_to_dict(created_client_doc)), 201
-        else:
-            return jsonify(message="Failed to create client."), 500
+        created_client_doc = insert_and_fetch(clients_collection(), new_client, exclude_fields=CLIENT_INTERNAL_FIELDS)
+        log_action('create_client', 'client', entity_id=created_client_doc['_id'], status='success', details={'CIN': data['CIN'], 'name': f"{data['firstName']} {data['lastName']}"})
+        return mongo_to_dict(created_client_doc), 201
 
+    except DuplicateKeyError as dke:
+        return jsonify(message=duplicate_key_message(dke.details)), 409
     except Exception as e:
         current_app.logger.error(f"Error creating client: {e}")
         return jsonify(message="Error creating client."), 500
@@ -98,6 +180,7 @@ def create_client():
 # --- PUT /<id> (Met à jour UN client) ---
 @clients_bp.route('/<string:client_id>', methods=['PUT'])
 @login_required(role="manager") 
+@bumps_versions('clients')
 def update_client(client_id):
     try:
         oid = ObjectId(client_id)
@@ -116,20 +199,9 @@ def update_client(client_id):
         update_fields = {}
         allowed_updates = ['firstName', 'lastName', 'phone', 'email', 'driverLicenseNumber', 'CIN', 'notes']
         
+        # Unicité de phone, CIN et email : garantie par les index uniques (DuplicateKeyError -> 409)
         for key in allowed_updates:
             if key in data:
-                if key == 'phone' and data[key] != current_client_doc.get('phone'):
-                    if clients_collection().find_one({'phone': data[key], '_id': {'$ne': oid}}):
-                        return jsonify(message=f"Another client with phone '{data[key]}' already exists."), 409
-                elif key == 'CIN' and data[key] != current_client_doc.get('CIN'):
-                    if clients_collection().find_one({'CIN': data[key], '_id': {'$ne': oid}}):
-                        return jsonify(message=f"Another client with CIN '{data[key]}' already exists."), 409
-                elif key == 'email': 
-                    new_email = data.get(key)
-                    current_email = current_client_doc.get(key)
-                    if new_email and new_email != current_email:
-                        if clients_collection().find_one({'email': new_email, '_id': {'$ne': oid}}):
-                            return jsonify(message=f"Another client with email '{new_email}' already exists."), 409
                 update_fields[key] = data[key]
 
         if not update_fields: 
@@ -144,23 +216,73 @@ def update_client(client_id):
 
         update_fields['updatedAt'] = datetime.utcnow()
         update_fields['updatedBy'] = updated_by_oid
+        if any(field in update_fields for field in CLIENT_SEARCH_SOURCE_FIELDS):
+            update_fields.update(client_search_fields({**current_client_doc, **update_fields}))
 
-        result = clients_collection().update_one({'_id': oid}, {'$set': update_fields})
+        updated_client_doc = update_and_fetch(clients_collection(), {'_id': oid}, update_fields, projection=CLIENT_PUBLIC_PROJECTION)
 
-        if result.matched_count:
+        if updated_client_doc:
             log_action('update_client', 'client', entity_id=oid, status='success', details={'updated_fields': list(update_fields.keys())})
-            updated_client_doc = clients_collection().find_one({'_id': oid})
-            return bson_to_json(mongo_to_dict(updated_client_doc)), 200
+            return mongo_to_dict(updated_client_doc), 200
         else:
             return jsonify(message="Client not found."), 404
 
+    except DuplicateKeyError as dke:
+        return jsonify(message=duplicate_key_message(dke.details)), 409
     except Exception as e:
         current_app.logger.error(f"Error updating client {client_id}: {e}")
         return jsonify(message="Error updating client."), 500
 
+# --- GET /<id>/history (Historique des réservations et compteurs du client) ---
+# Tri de l'historique, servi par l'index (clientId, reservationDate, _id)
+CLIENT_HISTORY_SORT = [('reservationDate', -1), ('_id', -1)]
+CLIENT_HISTORY_PROJECTION = {'reservationNumber': 1, 'carId': 1, 'startDate': 1, 'endDate': 1, 'status': 1,
+                             'estimatedTotalCost': 1, 'finalTotalCost': 1, 'paymentDetails': 1, 'reservationDate': 1}
+
+@clients_bp.route('/<string:client_id>/history', methods=['GET'])
+@login_required(role="manager")
+@versioned('clients', 'reservations', 'cars')
+def get_client_history(client_id):
+    try:
+        oid = ObjectId(client_id)
+    except Exception:
+        return jsonify(message="Invalid client ID format."), 400
+    try:
+        limit = parse_page_size(request.args.get('limit'))
+        query = apply_cursor({'clientId': oid}, CLIENT_HISTORY_SORT, request.args.get('cursor'))
+    except ValueError as ve:
+        return jsonify(message=f"Invalid query parameter: {str(ve)}"), 400
+
+    try:
+        # Les compteurs sont tenus à jour par les écritures sur les réservations : aucune agrégation ici
+        client_doc = clients_collection().find_one({'_id': oid}, {'stats': 1})
+        if not client_doc:
+            return jsonify(message="Client not found."), 404
+
+        reservations_cursor = reservations_collection().find(query, CLIENT_HISTORY_PROJECTION).sort(CLIENT_HISTORY_SORT).limit(limit + 1)
+        reservations_list, next_cursor = split_page(list(reservations_cursor), limit, CLIENT_HISTORY_SORT)
+
+        # Marque / modèle / plaque des voitures de la page en une seule requête
+        car_ids = list({res['carId'] for res in reservations_list if res.get('carId')})
+        cars = {car['_id']: car for car in mongo.db.cars.find({'_id': {'$in': car_ids}}, {'make': 1, 'model': 1, 'licensePlate': 1})}
+        for res in reservations_list:
+            car = cars.get(res.get('carId'))
+            res['carDetails'] = {key: car.get(key) for key in ('make', 'model', 'licensePlate')} if car else None
+
+        return jsonify({
+            "stats": client_doc.get('stats') or EMPTY_CLIENT_STATS,
+            "reservations": [mongo_to_dict(res) for res in reservations_list],
+            "nextCursor": next_cursor,
+            "limit": limit
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error fetching history for client {client_id}: {e}")
+        return jsonify(message="Error fetching client history."), 500
+
 # --- DELETE /<id> (Supprime UN client) ---
 @clients_bp.route('/<string:client_id>', methods=['DELETE'])
 @login_required(role="manager") 
+@bumps_versions('clients')
 def delete_client(client_id):
     try:
         oid = ObjectId(client_id)
@@ -180,6 +302,7 @@ def delete_client(client_id):
         result = clients_collection().delete_one({'_id': oid})
 
         if result.deleted_count:
+            mark_written()
             log_action('delete_client', 'client', entity_id=oid, status='success', details={'deleted_CIN': client_to_delete.get('CIN'), 'deleted_name': f"{client_to_delete.get('firstName')} {client_to_delete.get('lastName')}"})
             return '', 204 
         else:
@@ -1,7 +1,7 @@
 from flask import Blueprint, jsonify, current_app, request
 from bson import ObjectId
 from app.extensions import mongo
-from ..utils.helpers import login_required 
+from ..utils.helpers import login_required
 from ..utils.audit_logger import log_action 
 from datetime import datetime, timedelta
 
@@ -41,8 +41,8 @@ def get_manager_dashboard_stats():
                 "$match": {
                     "status": "completed",
                     "actualReturnDate": {
-                        "$gte": start_of_month.isoformat(),
-                        "$lt": end_of_month.isoformat()
+                        "$gte": start_of_month,
+                        "$lt": end_of_month
                     },
                     "finalTotalCost": {"$exists": True, "$type": "number"}
                 }
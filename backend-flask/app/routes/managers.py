@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app, session 
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
 
 # Importer mongo et les helpers
 from ..extensions import mongo
-from ..utils.helpers import mongo_to_dict, bson_to_json, login_required, hash_password
+from ..utils.helpers import mongo_to_dict, login_required, hash_password
+from ..utils.writes import insert_and_fetch, update_and_fetch, duplicate_key_message
+from ..utils.versions import versioned, bumps_versions, mark_written
 
 
 # Créer le Blueprint pour les managers
@@ -16,6 +19,7 @@ users_collection = lambda: mongo.db.users
 # --- GET / (Liste tous les managers) ---
 @managers_bp.route('', methods=['GET'])
 @login_required(role="admin") 
+@versioned('users')
 def get_managers():
     try:
         # Trouve les utilisateurs avec role='manager', exclut le hash du mot de passe
@@ -24,7 +28,7 @@ def get_managers():
             {'password_hash': 0}
         ).sort("username", 1) 
         managers_list = [mongo_to_dict(manager) for manager in managers_cursor]
-        return bson_to_json(managers_list), 200
+        return managers_list, 200
     except Exception as e:
         current_app.logger.error(f"Error fetching managers: {e}")
         return jsonify(message="Error fetching managers."), 500
@@ -32,6 +36,7 @@ def get_managers():
 # --- GET /<id> (Récupère UN manager) ---
 @managers_bp.route('/<string:manager_id>', methods=['GET'])
 @login_required(role="admin") # Seul Admin peut voir un manager
+@versioned('users')
 def get_manager_by_id(manager_id):
     try:
         oid = ObjectId(manager_id)
@@ -45,7 +50,7 @@ def get_manager_by_id(manager_id):
             {'password_hash': 0}
         )
         if manager_doc:
-            return bson_to_json(mongo_to_dict(manager_doc)), 200
+            return mongo_to_dict(manager_doc), 200
         else:
             return jsonify(message="Manager not found."), 404
     except Exception as e:
@@ -55,6 +60,7 @@ def get_manager_by_id(manager_id):
 # --- POST / (Crée un nouveau manager) ---
 @managers_bp.route('', methods=['POST'])
 @login_required(role="admin") # Seul Admin peut créer
+@bumps_versions('users')
 def create_manager():
     try:
         data = request.get_json()
@@ -62,10 +68,7 @@ def create_manager():
         if not data or not all(field in data for field in required_fields):
             return jsonify(message="Missing required fields: username, fullName, password"), 400
 
-        # Vérifier unicité username
-        if users_collection().find_one({'username': data['username']}):
-            return jsonify(message=f"Username '{data['username']}' already exists."), 409
-
+        # Unicité du username : garantie par l'index unique (DuplicateKeyError -> 409)
         # Hacher le mot de passe
         try:
             hashed_pw = hash_password(data['password'])
@@ -84,17 +87,12 @@ def create_manager():
             "updatedAt": None 
         }
 
-        # Insérer dans la collection 'users'
-        result = users_collection().insert_one(new_manager)
-        if result.inserted_id:
-            # Renvoyer le manager créé (sans le hash)
-            created_manager_doc = users_collection().find_one(
-                {'_id': result.inserted_id}, {'password_hash': 0}
-            )
-            return bson_to_json(mongo_to_dict(created_manager_doc)), 201
-        else:
-            return jsonify(message="Failed to create manager."), 500
+        # Insérer dans la collection 'users' et renvoyer le manager créé (sans le hash)
+        created_manager_doc = insert_and_fetch(users_collection(), new_manager, exclude_fields=('password_hash',))
+        return mongo_to_dict(created_manager_doc), 201
 
+    except DuplicateKeyError as dke:
+        return jsonify(message=duplicate_key_message(dke.details)), 409
     except Exception as e:
         current_app.logger.error(f"Error creating manager: {e}")
         return jsonify(message="Error creating manager."), 500
@@ -102,6 +100,7 @@ def create_manager():
 # --- PUT /<id> (Met à jour UN manager) ---
 @managers_bp.route('/<string:manager_id>', methods=['PUT'])
 @login_required(role="admin") 
+@bumps_versions('users')
 def update_manager(manager_id):
     try:
         oid = ObjectId(manager_id)
@@ -120,10 +119,7 @@ def update_manager(manager_id):
         for key in allowed_updates:
             if key in data:
                 if key == 'username':
-                    if data['username']: 
-                        existing = users_collection().find_one({'username': data['username'], '_id': {'$ne': oid}})
-                        if existing:
-                            return jsonify(message=f"Username '{data['username']}' already taken."), 409
+                    if data['username']:
                         update_fields[key] = data[key]
                 elif key == 'password':
                     if data['password']:
@@ -147,16 +143,17 @@ def update_manager(manager_id):
 
         update_fields['updatedAt'] = datetime.utcnow()
 
-        result = users_collection().update_one({'_id': oid, 'role': 'manager'}, {'$set': update_fields})
+        updated_manager_doc = update_and_fetch(
+            users_collection(), {'_id': oid, 'role': 'manager'}, update_fields, projection={'password_hash': 0}
+        )
 
-        if result.matched_count:
-            updated_manager_doc = users_collection().find_one(
-                {'_id': oid}, {'password_hash': 0}
-            )
-            return bson_to_json(mongo_to_dict(updated_manager_doc)), 200
+        if updated_manager_doc:
+            return mongo_to_dict(updated_manager_doc), 200
         else:
             return jsonify(message="Manager not found or user is not a manager."), 404
 
+    except DuplicateKeyError as dke:
+        return jsonify(message=duplicate_key_message(dke.details)), 409
     except Exception as e:
         current_app.logger.error(f"Error updating manager {manager_id}: {e}")
         return jsonify(message="Error updating manager."), 500
@@ -164,6 +161,7 @@ def update_manager(manager_id):
 # --- DELETE /<id> (Supprime UN manager) ---
 @managers_bp.route('/<string:manager_id>', methods=['DELETE'])
 @login_required(role="admin") 
+@bumps_versions('users')
 def delete_manager(manager_id):
     current_user_id_str = session.get('user_id')
     if current_user_id_str == manager_id:
@@ -182,6 +180,7 @@ def delete_manager(manager_id):
         result = users_collection().delete_one({'_id': oid, 'role': 'manager'})
 
         if result.deleted_count:
+            mark_written()
             return '', 204
         else:
             return jsonify(message="Manager not found or user is not a manager."), 404
@@ -0,0 +1,56 @@
+import mimetypes
+import os
+import re
+from flask import Blueprint, Response, request, current_app, send_from_directory, abort
+from werkzeug.security import safe_join
+
+from ..utils.image_store import CAR_IMAGES_URL_PREFIX, upload_folder
+
+# Sert les images des voitures à la place du handler statique par défaut (même URL, règle plus spécifique)
+media_bp = Blueprint('media', __name__)
+
+# Fichiers nommés par leur contenu (image_store) : original 'ab/cd/<sha256>.<ext>' et variantes '<sha256>_w320.webp'
+CONTENT_ADDRESSED_RE = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(?P<variant>_w\d+)?\.[a-z0-9]+$')
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _cache_headers(filename):
+    """ETag et Cache-Control d'un fichier : immuable et ETag fort (le hash) pour les URLs adressées par contenu."""
+    match = CONTENT_ADDRESSED_RE.match(filename)
+    if match:
+        return f"{match['digest']}{match['variant'] or ''}", f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return None, f"public, max-age={current_app.config.get('MEDIA_DEFAULT_MAX_AGE', 3600)}"
+
+
+def _offloaded_response(filename, file_path, etag, cache_control):
+    """Réponse vide déléguant l'envoi du fichier au serveur frontal (nginx X-Accel-Redirect ou X-Sendfile)."""
+    mode = current_app.config.get('MEDIA_SENDFILE')
+    response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    if mode == 'x-accel-redirect':
+        response.headers['X-Accel-Redirect'] = current_app.config.get('MEDIA_X_ACCEL_PREFIX', '/_protected/uploads/cars/') + filename
+    else:
+        response.headers['X-Sendfile'] = file_path
+    response.headers['Cache-Control'] = cache_control
+    if etag:
+        response.set_etag(etag)
+    # Les requêtes conditionnelles sont résolues ici ; le frontal gère les Range
+    return response.make_conditional(request)
+
+
+# --- GET /static/uploads/cars/<fichier> (Images des voitures) ---
+@media_bp.route(f'{CAR_IMAGES_URL_PREFIX}<path:filename>', methods=['GET', 'HEAD'])
+def serve_car_image(filename):
+    root = upload_folder()
+    file_path = safe_join(root, filename)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+
+    etag, cache_control = _cache_headers(filename)
+    if current_app.config.get('MEDIA_SENDFILE') in ('x-accel-redirect', 'x-sendfile'):
+        return _offloaded_response(filename, file_path, etag, cache_control)
+
+    # send_from_directory gère If-None-Match / If-Modified-Since et les requêtes Range (conditional=True)
+    response = send_from_directory(root, filename, conditional=True, etag=etag if etag else True, max_age=None)
+    response.headers['Cache-Control'] = cache_control
+    return response
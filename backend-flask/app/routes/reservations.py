@@ -1,12 +1,25 @@
 from flask import Blueprint, request, jsonify, current_app, session
 from bson import ObjectId
-from datetime import datetime
-import uuid 
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timedelta
 
 # Importer mongo et les helpers
 from ..extensions import mongo
-from ..utils.helpers import mongo_to_dict, bson_to_json, login_required
-from ..utils.audit_logger import log_action 
+from ..utils.helpers import mongo_to_dict, login_required, parse_datetime
+from ..utils.audit_logger import log_action, log_actions
+from ..utils.transactions import run_in_transaction
+from ..utils.sequences import BlockSequence
+from ..utils.writes import insert_and_fetch, update_and_fetch
+from ..utils.pricing import PricingError, get_weekend_multiplier, quote_cost, quote_costs
+from ..utils.pagination import parse_page_size, apply_cursor, split_page
+from ..utils.export import export_response, parse_export_options
+from ..utils.client_stats import RESERVATION_STATS_PROJECTION, apply_reservation_change, apply_reservation_changes
+from ..utils.booking_ledger import (
+    BookingConflictError, SLOT_HOLDING_STATUSES, SLOT_RELEASING_STATUSES,
+    reserve_slots, reserve_slots_many, sync_slots, release_slots, release_slots_many
+)
+from ..utils.versions import versioned, bumps_versions, mark_written
 
 # Créer le Blueprint
 reservations_bp = Blueprint('reservations', __name__)
@@ -17,6 +30,15 @@ cars_collection = lambda: mongo.db.cars
 clients_collection = lambda: mongo.db.clients
 users_collection = lambda: mongo.db.users 
 
+# Numéros de réservation : 'R' + compteur sur 9 chiffres, alloué par blocs sans lecture préalable.
+# Les anciens numéros (10 caractères hexadécimaux) ne contiennent jamais 'R' : pas de collision possible,
+# et l'index unique sur reservationNumber garantit l'unicité.
+_reservation_number_sequence = BlockSequence('reservationNumber', block_size=20)
+
+def _next_reservation_numbers(count=1):
+    """Génère count numéros de réservation uniques."""
+    return [f"R{value:09d}" for value in _reservation_number_sequence.next_values(count)]
+
 # Helper temporaire simple pour user_id
 def _get_user_id():
     try:
@@ -25,11 +47,13 @@ def _get_user_id():
         return ObjectId()
 
 # --- Helper pour validation des dates ---
-def _validate_reservation_dates(start_date_str, end_date_str):
-    """Valide que les dates de réservation sont cohérentes."""
+def _validate_reservation_dates(start_date_value, end_date_value):
+    """Valide que les dates de réservation (chaînes ISO ou datetime) sont cohérentes."""
     try:
-        start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-        end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
+        start_date = parse_datetime(start_date_value)
+        end_date = parse_datetime(end_date_value)
+        if start_date is None or end_date is None:
+            return False, "Start date and end date are required."
         
         if end_date < start_date:
             return False, "End date cannot be before start date."
@@ -39,71 +63,223 @@ def _validate_reservation_dates(start_date_str, end_date_str):
         return False, f"Invalid date format: {str(e)}"
 
 # --- Helper pour calculer le coût estimé ---
-def _calculate_estimated_cost(car_doc, start_date_str, end_date_str):
-    """Calcule le coût estimé basé sur le dailyRate et la durée."""
+def _calculate_estimated_cost(car_doc, start_date_value, end_date_value):
+    """Calcule le coût estimé basé sur le dailyRate et la durée (voir utils/pricing.py)."""
     try:
-        start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-        end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-        
-        # Calculer le nombre de jours (inclus le jour de fin)
-        days = (end_date - start_date).days + 1
-        
-        daily_rate = car_doc.get('dailyRate', 0)
-        if daily_rate <= 0:
-            return None, "Car daily rate is not set or invalid."
-        
-        estimated_cost = days * daily_rate
-        return estimated_cost, None
+        start_date = parse_datetime(start_date_value)
+        end_date = parse_datetime(end_date_value)
+        return quote_cost(car_doc.get('dailyRate', 0), start_date, end_date), None
+    except PricingError as e:
+        return None, str(e)
     except ValueError as e:
         return None, f"Error calculating cost: {str(e)}"
 
-# --- Helper interne pour récupérer les détails ---
-def _get_reservation_details(res_doc):
-    """Récupère et ajoute les détails voiture/client/utilisateur à un document réservation."""
-    if not res_doc:
-        return None
-    res_dict = mongo_to_dict(res_doc)
-    
-    # Détails de la voiture
-    car_doc = cars_collection().find_one({'_id': res_doc.get('carId')}, {'make': 1, 'model': 1, 'licensePlate': 1, 'imageUrl': 1, 'vin': 1, 'status': 1})
-    res_dict['carDetails'] = mongo_to_dict(car_doc) if car_doc else None
-    
-    # Détails du client
-    client_doc = clients_collection().find_one({'_id': res_doc.get('clientId')}, {'firstName': 1, 'lastName': 1, 'email': 1, 'phone': 1})
-    res_dict['clientDetails'] = mongo_to_dict(client_doc) if client_doc else None
-    
-    # Détails de l'utilisateur (créateur)
-    if res_doc.get('createdBy'):
-        user_doc_created = users_collection().find_one({'_id': res_doc.get('createdBy')}, {'username': 1, 'fullName': 1})
-        res_dict['createdByUser'] = mongo_to_dict(user_doc_created) if user_doc_created else None
-    
-    # Détails de l'utilisateur (dernière modification)
-    if res_doc.get('lastModifiedBy'):
-        user_doc_modified = users_collection().find_one({'_id': res_doc.get('lastModifiedBy')}, {'username': 1, 'fullName': 1})
-        res_dict['lastModifiedByUser'] = mongo_to_dict(user_doc_modified) if user_doc_modified else None
-        
-    return res_dict
+# --- Helper pour la réponse en cas de double réservation ---
+def _booking_conflict_response(conflict):
+    """Réponse 409 listant les jours déjà réservés pour la voiture."""
+    return jsonify(message=str(conflict), conflictingDays=[d.strftime('%Y-%m-%d') for d in conflict.conflicting_days]), 409
 
-# --- GET / (Liste toutes les réservations) ---
+def _restore_slots(reservation):
+    """Remet le registre dans l'état de la réservation donnée après un échec d'écriture."""
+    try:
+        sync_slots(reservation['_id'], reservation.get('carId'), reservation.get('startDate'), reservation.get('endDate'))
+    except Exception as e:
+        current_app.logger.error(f"Error restoring booking slots for reservation {reservation['_id']}: {e}")
+
+# --- Helpers internes pour récupérer les détails (pipeline d'agrégation) ---
+# Projections des documents liés, identiques à celles de l'ancien enrichissement ligne par ligne
+CAR_DETAILS_PROJECTION = {'make': 1, 'model': 1, 'licensePlate': 1, 'imageUrl': 1, 'vin': 1, 'status': 1}
+CLIENT_DETAILS_PROJECTION = {'firstName': 1, 'lastName': 1, 'email': 1, 'phone': 1}
+USER_DETAILS_PROJECTION = {'username': 1, 'fullName': 1}
+
+def _lookup_stage(from_collection, local_field, projection, as_field):
+    """Construit un $lookup sur _id qui ne ramène que les champs projetés (et _id renommé en id)."""
+    return {
+        '$lookup': {
+            'from': from_collection,
+            'localField': local_field,
+            'foreignField': '_id',
+            'pipeline': [{'$project': {**projection, 'id': '$_id', '_id': 0}}],
+            'as': as_field
+        }
+    }
+
+def _first_or_none(field):
+    """Expression renvoyant le premier élément du tableau issu du $lookup, ou None."""
+    return {'$ifNull': [{'$arrayElemAt': [f'${field}', 0]}, None]}
+
+def _first_or_remove(field, source_field):
+    """Comme _first_or_none, mais retire le champ si la référence source est vide."""
+    return {'$cond': [{'$ifNull': [f'${source_field}', False]}, _first_or_none(field), '$$REMOVE']}
+
+def _reservation_details_stages():
+    """Étapes d'enrichissement voiture/client/utilisateurs d'une réservation, en une seule requête."""
+    return [
+        _lookup_stage('cars', 'carId', CAR_DETAILS_PROJECTION, 'carDetails'),
+        _lookup_stage('clients', 'clientId', CLIENT_DETAILS_PROJECTION, 'clientDetails'),
+        _lookup_stage('users', 'createdBy', USER_DETAILS_PROJECTION, 'createdByUser'),
+        _lookup_stage('users', 'lastModifiedBy', USER_DETAILS_PROJECTION, 'lastModifiedByUser'),
+        {
+            '$addFields': {
+                'id': '$_id',
+                'carDetails': _first_or_none('carDetails'),
+                'clientDetails': _first_or_none('clientDetails'),
+                'createdByUser': _first_or_remove('createdByUser', 'createdBy'),
+                'lastModifiedByUser': _first_or_remove('lastModifiedByUser', 'lastModifiedBy')
+            }
+        },
+        {'$project': {'_id': 0}}
+    ]
+
+def _find_reservations_with_details(query, sort=None, limit=None):
+    """Renvoie les réservations correspondant à la requête, enrichies via un seul aggregate()."""
+    pipeline = [{'$match': query}]
+    if sort:
+        pipeline.append({'$sort': sort})
+    if limit:
+        pipeline.append({'$limit': limit})
+    pipeline.extend(_reservation_details_stages())
+    return list(reservations_collection().aggregate(pipeline))
+
+def _get_reservation_details(reservation_oid):
+    """Récupère UNE réservation enrichie des détails voiture/client/utilisateur, ou None."""
+    results = _find_reservations_with_details({'_id': reservation_oid}, limit=1)
+    return results[0] if results else None
+
+# Tri du listing paginé : réservation la plus récente d'abord, _id pour départager (keyset)
+RESERVATION_LIST_SORT = [('reservationDate', -1), ('_id', -1)]
+
+def _parse_window_date(value, param_name):
+    """Convertit un paramètre de fenêtre (YYYY-MM-DD ou ISO) en datetime à minuit."""
+    try:
+        return parse_datetime(value).replace(hour=0, minute=0, second=0, microsecond=0)
+    except ValueError:
+        raise ValueError(f"Invalid {param_name} format. Use YYYY-MM-DD or ISO format.")
+
+def _build_reservations_filter(args):
+    """Construit le filtre du listing (status, carId, clientId, fenêtre startDate/endDate)."""
+    query = {}
+
+    status = args.get('status')
+    if status:
+        statuses = [s for s in status.split(',') if s]
+        query['status'] = statuses[0] if len(statuses) == 1 else {'$in': statuses}
+
+    for param in ('carId', 'clientId'):
+        if args.get(param):
+            try:
+                query[param] = ObjectId(args[param])
+            except Exception:
+                raise ValueError(f"Invalid {param} format.")
+
+    # Fenêtre de dates : réservations dont la période chevauche [startDate, endDate]
+    window_start = args.get('startDate')
+    window_end = args.get('endDate')
+    if window_start:
+        query['endDate'] = {'$gte': _parse_window_date(window_start, 'startDate')}
+    if window_end:
+        query['startDate'] = {'$lt': _parse_window_date(window_end, 'endDate') + timedelta(days=1)}
+
+    return query
+
+# --- Helper pour construire le document d'une nouvelle réservation ---
+def _new_reservation_document(reservation_oid, reservation_number, car_oid, client_oid, start_date, end_date,
+                              estimated_cost, data, created_by_oid):
+    """Construit le document à insérer pour une nouvelle réservation à partir des données validées."""
+    payment_data = data.get('paymentDetails') or {}
+    amount_paid = float(payment_data.get('amountPaid', 0.0))
+    now = datetime.utcnow()
+    return {
+        "_id": reservation_oid,
+        "reservationNumber": reservation_number,
+        "carId": car_oid,
+        "clientId": client_oid,
+        "startDate": start_date,
+        "endDate": end_date,
+        "actualPickupDate": None,
+        "actualReturnDate": None,
+        "status": data.get('status', 'pending_confirmation'),
+        "estimatedTotalCost": estimated_cost,
+        "finalTotalCost": None, 
+        "notes": data.get('notes', ''),
+        "reservationDate": now,
+        "createdBy": created_by_oid,
+        "lastModifiedAt": now,
+        "lastModifiedBy": created_by_oid,
+        "paymentDetails": {
+            "amountPaid": amount_paid,
+            "remainingBalance": estimated_cost - amount_paid,
+            "transactionDate": parse_datetime(payment_data.get('transactionDate'))
+        }
+    }
+
+# --- GET / (Liste paginée des réservations) ---
 @reservations_bp.route('', methods=['GET'])
 @login_required(role="manager") 
+@versioned('reservations', 'cars', 'clients', 'users')
 def get_reservations():
     try:
-        reservations_list = []
-        # Trier par date de réservation la plus récente
-        reservations_cursor = reservations_collection().find().sort("reservationDate", -1)
-        for res in reservations_cursor:
-            details = _get_reservation_details(res)
-            if details:
-                reservations_list.append(details)
-        return bson_to_json(reservations_list), 200
+        limit = parse_page_size(request.args.get('limit'))
+        query = _build_reservations_filter(request.args)
+        query = apply_cursor(query, RESERVATION_LIST_SORT, request.args.get('cursor'))
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+
+    try:
+        # Récupérer limit + 1 éléments pour savoir s'il existe une page suivante
+        reservations_list = _find_reservations_with_details(query, sort=dict(RESERVATION_LIST_SORT), limit=limit + 1)
+        reservations_list, next_cursor = split_page(reservations_list, limit, RESERVATION_LIST_SORT)
+        return jsonify({
+            "reservations": reservations_list,
+            "nextCursor": next_cursor,
+            "limit": limit
+        }), 200
     except Exception as e:
         current_app.logger.error(f"Error fetching reservations: {e}")
         return jsonify(message="Error fetching reservations."), 500
 
+# --- GET /export (Export en flux NDJSON ou CSV, mêmes filtres que le listing) ---
+RESERVATION_EXPORT_COLUMNS = ['id', 'reservationNumber', 'status', 'reservationDate', 'startDate', 'endDate',
+                              'actualPickupDate', 'actualReturnDate', 'carId', 'car.licensePlate', 'car.make', 'car.model',
+                              'clientId', 'client.firstName', 'client.lastName', 'client.CIN', 'estimatedTotalCost',
+                              'finalTotalCost', 'paymentDetails.amountPaid', 'paymentDetails.remainingBalance',
+                              'paymentDetails.transactionDate']
+
+def _attach_export_details(batch):
+    """Ajoute voiture et client à un lot de réservations exportées (une requête $in par collection et par lot)."""
+    car_ids = list({res['carId'] for res in batch if res.get('carId')})
+    client_ids = list({res['clientId'] for res in batch if res.get('clientId')})
+    cars = {car['_id']: car for car in cars_collection().find({'_id': {'$in': car_ids}}, {'licensePlate': 1, 'make': 1, 'model': 1})}
+    clients = {client['_id']: client for client in clients_collection().find({'_id': {'$in': client_ids}}, {'firstName': 1, 'lastName': 1, 'CIN': 1})}
+    for res in batch:
+        car = cars.get(res.get('carId'))
+        client = clients.get(res.get('clientId'))
+        res['car'] = {key: car.get(key) for key in ('licensePlate', 'make', 'model')} if car else None
+        res['client'] = {key: client.get(key) for key in ('firstName', 'lastName', 'CIN')} if client else None
+    return batch
+
+@reservations_bp.route('/export', methods=['GET'])
+@login_required(role="manager")
+def export_reservations():
+    try:
+        export_format, batch_size = parse_export_options(request.args)
+        query = _build_reservations_filter(request.args)
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+
+    try:
+        cursor = reservations_collection().find(query, batch_size=batch_size).sort(RESERVATION_LIST_SORT)
+        log_action('export_reservations', 'reservation', details={'format': export_format, 'filters': request.args.to_dict()})
+        return export_response(cursor, export_format, RESERVATION_EXPORT_COLUMNS, 'reservations', batch_size,
+                               transform=_attach_export_details)
+    except Exception as e:
+        current_app.logger.error(f"Error exporting reservations: {e}")
+        return jsonify(message="Error exporting reservations."), 500
+
 # --- GET /<id> (Récupère UNE réservation) ---
 @reservations_bp.route('/<string:reservation_id>', methods=['GET'])
 @login_required(role="manager") 
+@versioned('reservations', 'cars', 'clients', 'users')
 def get_reservation_by_id(reservation_id):
     try:
         oid = ObjectId(reservation_id)
@@ -111,10 +287,9 @@ def get_reservation_by_id(reservation_id):
         return jsonify(message="Invalid reservation ID format."), 400
 
     try:
-        reservation_doc = reservations_collection().find_one({'_id': oid})
-        if reservation_doc:
-            details = _get_reservation_details(reservation_doc)
-            return bson_to_json(details), 200
+        details = _get_reservation_details(oid)
+        if details:
+            return details, 200
         else:
             return jsonify(message="Reservation not found."), 404
     except Exception as e:
@@ -124,6 +299,7 @@ def get_reservation_by_id(reservation_id):
 # --- POST / (Crée une nouvelle réservation) ---
 @reservations_bp.route('', methods=['POST'])
 @login_required(role="manager") 
+@bumps_versions('reservations', 'clients')
 def create_reservation():
     data = request.get_json()
     try:
@@ -136,20 +312,23 @@ def create_reservation():
         is_valid, date_error = _validate_reservation_dates(data['startDate'], data['endDate'])
         if not is_valid:
             return jsonify(message=date_error), 400
+        # Les dates sont stockées en BSON Date natif (datetime UTC)
+        start_date = parse_datetime(data['startDate'])
+        end_date = parse_datetime(data['endDate'])
 
         car_oid = ObjectId(data['carId'])
         client_oid = ObjectId(data['clientId'])
         created_by_oid = _get_user_id()
 
-        car = cars_collection().find_one({'_id': car_oid})
-        client = clients_collection().find_one({'_id': client_oid})
+        car = cars_collection().find_one({'_id': car_oid}, {'dailyRate': 1})
+        client = clients_collection().find_one({'_id': client_oid}, {'_id': 1})
         if not car: 
             return jsonify(message="Car not found."), 404
         if not client: 
             return jsonify(message="Client not found."), 404
 
         # Calcul automatique du coût estimé
-        estimated_cost, cost_error = _calculate_estimated_cost(car, data['startDate'], data['endDate'])
+        estimated_cost, cost_error = _calculate_estimated_cost(car, start_date, end_date)
         if estimated_cost is None:
             return jsonify(message=cost_error), 400
 
@@ -159,44 +338,34 @@ def create_reservation():
             if provided_cost > 0:
                 estimated_cost = provided_cost
 
-        reservation_number = uuid.uuid4().hex[:10].upper()
-        while reservations_collection().find_one({"reservationNumber": reservation_number}):
-            reservation_number = uuid.uuid4().hex[:10].upper()
-
-        amount_paid = float(data.get('paymentDetails', {}).get('amountPaid', 0.0))
-
-        new_reservation = {
-            "reservationNumber": reservation_number,
-            "carId": car_oid,
-            "clientId": client_oid,
-            "startDate": data['startDate'],
-            "endDate": data['endDate'],
-            "actualPickupDate": None,
-            "actualReturnDate": None,
-            "status": data.get('status', 'pending_confirmation'),
-            "estimatedTotalCost": estimated_cost,
-            "finalTotalCost": None, 
-            "notes": data.get('notes', ''),
-            "reservationDate": datetime.utcnow(),
-            "createdBy": created_by_oid,
-            "lastModifiedAt": datetime.utcnow(),
-            "lastModifiedBy": created_by_oid,
-            "paymentDetails": {
-                "amountPaid": amount_paid,
-                "remainingBalance": estimated_cost - amount_paid,
-                "transactionDate": data.get('paymentDetails', {}).get('transactionDate') 
-            }
-        }
-
-        # Insérer
-        result = reservations_collection().insert_one(new_reservation)
-        if result.inserted_id:
-             log_action('create_reservation', 'reservation', entity_id=result.inserted_id, status='success', details={'reservationNumber': reservation_number, 'carId': str(car_oid), 'clientId': str(client_oid)})
-             created_res_doc = reservations_collection().find_one({'_id': result.inserted_id})
-             details = _get_reservation_details(created_res_doc) 
-             return bson_to_json(details), 201 
-        else:
-             return jsonify(message="Failed to create reservation."), 500
+        reservation_number = _next_reservation_numbers()[0]
+
+        status = data.get('status', 'pending_confirmation')
+
+        # Occuper les jours dans le registre avant l'insertion : échoue atomiquement en cas de chevauchement
+        reservation_oid = ObjectId()
+        if status in SLOT_HOLDING_STATUSES:
+            try:
+                reserve_slots(reservation_oid, car_oid, start_date, end_date)
+            except BookingConflictError as bce:
+                return _booking_conflict_response(bce)
+
+        new_reservation = _new_reservation_document(
+            reservation_oid, reservation_number, car_oid, client_oid, start_date, end_date,
+            estimated_cost, data, created_by_oid
+        )
+
+        # Insérer (en libérant les jours occupés si l'insertion échoue)
+        try:
+            created_reservation = insert_and_fetch(reservations_collection(), new_reservation)
+        except Exception:
+            release_slots(reservation_oid)
+            raise
+        apply_reservation_change(None, created_reservation)
+        log_action('create_reservation', 'reservation', entity_id=reservation_oid, status='success', details={'reservationNumber': reservation_number, 'carId': str(car_oid), 'clientId': str(client_oid)})
+        # Réponse enrichie (carDetails, clientDetails...) comme le détail, en un seul aggregate()
+        details = _get_reservation_details(reservation_oid)
+        return (details or mongo_to_dict(created_reservation)), 201 
 
     except (ValueError, TypeError) as ve:
         return jsonify(message=f"Invalid data type or format: {str(ve)}."), 400
@@ -204,9 +373,283 @@ def create_reservation():
         current_app.logger.error(f"Error creating reservation: {e}")
         return jsonify(message="Error creating reservation."), 500
 
+# --- POST /bulk (Crée plusieurs réservations en une requête) ---
+MAX_BULK_RESERVATIONS = 500
+
+def _parse_bulk_item(item):
+    """Valide un élément du lot (champs requis, dates, identifiants) sans accès à la base."""
+    if not isinstance(item, dict):
+        raise ValueError("Each reservation must be an object.")
+    required_fields = ['carId', 'clientId', 'startDate', 'endDate']
+    missing = [field for field in required_fields if field not in item]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    is_valid, date_error = _validate_reservation_dates(item['startDate'], item['endDate'])
+    if not is_valid:
+        raise ValueError(date_error)
+    try:
+        car_oid = ObjectId(item['carId'])
+        client_oid = ObjectId(item['clientId'])
+    except Exception:
+        raise ValueError("Invalid carId or clientId format.")
+    return {
+        'data': item,
+        'carId': car_oid,
+        'clientId': client_oid,
+        'startDate': parse_datetime(item['startDate']),
+        'endDate': parse_datetime(item['endDate']),
+    }
+
+@reservations_bp.route('/bulk', methods=['POST'])
+@login_required(role="manager")
+@bumps_versions('reservations', 'clients')
+def create_reservations_bulk():
+    data = request.get_json(silent=True)
+    items = data.get('reservations') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify(message="Request body must contain a non-empty 'reservations' list."), 400
+    if len(items) > MAX_BULK_RESERVATIONS:
+        return jsonify(message=f"Too many reservations in one request (max {MAX_BULK_RESERVATIONS})."), 400
+    # ordered=true : le premier échec interrompt le traitement des éléments suivants
+    ordered = bool(data.get('ordered', False))
+
+    results = [None] * len(items)
+    pending = {}
+    reserved_ids = {}
+
+    def fail(index, message, code):
+        results[index] = {'index': index, 'status': 'error', 'code': code, 'message': message}
+        pending.pop(index, None)
+
+    def skip_after_first_failure():
+        failed = [i for i, result in enumerate(results) if result is not None]
+        if ordered and failed:
+            for index in [i for i in pending if i > failed[0]]:
+                fail(index, "Skipped because a previous reservation failed (ordered mode).", 424)
+
+    try:
+        created_by_oid = _get_user_id()
+
+        # 1. Validation locale de chaque élément
+        for index, item in enumerate(items):
+            try:
+                pending[index] = _parse_bulk_item(item)
+            except ValueError as ve:
+                fail(index, str(ve), 400)
+
+        # 2. Recherches ensemblistes des voitures et clients ($in)
+        car_ids = list({entry['carId'] for entry in pending.values()})
+        client_ids = list({entry['clientId'] for entry in pending.values()})
+        cars = {car['_id']: car for car in cars_collection().find({'_id': {'$in': car_ids}}, {'dailyRate': 1})}
+        existing_client_ids = {client['_id'] for client in clients_collection().find({'_id': {'$in': client_ids}}, {'_id': 1})}
+
+        # 3. Calcul des coûts en une passe (vectorisée, voir utils/pricing.py)
+        priced = []
+        for index, entry in list(pending.items()):
+            car = cars.get(entry['carId'])
+            if not car:
+                fail(index, "Car not found.", 404)
+            elif entry['clientId'] not in existing_client_ids:
+                fail(index, "Client not found.", 404)
+            elif not car.get('dailyRate') or car['dailyRate'] <= 0:
+                fail(index, "Car daily rate is not set or invalid.", 400)
+            else:
+                priced.append((index, entry, car['dailyRate']))
+        quotes = quote_costs(
+            [rate for _, _, rate in priced],
+            [entry['startDate'] for _, entry, _ in priced],
+            [entry['endDate'] for _, entry, _ in priced]
+        )
+        for (index, entry, _), (_, _, estimated_cost) in zip(priced, quotes):
+            try:
+                if 'estimatedTotalCost' in entry['data'] and float(entry['data']['estimatedTotalCost']) > 0:
+                    estimated_cost = float(entry['data']['estimatedTotalCost'])
+                entry['document'] = _new_reservation_document(
+                    ObjectId(), None, entry['carId'], entry['clientId'], entry['startDate'], entry['endDate'],
+                    estimated_cost, entry['data'], created_by_oid
+                )
+            except (ValueError, TypeError) as ve:
+                fail(index, f"Invalid data type or format: {str(ve)}.", 400)
+        skip_after_first_failure()
+
+        # 4. Numéros de réservation et registre des jours (un seul insert_many pour tout le lot)
+        for entry, number in zip(pending.values(), _next_reservation_numbers(len(pending))):
+            entry['document']['reservationNumber'] = number
+        conflicts = reserve_slots_many([
+            (doc['_id'], doc['carId'], doc['startDate'], doc['endDate'])
+            for doc in (entry['document'] for entry in pending.values())
+            if doc['status'] in SLOT_HOLDING_STATUSES
+        ])
+        for index, entry in list(pending.items()):
+            days = conflicts.get(entry['document']['_id'])
+            if days:
+                fail(index, str(BookingConflictError(entry['carId'], days)), 409)
+        reserved_ids = {index: entry['document']['_id'] for index, entry in pending.items()}
+        skip_after_first_failure()
+        release_slots_many([oid for index, oid in reserved_ids.items() if index not in pending])
+
+        # 5. Insertion groupée
+        indexes = sorted(pending)
+        documents = [pending[index]['document'] for index in indexes]
+        if documents:
+            try:
+                reservations_collection().insert_many(documents, ordered=ordered)
+                mark_written()
+            except BulkWriteError as bwe:
+                if bwe.details.get('nInserted'):
+                    mark_written()
+                write_errors = bwe.details.get('writeErrors', [])
+                failed_positions = {err['index'] for err in write_errors}
+                first_failure = min(failed_positions) if failed_positions else len(documents)
+                not_inserted = []
+                for position, index in enumerate(indexes):
+                    if position in failed_positions:
+                        fail(index, "Failed to insert reservation.", 500)
+                    elif ordered and position > first_failure:
+                        fail(index, "Skipped because a previous reservation failed (ordered mode).", 424)
+                    else:
+                        continue
+                    not_inserted.append(documents[position]['_id'])
+                release_slots_many(not_inserted)
+        reserved_ids = {}
+
+        # 6. Compteurs des clients et journal d'audit, chacun en un seul lot
+        apply_reservation_changes([(None, entry['document']) for entry in pending.values()])
+        log_actions([
+            {
+                'action': 'create_reservation', 'entity_type': 'reservation', 'entity_id': entry['document']['_id'],
+                'details': {'reservationNumber': entry['document']['reservationNumber'], 'carId': str(entry['carId']),
+                            'clientId': str(entry['clientId']), 'bulk': True}
+            }
+            for entry in pending.values()
+        ])
+
+        for index, entry in pending.items():
+            doc = entry['document']
+            results[index] = {
+                'index': index,
+                'status': 'created',
+                'id': str(doc['_id']),
+                'reservationNumber': doc['reservationNumber'],
+                'estimatedTotalCost': doc['estimatedTotalCost']
+            }
+
+        created_count = len(pending)
+        summary = {'created': created_count, 'failed': len(items) - created_count, 'results': results}
+        if created_count == len(items):
+            return jsonify(summary), 201
+        return jsonify(summary), (207 if created_count else 400)
+
+    except Exception as e:
+        current_app.logger.error(f"Error creating reservations in bulk: {e}")
+        try:
+            release_slots_many(list(reserved_ids.values()))
+        except Exception as release_e:
+            current_app.logger.error(f"Error releasing booking slots after bulk failure: {release_e}")
+        return jsonify(message="Error creating reservations in bulk."), 500
+
+# --- POST /quote (Devis de plusieurs locations en une passe) ---
+MAX_QUOTE_ITEMS = 1000
+
+def _parse_quote_request(data):
+    """
+    Convertit le corps de la requête en liste de (carId, début, fin).
+
+    Deux formes acceptées :
+      - {"items": [{"carId", "startDate", "endDate"}, ...]}
+      - {"startDate", "endDate", "carIds": [...]} (carIds omis : toute la flotte)
+    Renvoie (demandes, None) pour la forme 'items', ou (None, (début, fin, carIds ou None)) sinon.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object.")
+    if 'items' in data:
+        items = data['items']
+        if not isinstance(items, list) or not items:
+            raise ValueError("'items' must be a non-empty list.")
+        if len(items) > MAX_QUOTE_ITEMS:
+            raise ValueError(f"Too many items in one request (max {MAX_QUOTE_ITEMS}).")
+        requests_list = []
+        for item in items:
+            if not isinstance(item, dict) or not all(field in item for field in ('carId', 'startDate', 'endDate')):
+                raise ValueError("Each item must contain carId, startDate and endDate.")
+            is_valid, date_error = _validate_reservation_dates(item['startDate'], item['endDate'])
+            if not is_valid:
+                raise ValueError(date_error)
+            requests_list.append((ObjectId(item['carId']), parse_datetime(item['startDate']), parse_datetime(item['endDate'])))
+        return requests_list, None
+
+    is_valid, date_error = _validate_reservation_dates(data.get('startDate'), data.get('endDate'))
+    if not is_valid:
+        raise ValueError(date_error)
+    car_ids = data.get('carIds')
+    if car_ids is not None:
+        if not isinstance(car_ids, list):
+            raise ValueError("'carIds' must be a list.")
+        car_ids = [ObjectId(car_id) for car_id in car_ids]
+    return None, (parse_datetime(data['startDate']), parse_datetime(data['endDate']), car_ids)
+
+@reservations_bp.route('/quote', methods=['POST'])
+@login_required(role="manager")
+def quote_reservations():
+    try:
+        requests_list, fleet_range = _parse_quote_request(request.get_json(silent=True))
+    except InvalidId:
+        return jsonify(message="Invalid car ID format."), 400
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+
+    try:
+        # Une seule requête pour les tarifs de toutes les voitures concernées
+        if requests_list is not None:
+            car_ids = list({car_id for car_id, _, _ in requests_list})
+            rates = {car['_id']: car.get('dailyRate') for car in cars_collection().find({'_id': {'$in': car_ids}}, {'dailyRate': 1})}
+        else:
+            start_date, end_date, car_ids = fleet_range
+            query = {'dailyRate': {'$gt': 0}}
+            if car_ids is not None:
+                query['_id'] = {'$in': car_ids}
+            rates = {car['_id']: car['dailyRate'] for car in cars_collection().find(query, {'dailyRate': 1})}
+            requests_list = [(car_id, start_date, end_date) for car_id in rates]
+
+        priced, errors = [], []
+        for index, (car_id, start_date, end_date) in enumerate(requests_list):
+            rate = rates.get(car_id)
+            if car_id not in rates:
+                errors.append({'index': index, 'carId': str(car_id), 'message': "Car not found."})
+            elif not rate or rate <= 0:
+                errors.append({'index': index, 'carId': str(car_id), 'message': "Car daily rate is not set or invalid."})
+            else:
+                priced.append((car_id, start_date, end_date, rate))
+
+        weekend_multiplier = get_weekend_multiplier()
+        results = quote_costs(
+            [rate for _, _, _, rate in priced],
+            [start for _, start, _, _ in priced],
+            [end for _, _, end, _ in priced],
+            weekend_multiplier
+        )
+        quotes = [
+            {
+                'carId': str(car_id),
+                'startDate': start_date.isoformat(),
+                'endDate': end_date.isoformat(),
+                'dailyRate': rate,
+                'days': days,
+                'weekendDays': weekend_days,
+                'estimatedTotalCost': cost
+            }
+            for (car_id, start_date, end_date, rate), (days, weekend_days, cost) in zip(priced, results)
+        ]
+        return jsonify({'quotes': quotes, 'errors': errors, 'weekendMultiplier': weekend_multiplier}), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Error computing reservation quotes: {e}")
+        return jsonify(message="Error computing reservation quotes."), 500
+
 # --- PUT /<id> (Met à jour UNE réservation) ---
 @reservations_bp.route('/<string:reservation_id>', methods=['PUT'])
 @login_required(role="manager") 
+@bumps_versions('reservations', 'clients')
 def update_reservation(reservation_id):
     data = request.get_json()
     try:
@@ -231,6 +674,8 @@ def update_reservation(reservation_id):
             is_valid, date_error = _validate_reservation_dates(start_date, end_date)
             if not is_valid:
                 return jsonify(message=date_error), 400
+        start_date = parse_datetime(start_date)
+        end_date = parse_datetime(end_date)
 
         update_fields = {}
         # Champs modifiables directement via cette route.
@@ -251,14 +696,14 @@ def update_reservation(reservation_id):
                  elif key == 'estimatedTotalCost':
                      update_fields[key] = float(data[key])
                  elif key in ['startDate', 'endDate']:
-                     update_fields[key] = data[key]
+                     update_fields[key] = parse_datetime(data[key])
                      should_recalculate_cost = True
                  else:
                      update_fields[key] = data[key]
         
         # Recalcul du coût estimé si nécessaire
         if should_recalculate_cost and 'estimatedTotalCost' not in data:
-            car_doc = cars_collection().find_one({'_id': ObjectId(new_car_id)})
+            car_doc = cars_collection().find_one({'_id': ObjectId(new_car_id)}, {'dailyRate': 1})
             if car_doc:
                 estimated_cost, cost_error = _calculate_estimated_cost(car_doc, start_date, end_date)
                 if estimated_cost is not None:
@@ -276,7 +721,7 @@ def update_reservation(reservation_id):
             payment_changed = True
         
         if 'transactionDate' in payment_details_update: # Peut être None pour effacer
-            new_payment_details['transactionDate'] = payment_details_update['transactionDate']
+            new_payment_details['transactionDate'] = parse_datetime(payment_details_update['transactionDate'])
             payment_changed = True
 
         # Recalculer remainingBalance si amountPaid ou estimatedTotalCost a changé
@@ -291,18 +736,33 @@ def update_reservation(reservation_id):
         if not update_fields: 
             return jsonify(message="No valid fields provided for update."), 400
 
+        # Réaligner les jours occupés dans le registre si la voiture ou les dates changent
+        slots_changed = (existing_reservation.get('status') in SLOT_HOLDING_STATUSES
+                         and any(key in update_fields for key in ('carId', 'startDate', 'endDate')))
+        if slots_changed:
+            try:
+                sync_slots(oid, update_fields.get('carId', existing_reservation.get('carId')), start_date, end_date)
+            except BookingConflictError as bce:
+                return _booking_conflict_response(bce)
+
         # Mettre à jour les timestamps de modification
         update_fields['lastModifiedAt'] = datetime.utcnow()
         update_fields['lastModifiedBy'] = modified_by_oid
 
-        result = reservations_collection().update_one({'_id': oid}, {'$set': update_fields})
+        try:
+            updated_reservation = update_and_fetch(reservations_collection(), {'_id': oid}, update_fields)
+        except Exception:
+            if slots_changed:
+                _restore_slots(existing_reservation)
+            raise
 
-        if result.matched_count:
+        if updated_reservation:
+            apply_reservation_change(existing_reservation, updated_reservation)
             log_action('update_reservation', 'reservation', entity_id=oid, status='success', details={'updated_fields': list(update_fields.keys())})
-            updated_res_doc = reservations_collection().find_one({'_id': oid})
-            details = _get_reservation_details(updated_res_doc)
-            return bson_to_json(details), 200
+            details = _get_reservation_details(oid)
+            return (details or mongo_to_dict(updated_reservation)), 200
         else:
+            release_slots(oid)
             return jsonify(message="Reservation not found during update."), 404
 
     except (ValueError, TypeError) as ve:
@@ -312,8 +772,103 @@ def update_reservation(reservation_id):
         return jsonify(message="Error updating reservation."), 500
 
 # --- PUT /<id>/status (Met à jour SEULEMENT le statut) ---
+VALID_RESERVATION_STATUSES = ["pending_confirmation", "confirmed", "active", "completed", "cancelled_by_client", "cancelled_by_agency", "no_show"]
+
+def _apply_status_transition(oid, new_status, data, modified_by_oid, session=None):
+    """
+    Applique une transition de statut : réservation, statut de la voiture, registre des jours
+    et journal d'audit. Conçu pour s'exécuter dans une transaction (session) ; renvoie
+    le document mis à jour, ou None si la réservation n'existe pas.
+    """
+    reservation = reservations_collection().find_one({'_id': oid}, session=session)
+    if not reservation:
+        return None
+
+    now = datetime.utcnow()
+    car_oid = reservation.get('carId')
+    update_data = {
+        'status': new_status,
+        'lastModifiedAt': now,
+        'lastModifiedBy': modified_by_oid
+    }
+    action_details = {'old_status': reservation.get('status'), 'new_status': new_status, 'carId': str(car_oid)}
+    car_status_change = None  # (filtre, nouveau statut, raison)
+
+    # Une réservation annulée remise en vigueur doit d'abord récupérer ses jours dans le registre
+    if new_status in SLOT_HOLDING_STATUSES and reservation.get('status') not in SLOT_HOLDING_STATUSES:
+        sync_slots(oid, car_oid, reservation.get('startDate'), reservation.get('endDate'), session=session)
+
+    if new_status == 'active':
+        update_data['actualPickupDate'] = now
+        car_status_change = ({'_id': car_oid}, 'rented', f'Reservation {reservation.get("reservationNumber")} active')
+    elif new_status == 'completed':
+        update_data['actualReturnDate'] = now
+        car_status_change = ({'_id': car_oid}, 'available', f'Reservation {reservation.get("reservationNumber")} completed')
+        
+        # Gérer le coût final
+        if 'finalTotalCost' in data: 
+            update_data['finalTotalCost'] = float(data['finalTotalCost'])
+        else: 
+            update_data['finalTotalCost'] = reservation.get('estimatedTotalCost')
+        
+        # Mettre à jour les détails de paiement avec les nouvelles informations
+        current_payment_details = reservation.get('paymentDetails', {})
+        
+        # Les nouveaux détails de paiement peuvent être envoyés dans les données
+        if 'paymentDetails' in data:
+            payment_update = data['paymentDetails']
+            new_amount_paid = float(payment_update.get('amountPaid', current_payment_details.get('amountPaid', 0.0)))
+            new_transaction_date = parse_datetime(payment_update.get('transactionDate', current_payment_details.get('transactionDate')))
+            
+            update_data['paymentDetails'] = {
+                'amountPaid': new_amount_paid,
+                'remainingBalance': update_data['finalTotalCost'] - new_amount_paid,
+                'transactionDate': new_transaction_date
+            }
+        else:
+            # Utiliser les détails existants mais recalculer le solde
+            amount_paid = current_payment_details.get('amountPaid', 0.0)
+            update_data['paymentDetails.remainingBalance'] = update_data['finalTotalCost'] - amount_paid
+        
+        # Ajouter les notes de completion si fournies
+        if 'completionNotes' in data:
+            update_data['notes'] = data['completionNotes']
+        
+        action_details['finalTotalCost'] = update_data['finalTotalCost']
+
+    elif new_status in SLOT_RELEASING_STATUSES:
+        # Filtre conditionnel : la voiture n'est libérée que si elle n'est ni disponible ni en maintenance
+        car_status_change = ({'_id': car_oid, 'status': {'$nin': ['available', 'maintenance']}}, 'available',
+                             f'Reservation {reservation.get("reservationNumber")} cancelled/no-show')
+
+    updated_reservation = update_and_fetch(reservations_collection(), {'_id': oid}, update_data, session=session)
+    if not updated_reservation:
+        return None
+
+    audit_entries = []
+    if car_status_change:
+        car_filter, car_new_status, reason = car_status_change
+        car_result = cars_collection().update_one(
+            car_filter, {'$set': {'status': car_new_status, 'updatedAt': now, 'updatedBy': modified_by_oid}}, session=session
+        )
+        if car_result.modified_count:
+            audit_entries.append({'action': 'update_car_status', 'entity_type': 'car', 'entity_id': car_oid,
+                                  'details': {'new_status': car_new_status, 'reason': reason}})
+
+    # Annulation / no-show : libérer les jours occupés
+    if new_status in SLOT_RELEASING_STATUSES:
+        release_slots(oid, session=session)
+
+    apply_reservation_change(reservation, updated_reservation, session=session)
+
+    audit_entries.append({'action': 'update_reservation_status', 'entity_type': 'reservation', 'entity_id': oid,
+                          'details': action_details})
+    log_actions(audit_entries, session=session)
+    return updated_reservation
+
 @reservations_bp.route('/<string:reservation_id>/status', methods=['PUT'])
 @login_required(role="manager") 
+@bumps_versions('reservations', 'clients', 'cars')
 def update_reservation_status(reservation_id):
     data = request.get_json()
     try:
@@ -324,75 +879,19 @@ def update_reservation_status(reservation_id):
 
     try:
         new_status = data.get('status')
-        valid_statuses = ["pending_confirmation", "confirmed", "active", "completed", "cancelled_by_client", "cancelled_by_agency", "no_show"]
-        if not new_status or new_status not in valid_statuses:
-            return jsonify(message=f"Invalid status value. Must be one of: {', '.join(valid_statuses)}"), 400
-
-        reservation = reservations_collection().find_one({'_id': oid})
-        if not reservation:
-            return jsonify(message="Reservation not found."), 404
-
-        update_data = {
-            'status': new_status,
-            'lastModifiedAt': datetime.utcnow(),
-            'lastModifiedBy': modified_by_oid
-        }
-
-        action_details = {'old_status': reservation.get('status'), 'new_status': new_status, 'carId': str(reservation.get('carId'))}
-
-        if new_status == 'active':
-            update_data['actualPickupDate'] = datetime.utcnow()
-            cars_collection().update_one({'_id': reservation.get('carId')}, {'$set': {'status': 'rented', 'updatedAt': datetime.utcnow(), 'updatedBy': modified_by_oid}})
-            log_action('update_car_status', 'car', entity_id=reservation.get('carId'), status='success', details={'new_status': 'rented', 'reason': f'Reservation {reservation.get("reservationNumber")} active'})
-        elif new_status == 'completed':
-            update_data['actualReturnDate'] = datetime.utcnow()
-            cars_collection().update_one({'_id': reservation.get('carId')}, {'$set': {'status': 'available', 'updatedAt': datetime.utcnow(), 'updatedBy': modified_by_oid}})
-            log_action('update_car_status', 'car', entity_id=reservation.get('carId'), status='success', details={'new_status': 'available', 'reason': f'Reservation {reservation.get("reservationNumber")} completed'})
-            
-            # Gérer le coût final
-            if 'finalTotalCost' in data: 
-                update_data['finalTotalCost'] = float(data['finalTotalCost'])
-            else: 
-                update_data['finalTotalCost'] = reservation.get('estimatedTotalCost')
-            
-            # Mettre à jour les détails de paiement avec les nouvelles informations
-            current_payment_details = reservation.get('paymentDetails', {})
-            
-            # Les nouveaux détails de paiement peuvent être envoyés dans les données
-            if 'paymentDetails' in data:
-                payment_update = data['paymentDetails']
-                new_amount_paid = float(payment_update.get('amountPaid', current_payment_details.get('amountPaid', 0.0)))
-                new_transaction_date = payment_update.get('transactionDate', current_payment_details.get('transactionDate'))
-                
-                update_data['paymentDetails'] = {
-                    'amountPaid': new_amount_paid,
-                    'remainingBalance': update_data['finalTotalCost'] - new_amount_paid,
-                    'transactionDate': new_transaction_date
-                }
-            else:
-                # Utiliser les détails existants mais recalculer le solde
-                amount_paid = current_payment_details.get('amountPaid', 0.0)
-                update_data['paymentDetails.remainingBalance'] = update_data['finalTotalCost'] - amount_paid
-            
-            # Ajouter les notes de completion si fournies
-            if 'completionNotes' in data:
-                update_data['notes'] = data['completionNotes']
-            
-            action_details['finalTotalCost'] = update_data['finalTotalCost']
-
-        elif new_status in ["cancelled_by_client", "cancelled_by_agency", "no_show"]:
-            car_doc = cars_collection().find_one({'_id': reservation.get('carId')})
-            if car_doc and car_doc.get('status') not in ['available', 'maintenance']:
-                 cars_collection().update_one({'_id': reservation.get('carId')}, {'$set': {'status': 'available', 'updatedAt': datetime.utcnow(), 'updatedBy': modified_by_oid}})
-                 log_action('update_car_status', 'car', entity_id=reservation.get('carId'), status='success', details={'new_status': 'available', 'reason': f'Reservation {reservation.get("reservationNumber")} cancelled/no-show'})
-
-        result = reservations_collection().update_one({'_id': oid}, {'$set': update_data})
-
-        if result.matched_count:
-            log_action('update_reservation_status', 'reservation', entity_id=oid, status='success', details=action_details)
-            updated_res_doc = reservations_collection().find_one({'_id': oid})
-            details = _get_reservation_details(updated_res_doc)
-            return bson_to_json(details), 200
+        if not new_status or new_status not in VALID_RESERVATION_STATUSES:
+            return jsonify(message=f"Invalid status value. Must be one of: {', '.join(VALID_RESERVATION_STATUSES)}"), 400
+
+        # Réservation, voiture, registre et audit dans une seule transaction ; le document mis à jour est renvoyé tel quel
+        try:
+            updated_reservation = run_in_transaction(
+                lambda session: _apply_status_transition(oid, new_status, data, modified_by_oid, session=session)
+            )
+        except BookingConflictError as bce:
+            return _booking_conflict_response(bce)
+
+        if updated_reservation:
+            return mongo_to_dict(updated_reservation), 200
         else:
             return jsonify(message="Reservation not found."), 404
 
@@ -405,6 +904,7 @@ def update_reservation_status(reservation_id):
 # --- DELETE /<id> (Supprime/Annule une réservation) ---
 @reservations_bp.route('/<string:reservation_id>', methods=['DELETE'])
 @login_required(role="manager") 
+@bumps_versions('reservations', 'clients', 'cars')
 def delete_reservation(reservation_id):
     try:
         oid = ObjectId(reservation_id)
@@ -413,21 +913,27 @@ def delete_reservation(reservation_id):
         return jsonify(message="Invalid reservation ID or user_id format."), 400
 
     try:
-        reservation = reservations_collection().find_one({'_id': oid}) 
+        reservation = reservations_collection().find_one({'_id': oid}, {'reservationNumber': 1, 'carId': 1, **RESERVATION_STATS_PROJECTION}) 
         if not reservation:
             return jsonify(message="Reservation not found."), 404
 
         action_details = {'reservationNumber': reservation.get('reservationNumber'), 'carId': str(reservation.get('carId'))}
 
-        if reservation:
-            car_doc = cars_collection().find_one({'_id': reservation.get('carId')})
-            if car_doc and car_doc.get('status') not in ['available', 'maintenance']:
-                 cars_collection().update_one({'_id': reservation.get('carId')}, {'$set': {'status': 'available', 'updatedAt': datetime.utcnow(), 'updatedBy': modified_by_oid}})
-                 log_action('update_car_status', 'car', entity_id=reservation.get('carId'), status='success', details={'new_status': 'available', 'reason': f'Reservation {reservation.get("reservationNumber")} deleted'})
+        # Filtre conditionnel : la voiture n'est libérée que si elle n'est ni disponible ni en maintenance
+        car_result = cars_collection().update_one(
+            {'_id': reservation.get('carId'), 'status': {'$nin': ['available', 'maintenance']}},
+            {'$set': {'status': 'available', 'updatedAt': datetime.utcnow(), 'updatedBy': modified_by_oid}}
+        )
+        if car_result.modified_count:
+             mark_written()
+             log_action('update_car_status', 'car', entity_id=reservation.get('carId'), status='success', details={'new_status': 'available', 'reason': f'Reservation {reservation.get("reservationNumber")} deleted'})
         
         result = reservations_collection().delete_one({'_id': oid})
 
         if result.deleted_count:
+            mark_written()
+            release_slots(oid)
+            apply_reservation_change(reservation, None)
             log_action('delete_reservation', 'reservation', entity_id=oid, status='success', details=action_details)
             return '', 204 
         else:
@@ -1,4 +1,4 @@
-from flask import current_app, session
+from flask import current_app, session, has_request_context
 from datetime import datetime
 from bson import ObjectId
 from ..extensions import mongo
@@ -19,41 +19,75 @@ def log_action(action, entity_type, entity_id=None, details=None, status='succes
                                        If None, tries to get from session.
     """
     try:
-        audit_log_collection = mongo.db.audit_log
-
-        log_entry = {
-            "timestamp": datetime.utcnow(),
-            "action": action,
-            "entityType": entity_type,
-            "status": status,
-        }
-
-        # Attempt to get user info from session if not provided
-        if user_id is None and 'user_id' in session:
-            try:
-                log_entry['userId'] = ObjectId(session['user_id'])
-            except Exception: 
-                current_app.logger.warn(f"Could not convert session user_id to ObjectId for audit log: {session['user_id']}")
-                log_entry['userId'] = session['user_id'] 
-        elif user_id:
-            log_entry['userId'] = user_id
-
-        if user_username is None and 'username' in session:
-            log_entry['userUsername'] = session['username']
-        elif user_username:
-            log_entry['userUsername'] = user_username
-        
-        # If user info is still not available (e.g., system action before login)
-        if 'userId' not in log_entry and 'userUsername' not in log_entry:
-            log_entry['userUsername'] = 'system' 
-
-        if entity_id:
-            log_entry['entityId'] = entity_id
-        if details:
-            log_entry['details'] = details
-
-        audit_log_collection.insert_one(log_entry)
+        log_entry = _build_log_entry(action, entity_type, entity_id, details, status, user_id, user_username)
+        mongo.db.audit_log.insert_one(log_entry)
         current_app.logger.info(f"Audit log: {action} on {entity_type} by {log_entry.get('userUsername', 'N/A')}, Status: {status}")
 
     except Exception as e:
         current_app.logger.error(f"Failed to log action '{action}' for entity_type '{entity_type}': {e}", exc_info=True)
+
+
+def log_actions(entries, session=None):
+    """
+    Logs several actions to the audit_log collection with a single insert_many.
+
+    Args:
+        entries (list): List of dicts accepting the same keys as log_action's arguments
+                        (action, entity_type, entity_id, details, status, user_id, user_username).
+        session (ClientSession, optional): Session of the transaction the entries belong to.
+                                           Errors are re-raised in that case so the transaction aborts.
+    """
+    if not entries:
+        return
+    try:
+        log_entries = [
+            _build_log_entry(
+                entry['action'], entry['entity_type'], entry.get('entity_id'), entry.get('details'),
+                entry.get('status', 'success'), entry.get('user_id'), entry.get('user_username')
+            )
+            for entry in entries
+        ]
+        mongo.db.audit_log.insert_many(log_entries, ordered=False, session=session)
+        current_app.logger.info(f"Audit log: {len(log_entries)} batched action(s) by {log_entries[0].get('userUsername', 'N/A')}")
+
+    except Exception as e:
+        current_app.logger.error(f"Failed to log {len(entries)} batched action(s): {e}", exc_info=True)
+        if session is not None:
+            raise
+
+
+def _build_log_entry(action, entity_type, entity_id=None, details=None, status='success', user_id=None, user_username=None):
+    """Builds an audit_log document, filling user info from the session when not provided."""
+    log_entry = {
+        "timestamp": datetime.utcnow(),
+        "action": action,
+        "entityType": entity_type,
+        "status": status,
+    }
+
+    # Attempt to get user info from session if not provided (no session in CLI commands)
+    request_session = session if has_request_context() else {}
+    if user_id is None and 'user_id' in request_session:
+        try:
+            log_entry['userId'] = ObjectId(session['user_id'])
+        except Exception: 
+            current_app.logger.warn(f"Could not convert session user_id to ObjectId for audit log: {session['user_id']}")
+            log_entry['userId'] = session['user_id'] 
+    elif user_id:
+        log_entry['userId'] = user_id
+
+    if user_username is None and 'username' in request_session:
+        log_entry['userUsername'] = session['username']
+    elif user_username:
+        log_entry['userUsername'] = user_username
+    
+    # If user info is still not available (e.g., system action before login)
+    if 'userId' not in log_entry and 'userUsername' not in log_entry:
+        log_entry['userUsername'] = 'system' 
+
+    if entity_id:
+        log_entry['entityId'] = entity_id
+    if details:
+        log_entry['details'] = details
+
+    return log_entry
@@ -0,0 +1,212 @@
+# app/utils/booking_ledger.py
+from datetime import datetime, date, timedelta
+from pymongo.errors import BulkWriteError
+from ..extensions import mongo
+from .helpers import parse_datetime
+from .versions import mark_written
+
+# Registre des jours réservés : un document par voiture et par jour, index unique (carId, day)
+booking_slots_collection = lambda: mongo.db.booking_slots
+
+# Statuts pour lesquels une réservation occupe ses jours dans le registre
+SLOT_HOLDING_STATUSES = {"pending_confirmation", "confirmed", "active", "completed"}
+# Statuts qui libèrent les jours occupés
+SLOT_RELEASING_STATUSES = {"cancelled_by_client", "cancelled_by_agency", "no_show"}
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+# Clés de l'index unique sans lequel le registre ne détecte plus les doubles réservations
+LEDGER_UNIQUE_KEY = [('carId', 1), ('day', 1)]
+
+# Bases dont l'index unique du registre a été vérifié (une seule fois par processus)
+_verified_ledgers = set()
+
+
+class BookingConflictError(Exception):
+    """Levée lorsque la voiture est déjà réservée sur un ou plusieurs jours demandés."""
+
+    def __init__(self, car_id, conflicting_days):
+        self.car_id = car_id
+        self.conflicting_days = sorted(conflicting_days)
+        days_str = ', '.join(d.strftime('%Y-%m-%d') for d in self.conflicting_days)
+        super().__init__(f"Car is already booked on: {days_str}.")
+
+
+class LedgerIndexMissingError(Exception):
+    """Levée lorsque l'index unique (carId, day) du registre est absent : aucune écriture n'est alors acceptée."""
+
+    def __init__(self):
+        super().__init__("The booking_slots unique index on (carId, day) is missing; "
+                         "run 'flask indexes apply' before accepting reservations.")
+
+
+def _require_unique_index():
+    """
+    Vérifie (une fois par base) que l'index unique (carId, day) existe avant toute insertion dans le registre.
+    Sans lui, les insertions concurrentes ne seraient plus rejetées et deux réservations pourraient
+    occuper le même jour : ensure_indexes qui échoue ou MONGO_ENSURE_INDEXES=false ne doivent pas le permettre.
+    listIndexes n'est pas autorisé dans une transaction : la vérification est faite hors session.
+    """
+    db_name = mongo.db.name
+    if db_name in _verified_ledgers:
+        return
+    for index in booking_slots_collection().index_information().values():
+        if index.get('unique') and [(field, int(direction)) for field, direction in index['key']] == LEDGER_UNIQUE_KEY:
+            _verified_ledgers.add(db_name)
+            return
+    raise LedgerIndexMissingError()
+
+
+def _to_date(value):
+    """
+    Convertit une date de réservation (datetime, date ou chaîne ISO) en jour calendaire UTC,
+    celui des dates stockées : une date avec fuseau est d'abord ramenée en UTC (parse_datetime).
+    """
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    return parse_datetime(value if isinstance(value, datetime) else str(value)).date()
+
+
+def reservation_days(start, end):
+    """Liste des jours (datetime à minuit) couverts par une réservation, jour de fin inclus."""
+    start_day = _to_date(start)
+    end_day = _to_date(end)
+    return [datetime.combine(start_day + timedelta(days=i), datetime.min.time())
+            for i in range((end_day - start_day).days + 1)]
+
+
+def _insert_slots(reservation_id, car_id, days, session=None):
+    """
+    Insère les jours en un seul insert_many. En cas de chevauchement, les jours déjà
+    insérés pour cet appel sont retirés et BookingConflictError est levée.
+
+    Dans une transaction (session), le serveur a déjà annulé la transaction à la première erreur
+    d'écriture : il n'y a rien à retirer, et toute commande supplémentaire échouerait avec
+    NoSuchTransaction (étiquetée TransientTransactionError, ce qui ferait reprendre with_transaction).
+    """
+    if not days:
+        return
+    _require_unique_index()
+    docs = [{'carId': car_id, 'day': day, 'reservationId': reservation_id} for day in days]
+    try:
+        booking_slots_collection().insert_many(docs, ordered=False, session=session)
+        mark_written()
+    except BulkWriteError as bwe:
+        write_errors = bwe.details.get('writeErrors', [])
+        conflicting_days = [docs[err['index']]['day'] for err in write_errors if err.get('code') == DUPLICATE_KEY_ERROR_CODE]
+        if session is None:
+            booking_slots_collection().delete_many(
+                {'reservationId': reservation_id, 'carId': car_id, 'day': {'$in': days}}
+            )
+        if conflicting_days:
+            raise BookingConflictError(car_id, conflicting_days)
+        raise
+
+
+def reserve_slots(reservation_id, car_id, start, end, session=None):
+    """Occupe les jours [start, end] de la voiture pour une nouvelle réservation."""
+    _insert_slots(reservation_id, car_id, reservation_days(start, end), session=session)
+
+
+def reserve_slots_many(requests, session=None):
+    """
+    Occupe les jours de plusieurs nouvelles réservations en un seul insert_many non ordonné.
+
+    Args:
+        requests (list): Liste de (reservation_id, car_id, start, end).
+
+    Returns:
+        dict: reservation_id -> liste triée des jours en conflit, pour chaque réservation refusée.
+              Les jours déjà insérés pour ces réservations sont retirés.
+
+    Une réservation peut n'avoir perdu des jours qu'au profit d'une autre réservation du lot, elle-même
+    refusée puis retirée : chaque réservation refusée est donc retentée une fois (dans l'ordre du lot)
+    après le retrait, et seules celles qui sont encore en conflit sont renvoyées.
+
+    Dans une transaction (session), la transaction est annulée par le serveur dès la première erreur :
+    aucun nettoyage n'est tenté et la BulkWriteError est propagée pour que l'appelant l'abandonne.
+    """
+    docs = []
+    for reservation_id, car_id, start, end in requests:
+        docs.extend({'carId': car_id, 'day': day, 'reservationId': reservation_id} for day in reservation_days(start, end))
+    if not docs:
+        return {}
+
+    _require_unique_index()
+    conflicts = {}
+    try:
+        booking_slots_collection().insert_many(docs, ordered=False, session=session)
+        mark_written()
+    except BulkWriteError as bwe:
+        if session is not None:
+            raise
+        if bwe.details.get('nInserted'):
+            mark_written()
+        for err in bwe.details.get('writeErrors', []):
+            if err.get('code') != DUPLICATE_KEY_ERROR_CODE:
+                release_slots_many([reservation_id for reservation_id, _, _, _ in requests])
+                raise
+            doc = docs[err['index']]
+            conflicts.setdefault(doc['reservationId'], []).append(doc['day'])
+        if conflicts:
+            release_slots_many(list(conflicts))
+            _retry_rejected(requests, conflicts)
+    return {reservation_id: sorted(days) for reservation_id, days in conflicts.items()}
+
+
+def _retry_rejected(requests, conflicts):
+    """Retente une fois chaque réservation refusée de reserve_slots_many ; met conflicts à jour."""
+    try:
+        for reservation_id, car_id, start, end in requests:
+            if reservation_id not in conflicts:
+                continue
+            try:
+                _insert_slots(reservation_id, car_id, reservation_days(start, end))
+            except BookingConflictError as bce:
+                conflicts[reservation_id] = bce.conflicting_days
+            else:
+                del conflicts[reservation_id]
+    except Exception:
+        release_slots_many([reservation_id for reservation_id, _, _, _ in requests])
+        raise
+
+
+def sync_slots(reservation_id, car_id, start, end, session=None):
+    """
+    Aligne les jours occupés par une réservation existante sur (car_id, start, end).
+    Les nouveaux jours sont insérés d'abord (échec atomique en cas de conflit), puis
+    les jours qui ne sont plus couverts sont libérés.
+    """
+    wanted = set(reservation_days(start, end))
+    held = {
+        (slot['carId'], slot['day'])
+        for slot in booking_slots_collection().find({'reservationId': reservation_id}, {'carId': 1, 'day': 1}, session=session)
+    }
+    to_insert = sorted(day for day in wanted if (car_id, day) not in held)
+    _insert_slots(reservation_id, car_id, to_insert, session=session)
+
+    stale = [(slot_car, day) for slot_car, day in held if slot_car != car_id or day not in wanted]
+    if stale:
+        booking_slots_collection().delete_many(
+            {'reservationId': reservation_id, '$or': [{'carId': slot_car, 'day': day} for slot_car, day in stale]},
+            session=session
+        )
+        mark_written()
+
+
+def release_slots(reservation_id, session=None):
+    """Libère tous les jours occupés par une réservation (annulation, no-show, suppression)."""
+    if booking_slots_collection().delete_many({'reservationId': reservation_id}, session=session).deleted_count:
+        mark_written()
+
+
+def release_slots_many(reservation_ids, session=None):
+    """Libère en une requête les jours occupés par plusieurs réservations."""
+    if reservation_ids:
+        if booking_slots_collection().delete_many({'reservationId': {'$in': list(reservation_ids)}}, session=session).deleted_count:
+            mark_written()
+
+
+def occupied_car_ids(start, end):
+    """Identifiants des voitures ayant au moins un jour réservé dans [start, end] (requête couverte par l'index (day, carId))."""
+    days = reservation_days(start, end)
+    return booking_slots_collection().distinct('carId', {'day': {'$gte': days[0], '$lte': days[-1]}})
@@ -0,0 +1,204 @@
+# app/utils/car_import.py
+import codecs
+import csv
+import json
+from datetime import datetime
+from pymongo.errors import BulkWriteError
+from ..extensions import mongo
+from .audit_logger import log_action
+from .search import car_search_keys
+from .versions import mark_written
+from .writes import duplicate_key_message
+
+cars_collection = lambda: mongo.db.cars
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+DEFAULT_IMPORT_CHUNK_SIZE = 500
+REQUIRED_CAR_FIELDS = ['make', 'model', 'year', 'licensePlate', 'vin', 'status', 'dailyRate']
+OPTIONAL_CAR_FIELDS = ['color', 'description']
+
+
+def detect_format(filename=None, content_type=None):
+    """Format d'import déduit de l'extension du fichier ou du type de contenu ; None si inconnu."""
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension in ('ndjson', 'jsonl'):
+            return 'ndjson'
+        if extension == 'csv':
+            return 'csv'
+    if content_type:
+        if 'ndjson' in content_type or 'jsonl' in content_type:
+            return 'ndjson'
+        if 'csv' in content_type:
+            return 'csv'
+    return None
+
+
+def iter_rows(stream, import_format):
+    """
+    Lit un flux binaire ligne à ligne, sans le charger en mémoire.
+
+    Yields:
+        tuple: (numéro de ligne de données à partir de 1, dict ou None, message d'erreur ou None)
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if import_format == 'csv':
+        for row_number, row in enumerate(csv.DictReader(lines), start=1):
+            if None in row:
+                yield row_number, None, "Row has more columns than the header."
+            else:
+                yield row_number, row, None
+        return
+
+    row_number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield row_number, row, None
+        else:
+            yield row_number, None, "Each line must be a JSON object."
+
+
+def _clean(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def parse_car_row(row, added_by=None):
+    """Valide une ligne d'import et construit le document voiture (mêmes champs que POST /api/cars)."""
+    values = {field: _clean(row.get(field)) for field in REQUIRED_CAR_FIELDS + OPTIONAL_CAR_FIELDS}
+    missing = [field for field in REQUIRED_CAR_FIELDS if values[field] is None]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    try:
+        year = int(values['year'])
+        daily_rate = float(values['dailyRate'])
+    except (TypeError, ValueError):
+        raise ValueError("Invalid data type for year or dailyRate.")
+
+    car = {
+        "make": str(values['make']),
+        "model": str(values['model']),
+        "year": year,
+        "licensePlate": str(values['licensePlate']),
+        "vin": str(values['vin']),
+        "color": values['color'],
+        "status": str(values['status']),
+        "dailyRate": daily_rate,
+        "description": values['description'],
+        "imageUrl": None,
+        "imageVariants": {},
+        "imageStatus": None,
+        "addedAt": datetime.utcnow(),
+        "addedBy": added_by,
+        "updatedAt": None,
+        "updatedBy": None
+    }
+    car["searchKeys"] = car_search_keys(car)
+    return car
+
+
+class CarImporter:
+    """
+    Import de voitures par lots : l'unicité (plaque, VIN) est vérifiée contre des ensembles chargés
+    en une seule requête projetée puis complétés par les lignes déjà acceptées, chaque lot est écrit
+    avec un insert_many et résumé par une seule entrée du journal d'audit.
+    """
+
+    def __init__(self, chunk_size=DEFAULT_IMPORT_CHUNK_SIZE, dry_run=False, added_by=None, user_username=None):
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.added_by = added_by
+        self.user_username = user_username
+        self.created = 0
+        self.errors = []
+        self._chunk = []
+        self._plates = set()
+        self._vins = set()
+        for car in cars_collection().find({}, {'_id': 0, 'licensePlate': 1, 'vin': 1}):
+            self._plates.add(car.get('licensePlate'))
+            self._vins.add(car.get('vin'))
+
+    def _fail(self, row_number, message, code=400):
+        self.errors.append({'row': row_number, 'code': code, 'message': message})
+
+    def add(self, row_number, row):
+        try:
+            car = parse_car_row(row, self.added_by)
+        except ValueError as ve:
+            self._fail(row_number, str(ve))
+            return
+        if car['licensePlate'] in self._plates:
+            self._fail(row_number, f"License plate '{car['licensePlate']}' already exists.", 409)
+            return
+        if car['vin'] in self._vins:
+            self._fail(row_number, f"VIN '{car['vin']}' already exists.", 409)
+            return
+        self._plates.add(car['licensePlate'])
+        self._vins.add(car['vin'])
+        self._chunk.append((row_number, car))
+        if len(self._chunk) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        chunk, self._chunk = self._chunk, []
+        if not chunk:
+            return
+        if self.dry_run:
+            self.created += len(chunk)
+            return
+
+        documents = [car for _, car in chunk]
+        failed_positions = set()
+        try:
+            cars_collection().insert_many(documents, ordered=False)
+        except BulkWriteError as bwe:
+            # Doublon écrit entre-temps par une autre requête (index uniques) ou document refusé
+            for err in bwe.details.get('writeErrors', []):
+                failed_positions.add(err['index'])
+                if err.get('code') == 11000:
+                    self._fail(chunk[err['index']][0], duplicate_key_message(err), 409)
+                else:
+                    self._fail(chunk[err['index']][0], err.get('errmsg', "Failed to insert car."), 500)
+
+        inserted = [(row_number, car) for position, (row_number, car) in enumerate(chunk) if position not in failed_positions]
+        self.created += len(inserted)
+        if inserted:
+            mark_written()
+            log_action('import_cars', 'car', status='success', user_username=self.user_username, details={
+                'count': len(inserted),
+                'firstRow': inserted[0][0],
+                'lastRow': inserted[-1][0],
+                'carIds': [str(car['_id']) for _, car in inserted],
+                'licensePlates': [car['licensePlate'] for _, car in inserted],
+            })
+
+    def run(self, rows):
+        """
+        Importe les lignes de iter_rows() et renvoie le rapport {created, failed, errors, dryRun, readError}.
+
+        Un fichier illisible en cours de route (encodage, CSV mal formé) arrête la lecture sans perdre
+        le rapport : les lignes valides déjà lues sont écrites et readError décrit l'erreur de lecture.
+        """
+        read_error = None
+        try:
+            for row_number, row, error in rows:
+                if error:
+                    self._fail(row_number, error)
+                else:
+                    self.add(row_number, row)
+        except (UnicodeDecodeError, csv.Error) as e:
+            read_error = f"Could not read the import file: {e}"
+        self.flush()
+        self.errors.sort(key=lambda err: err['row'])
+        return {'created': self.created, 'failed': len(self.errors), 'errors': self.errors, 'dryRun': self.dry_run,
+                'readError': read_error}
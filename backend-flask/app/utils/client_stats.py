@@ -0,0 +1,169 @@
+# app/utils/client_stats.py
+from flask import current_app
+from pymongo import UpdateOne
+from ..extensions import mongo
+from .booking_ledger import SLOT_RELEASING_STATUSES
+from .versions import mark_written
+
+clients_collection = lambda: mongo.db.clients
+reservations_collection = lambda: mongo.db.reservations
+
+# Compteurs cumulés d'un client (champ 'stats'), tenus à jour par les écritures sur les réservations
+EMPTY_CLIENT_STATS = {'reservationCount': 0, 'totalSpent': 0.0, 'outstandingBalance': 0.0, 'lastRentalAt': None}
+# Statuts d'une location effectivement commencée (dernière location du client)
+RENTAL_STATUSES = ('active', 'completed')
+# Champs des réservations nécessaires au calcul des compteurs
+RESERVATION_STATS_PROJECTION = {'clientId': 1, 'status': 1, 'startDate': 1, 'paymentDetails': 1}
+
+
+def _contribution(reservation):
+    """Part d'une réservation dans les compteurs de son client."""
+    payment = reservation.get('paymentDetails') or {}
+    cancelled = reservation.get('status') in SLOT_RELEASING_STATUSES
+    return {
+        'reservationCount': 1,
+        'totalSpent': float(payment.get('amountPaid') or 0.0),
+        # Le solde d'une réservation annulée ou non honorée n'est plus dû
+        'outstandingBalance': 0.0 if cancelled else float(payment.get('remainingBalance') or 0.0),
+    }
+
+
+def _rental_date(reservation):
+    return reservation.get('startDate') if reservation.get('status') in RENTAL_STATUSES else None
+
+
+def _stats_updates(changes):
+    """
+    Regroupe par client les écarts de compteurs de plusieurs changements (avant, après),
+    l'un ou l'autre valant None pour une création ou une suppression.
+
+    Returns:
+        tuple: (opérations UpdateOne, {client_id: date de location retirée}) ; la seconde liste les
+               clients dont la dernière location a pu disparaître (suppression, annulation, date avancée)
+               sans être remplacée par une location au moins aussi récente.
+    """
+    updates = {}
+    for before, after in changes:
+        for reservation, sign in ((before, -1), (after, 1)):
+            if not reservation or not reservation.get('clientId'):
+                continue
+            entry = updates.setdefault(reservation['clientId'], {'$inc': {}, 'lastRentalAt': None, 'removedRentalAt': None})
+            for field, value in _contribution(reservation).items():
+                entry['$inc'][f'stats.{field}'] = entry['$inc'].get(f'stats.{field}', 0) + sign * value
+            rental_date = _rental_date(reservation)
+            key = 'lastRentalAt' if sign > 0 else 'removedRentalAt'
+            if rental_date and (entry[key] is None or rental_date > entry[key]):
+                entry[key] = rental_date
+
+    operations = []
+    removed_rentals = {}
+    for client_id, entry in updates.items():
+        if entry['removedRentalAt'] and (entry['lastRentalAt'] is None or entry['lastRentalAt'] < entry['removedRentalAt']):
+            removed_rentals[client_id] = entry['removedRentalAt']
+        update = {}
+        increments = {field: delta for field, delta in entry['$inc'].items() if delta}
+        if increments:
+            update['$inc'] = increments
+        if entry['lastRentalAt']:
+            # $max : une location plus ancienne ne remplace pas la dernière location connue
+            update['$max'] = {'stats.lastRentalAt': entry['lastRentalAt']}
+        if update:
+            operations.append(UpdateOne({'_id': client_id}, update))
+    return operations, removed_rentals
+
+
+def _refresh_last_rental(client_id, removed_at, session=None):
+    """
+    Recalcule stats.lastRentalAt d'un client dont une location datée de removed_at a été retirée.
+    $max ne peut que faire avancer la date : elle est relue sur la location restante la plus récente
+    (un find_one indexé par clientId_status_startDate), et n'est remplacée que si la location retirée
+    était bien la dernière connue (stats.lastRentalAt <= removed_at).
+    """
+    latest = reservations_collection().find_one(
+        {'clientId': client_id, 'status': {'$in': list(RENTAL_STATUSES)}},
+        {'startDate': 1}, sort=[('startDate', -1)], session=session
+    )
+    clients_collection().update_one(
+        {'_id': client_id, 'stats.lastRentalAt': {'$lte': removed_at}},
+        {'$set': {'stats.lastRentalAt': latest['startDate'] if latest else None}},
+        session=session
+    )
+
+
+def apply_reservation_changes(changes, session=None):
+    """
+    Met à jour incrémentalement les compteurs des clients concernés (un seul bulk_write), puis relit
+    la dernière location des clients qui ont perdu la leur. À appeler après l'écriture des réservations.
+
+    Args:
+        changes (list): Liste de (réservation avant, réservation après) ; None avant une création
+                        ou après une suppression.
+        session (ClientSession, optional): Session de la transaction en cours ; les erreurs sont
+                                           alors propagées pour annuler la transaction.
+    """
+    try:
+        operations, removed_rentals = _stats_updates(changes)
+        if operations:
+            clients_collection().bulk_write(operations, ordered=False, session=session)
+            mark_written()
+        for client_id, removed_at in removed_rentals.items():
+            _refresh_last_rental(client_id, removed_at, session=session)
+    except Exception as e:
+        current_app.logger.error(f"Failed to update client stats for {len(changes)} reservation change(s): {e}")
+        if session is not None:
+            raise
+
+
+def apply_reservation_change(before, after, session=None):
+    apply_reservation_changes([(before, after)], session=session)
+
+
+def rebuild_client_stats(batch_size=1000):
+    """
+    Recalcule les compteurs de tous les clients depuis les réservations (réparation d'une dérive,
+    première mise en place). Renvoie le nombre de clients mis à jour.
+    """
+    pipeline = [
+        {'$group': {
+            '_id': '$clientId',
+            'reservationCount': {'$sum': 1},
+            'totalSpent': {'$sum': {'$ifNull': ['$paymentDetails.amountPaid', 0]}},
+            'outstandingBalance': {'$sum': {'$cond': [
+                {'$in': ['$status', sorted(SLOT_RELEASING_STATUSES)]}, 0,
+                {'$ifNull': ['$paymentDetails.remainingBalance', 0]}
+            ]}},
+            'lastRentalAt': {'$max': {'$cond': [{'$in': ['$status', list(RENTAL_STATUSES)]}, '$startDate', None]}},
+        }}
+    ]
+    updated = 0
+    operations = []
+    seen = set()
+    for row in mongo.db.reservations.aggregate(pipeline, allowDiskUse=True):
+        if row['_id'] is None:
+            continue
+        seen.add(row['_id'])
+        stats = {field: row[field] for field in EMPTY_CLIENT_STATS}
+        operations.append(UpdateOne({'_id': row['_id']}, {'$set': {'stats': stats}}))
+        if len(operations) >= batch_size:
+            updated += clients_collection().bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += clients_collection().bulk_write(operations, ordered=False).modified_count
+
+    # Clients sans réservation : remis à zéro par lots d'_id
+    without_reservations = []
+    for client in clients_collection().find({}, {'_id': 1}):
+        if client['_id'] not in seen:
+            without_reservations.append(client['_id'])
+        if len(without_reservations) >= batch_size:
+            updated += _reset_stats(without_reservations)
+            without_reservations = []
+    if without_reservations:
+        updated += _reset_stats(without_reservations)
+    return updated
+
+
+def _reset_stats(client_ids):
+    return clients_collection().update_many(
+        {'_id': {'$in': client_ids}, 'stats': {'$ne': EMPTY_CLIENT_STATS}}, {'$set': {'stats': EMPTY_CLIENT_STATS}}
+    ).modified_count
@@ -0,0 +1,134 @@
+# app/utils/compression.py
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Dépendance optionnelle : brotlicffi expose la même API, sinon gzip seul
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Types compressés par défaut : réponses de l'API et exports (les images sont déjà compressées)
+DEFAULT_COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html')
+# Préférence du serveur à qualité égale côté client
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding, encodings=SUPPORTED_ENCODINGS):
+    """
+    Codage à utiliser d'après l'en-tête Accept-Encoding (valeurs q comprises), ou None.
+    'identity' et '*' sont gérés ; un codage de qualité 0 est refusé.
+    """
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Compressor:
+    """Interface commune gzip / brotli : compress() par morceau, flush() pour vider, finish() pour terminer."""
+
+    def __init__(self, encoding, gzip_level, brotli_quality):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits = 16 + MAX_WBITS : en-tête et pied de page gzip
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._brotli.process(data) if self.encoding == 'br' else self._zlib.compress(data)
+
+    def flush(self):
+        return self._brotli.flush() if self.encoding == 'br' else self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._brotli.finish() if self.encoding == 'br' else self._zlib.flush(zlib.Z_FINISH)
+
+
+def _compress_stream(chunks, compressor):
+    """
+    Compresse une réponse en flux morceau par morceau : chaque morceau est vidé (flush) aussitôt,
+    le client reçoit donc les données au fil de l'eau comme sans compression.
+    """
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _is_compressible(response, config):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if 'Content-Encoding' in response.headers or 'X-Accel-Redirect' in response.headers or 'X-Sendfile' in response.headers:
+        return False
+    # Fichiers servis par send_file (images) : déjà compressés, envoyés sans passer par la mémoire
+    if response.direct_passthrough:
+        return False
+    return response.mimetype in config['COMPRESSION_MIMETYPES']
+
+
+def compress_response(response):
+    """Compresse la réponse en gzip ou brotli si le client l'accepte (hook after_request)."""
+    config = current_app.config
+    if not config.get('COMPRESSION_ENABLED', True) or request.method == 'HEAD' or not _is_compressible(response, config):
+        return response
+
+    # Le contenu dépend désormais de Accept-Encoding, même lorsque la réponse n'est pas compressée
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    compressor = _Compressor(encoding, config['COMPRESSION_LEVEL'], config['COMPRESSION_BROTLI_QUALITY'])
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, compressor)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESSION_MIN_SIZE']:
+            return response
+        response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.headers['Content-Encoding'] = encoding
+    # Une ETag forte identifie des octets précis : elle devient faible pour la représentation compressée
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """Enregistre la compression des réponses sur l'application (réglages COMPRESSION_* de la configuration)."""
+    app.config.setdefault('COMPRESSION_MIMETYPES', DEFAULT_COMPRESSIBLE_MIMETYPES)
+    app.after_request(compress_response)
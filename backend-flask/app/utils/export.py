@@ -0,0 +1,129 @@
+# app/utils/export.py
+import csv
+import io
+from flask import Response, current_app, stream_with_context
+from .json_provider import json_default
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+DEFAULT_EXPORT_BATCH_SIZE = 1000
+MAX_EXPORT_BATCH_SIZE = 10000
+# Taille visée des morceaux envoyés au client : évite un write() réseau par document
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def parse_export_options(args):
+    """Format (ndjson par défaut) et taille des lots lus par le curseur ; lève ValueError si invalides."""
+    export_format = args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}.")
+    batch_size = args.get('batchSize')
+    if batch_size is None or batch_size == '':
+        return export_format, DEFAULT_EXPORT_BATCH_SIZE
+    try:
+        batch_size = int(batch_size)
+    except ValueError:
+        raise ValueError("batchSize must be a positive integer.")
+    if batch_size < 1:
+        raise ValueError("batchSize must be a positive integer.")
+    return export_format, min(batch_size, MAX_EXPORT_BATCH_SIZE)
+
+
+def _export_document(doc):
+    """Document prêt à sérialiser : _id exposé sous 'id' (comme mongo_to_dict)."""
+    if '_id' in doc:
+        doc = {'id': doc['_id'], **{key: value for key, value in doc.items() if key != '_id'}}
+    return doc
+
+
+def _csv_value(doc, column):
+    """Valeur d'une colonne CSV ('a.b' pour un champ imbriqué), convertie en texte."""
+    value = doc
+    for part in column.split('.'):
+        if not isinstance(value, dict):
+            value = None
+            break
+        value = value.get(part)
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return current_app.json.dumps(value)
+    try:
+        return json_default(value)
+    except TypeError:
+        return value
+
+
+def _batches(cursor, batch_size, transform):
+    """Regroupe les documents du curseur par lots de batch_size (transform appliqué à chaque lot)."""
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield transform(batch) if transform else batch
+            batch = []
+    if batch:
+        yield transform(batch) if transform else batch
+
+
+def iter_ndjson(cursor, batch_size=DEFAULT_EXPORT_BATCH_SIZE, transform=None):
+    """Génère le curseur en NDJSON (un document JSON par ligne), par morceaux d'environ EXPORT_CHUNK_BYTES."""
+    dumps = current_app.json.dumps
+    buffer = []
+    size = 0
+    for batch in _batches(cursor, batch_size, transform):
+        for doc in batch:
+            line = dumps(_export_document(doc)) + '\n'
+            buffer.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_BYTES:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_csv(cursor, columns, batch_size=DEFAULT_EXPORT_BATCH_SIZE, transform=None):
+    """Génère le curseur en CSV (en-tête = columns), par morceaux d'environ EXPORT_CHUNK_BYTES."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    for batch in _batches(cursor, batch_size, transform):
+        for doc in batch:
+            doc = _export_document(doc)
+            writer.writerow([_csv_value(doc, column) for column in columns])
+            if output.tell() >= EXPORT_CHUNK_BYTES:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+    if output.tell():
+        yield output.getvalue()
+
+
+def export_response(cursor, export_format, columns, filename, batch_size=DEFAULT_EXPORT_BATCH_SIZE, transform=None):
+    """
+    Réponse HTTP en flux : les documents sont lus par lots depuis le curseur serveur et écrits au fil
+    de l'eau, la mémoire reste donc constante quel que soit le nombre de documents exportés.
+
+    Args:
+        cursor (Cursor): Curseur pymongo (find avec batch_size), non encore parcouru.
+        export_format (str): 'ndjson' ou 'csv'.
+        columns (list): Colonnes du CSV (champs imbriqués en notation 'a.b').
+        filename (str): Nom du fichier proposé au téléchargement, sans extension.
+        transform (callable, optional): Enrichit un lot de documents (ex: jointures par $in).
+    """
+    def generate():
+        try:
+            if export_format == 'csv':
+                yield from iter_csv(cursor, columns, batch_size, transform)
+            else:
+                yield from iter_ndjson(cursor, batch_size, transform)
+        finally:
+            # Client déconnecté ou export terminé : libère le curseur côté serveur
+            cursor.close()
+
+    response = Response(stream_with_context(generate()), content_type=EXPORT_CONTENT_TYPES[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    # Pas de mise en tampon par un proxy (nginx) : les morceaux partent dès qu'ils sont produits
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
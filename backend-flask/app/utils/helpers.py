@@ -1,7 +1,5 @@
 # app/utils/helpers.py
-from bson import ObjectId, json_util
-import json
-from datetime import datetime
+from datetime import datetime, date, timezone
 # --- IMPORTS NÉCESSAIRES POUR L'AUTH ---
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask import session, jsonify
@@ -13,15 +11,25 @@ def mongo_to_dict(doc):
         doc['id'] = str(doc.pop('_id'))
     return doc
 
-def custom_serializer(obj):
-    if isinstance(obj, ObjectId):
-        return str(obj)
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
-
-def bson_to_json(data):
-    return json.loads(json.dumps(data, default=custom_serializer))
+def parse_datetime(value):
+    """
+    Convertit une date reçue (chaîne ISO 'YYYY-MM-DD' ou 'YYYY-MM-DDTHH:MM:SS[.fff][Z|±HH:MM]',
+    date ou datetime) en datetime naïf UTC, tel que stocké nativement en BSON.
+    Renvoie None pour une valeur vide ; lève ValueError si le format est invalide.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime(value.year, value.month, value.day)
+    elif isinstance(value, str):
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    else:
+        raise ValueError(f"Unsupported date value: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
 
 
 # --- Fonctions pour les mots de passe ---
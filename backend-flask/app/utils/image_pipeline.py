@@ -0,0 +1,157 @@
+# app/utils/image_pipeline.py
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from ..extensions import mongo
+from .image_store import TEMP_UPLOAD_PREFIX, get_variants, record_variants, remove_variant_files
+from .versions import safe_bump_versions
+
+# Pillow est optionnel : sans lui, seule l'image d'origine est conservée (imageStatus = 'original_only')
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    Image = None
+
+cars_collection = lambda: mongo.db.cars
+
+IMAGE_STATUS_PENDING = 'pending'
+IMAGE_STATUS_READY = 'ready'
+IMAGE_STATUS_FAILED = 'failed'
+IMAGE_STATUS_ORIGINAL_ONLY = 'original_only'
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending_slots = None
+
+
+def _get_executor():
+    """Pool de threads partagé (créé à la première utilisation) et sémaphore bornant les travaux en attente."""
+    global _executor, _pending_slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('IMAGE_PIPELINE_WORKERS', 2),
+                thread_name_prefix='image-pipeline'
+            )
+            _pending_slots = threading.BoundedSemaphore(current_app.config.get('IMAGE_PIPELINE_MAX_PENDING', 32))
+        return _executor, _pending_slots
+
+
+def _url_for_file(image_url, filename):
+    """URL d'un fichier situé dans le même dossier que image_url."""
+    return f"{image_url.rsplit('/', 1)[0]}/{filename}"
+
+
+def _save_atomically(image, path, fmt, options):
+    """
+    Écrit l'image dans un fichier temporaire du même dossier puis le renomme sur path (os.replace) :
+    un lecteur, ou un autre travail écrivant le même contenu, ne voit jamais de fichier tronqué.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TEMP_UPLOAD_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            image.save(temp_file, fmt, **options)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _generate_variants(file_path, image_url, widths, webp_quality, jpeg_quality):
+    """Crée, pour chaque largeur, une variante WebP et une variante JPEG ; renvoie {'w<largeur>': {'webp': url, 'jpeg': url}}."""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    folder = os.path.dirname(file_path)
+    variants = {}
+    with Image.open(file_path) as source:
+        image = ImageOps.exif_transpose(source).convert('RGB')
+        for width in sorted(widths):
+            # Pas d'agrandissement : une image plus petite que la largeur cible est seulement réencodée
+            if image.width > width:
+                resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            else:
+                resized = image
+            key = f"w{width}"
+            variants[key] = {}
+            for fmt, extension, options in (('WEBP', 'webp', {'quality': webp_quality, 'method': 4}),
+                                            ('JPEG', 'jpeg', {'quality': jpeg_quality, 'optimize': True, 'progressive': True})):
+                variant_name = f"{stem}_{key}.{extension}"
+                # En cas d'échec, les variantes déjà en place restent : elles sont complètes et identiques
+                # à celles qu'un autre travail sur le même contenu a pu enregistrer
+                _save_atomically(resized, os.path.join(folder, variant_name), fmt, options)
+                variants[key][extension] = _url_for_file(image_url, variant_name)
+    return variants
+
+
+def _process_car_image(app, car_id, file_path, image_url):
+    """
+    Travail d'arrière-plan : génère les variantes d'un contenu (ou réutilise celles déjà produites
+    pour le même fichier) puis les enregistre sur la voiture si son image n'a pas changé.
+    """
+    with app.app_context():
+        config = app.config
+        try:
+            variants = get_variants(image_url)
+            if not variants:
+                variants = _generate_variants(
+                    file_path, image_url,
+                    config.get('IMAGE_VARIANT_WIDTHS', (320, 960)),
+                    config.get('IMAGE_WEBP_QUALITY', 80),
+                    config.get('IMAGE_JPEG_QUALITY', 85)
+                )
+                if not record_variants(image_url, variants):
+                    # Plus aucune voiture ne référence ce contenu : les variantes sont orphelines
+                    remove_variant_files(variants)
+                    return
+            update = {'imageVariants': variants, 'imageStatus': IMAGE_STATUS_READY}
+        except Exception as e:
+            app.logger.error(f"Error generating image variants for car {car_id} ({image_url}): {e}")
+            update = {'imageVariants': {}, 'imageStatus': IMAGE_STATUS_FAILED}
+
+        try:
+            # Filtre sur imageUrl : si l'image a été remplacée entre-temps, la voiture n'est pas modifiée
+            # (les variantes appartiennent au contenu et sont libérées avec lui)
+            if cars_collection().update_one({'_id': car_id, 'imageUrl': image_url}, {'$set': update}).modified_count:
+                safe_bump_versions('cars')
+        except Exception as e:
+            app.logger.error(f"Error recording image variants for car {car_id}: {e}")
+
+
+def _run_job(app, car_id, file_path, image_url, pending_slots):
+    try:
+        _process_car_image(app, car_id, file_path, image_url)
+    finally:
+        pending_slots.release()
+
+
+def initial_image_status():
+    """Statut à enregistrer avec une nouvelle image, avant la planification de ses variantes."""
+    return IMAGE_STATUS_PENDING if Image is not None else IMAGE_STATUS_ORIGINAL_ONLY
+
+
+def schedule_variants(car_id, file_path, image_url):
+    """
+    Planifie la génération des variantes d'une image déjà enregistrée sur la voiture (imageUrl).
+
+    Les travaux s'exécutent dans un pool de threads borné. Lorsque la file est pleine, le travail est
+    exécuté dans la requête (contre-pression plutôt que file d'attente illimitée).
+    """
+    if Image is None:
+        return
+    app = current_app._get_current_object()
+    if app.config.get('IMAGE_PIPELINE_SYNC', False):
+        _process_car_image(app, car_id, file_path, image_url)
+        return
+
+    executor, pending_slots = _get_executor()
+    if not pending_slots.acquire(blocking=False):
+        app.logger.warning(f"Image pipeline queue is full, processing image for car {car_id} inline.")
+        _process_car_image(app, car_id, file_path, image_url)
+        return
+    try:
+        executor.submit(_run_job, app, car_id, file_path, image_url, pending_slots)
+    except Exception:
+        pending_slots.release()
+        raise
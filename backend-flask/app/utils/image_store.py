@@ -0,0 +1,215 @@
+# app/utils/image_store.py
+import hashlib
+import os
+import tempfile
+import uuid
+from datetime import datetime
+from flask import current_app
+from pymongo import ReturnDocument
+from werkzeug.utils import secure_filename
+from ..extensions import mongo
+
+# Compteurs de références : un document par fichier stocké, _id = chemin relatif ('ab/cd/<sha256>.<ext>')
+image_refs_collection = lambda: mongo.db.image_refs
+
+# Taille des blocs lus lors de l'écriture (et du hachage) de l'upload
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Préfixe d'URL des fichiers de UPLOAD_FOLDER_CARS (servis comme fichiers statiques)
+CAR_IMAGES_URL_PREFIX = '/static/uploads/cars/'
+# Fichiers temporaires (upload ou variante en cours d'écriture), renommés en place une fois complets
+TEMP_UPLOAD_PREFIX = '.upload-'
+
+
+def upload_folder():
+    return current_app.config.get('UPLOAD_FOLDER_CARS', os.path.join(current_app.static_folder, 'uploads', 'cars'))
+
+
+def _relative_path(digest, extension):
+    """Chemin réparti sur deux niveaux de préfixes pour éviter les répertoires géants."""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+
+def url_for_key(key):
+    return f"{CAR_IMAGES_URL_PREFIX}{key}"
+
+
+def key_for_url(image_url):
+    """Chemin relatif (clé de image_refs) d'une URL d'image, ou None si l'URL n'est pas dans le dossier des voitures."""
+    if not image_url or not image_url.startswith(CAR_IMAGES_URL_PREFIX):
+        return None
+    return image_url[len(CAR_IMAGES_URL_PREFIX):]
+
+
+def path_for_url(image_url):
+    """Chemin disque d'une URL d'image du dossier des voitures."""
+    key = key_for_url(image_url)
+    return os.path.join(upload_folder(), *key.split('/')) if key else None
+
+
+def _check_extension(filename):
+    allowed_extensions = current_app.config.get('ALLOWED_IMAGE_EXTENSIONS', {'png', 'jpg', 'jpeg', 'gif'})
+    if not ('.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions):
+        raise ValueError(f"File type not allowed. Allowed: {', '.join(allowed_extensions)}")
+    return secure_filename(filename).rsplit('.', 1)[1].lower()
+
+
+def store_upload(file_storage):
+    """
+    Enregistre un upload sous un nom dérivé de son contenu (SHA-256) et y ajoute une référence.
+
+    Le fichier est haché pendant sa copie sur disque ; si le même contenu est déjà stocké,
+    la copie temporaire est supprimée et seul le compteur de références augmente. Le fichier est
+    vérifié APRÈS la prise de référence, et toujours réécrit si elle a recréé le compteur :
+    une libération concurrente (release_image) ne peut plus le supprimer sans voir cette référence.
+
+    Returns:
+        tuple: (chemin du fichier, URL publique) ou (None, None) si aucun fichier n'est fourni.
+    Raises:
+        ValueError: extension non autorisée. IOError: écriture impossible.
+    """
+    if not file_storage or file_storage.filename == '':
+        return None, None
+    extension = _check_extension(file_storage.filename)
+
+    root = upload_folder()
+    try:
+        os.makedirs(root, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=root, prefix=TEMP_UPLOAD_PREFIX)
+    except OSError as e:
+        current_app.logger.error(f"Error creating upload directory {root}: {e}")
+        raise IOError("Server error: Could not create upload directory.")
+
+    image_url = None
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as temp_file:
+            for chunk in iter(lambda: file_storage.stream.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                temp_file.write(chunk)
+
+        key = _relative_path(digest.hexdigest(), extension)
+        created = _acquire(key)
+        image_url = url_for_key(key)
+        file_path = os.path.join(root, *key.split('/'))
+        if not created and os.path.exists(file_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.replace(temp_path, file_path)
+        return file_path, image_url
+    except Exception as e:
+        current_app.logger.error(f"Error saving uploaded file {file_storage.filename}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if image_url:
+            release_image(image_url)
+        raise IOError("Error saving file.")
+
+
+def _acquire(key):
+    """Ajoute une référence au contenu ; renvoie True si le compteur vient d'être créé (première référence)."""
+    # lastAcquiredAt protège du ramasse-miettes (flask images gc) un fichier ancien tout juste réutilisé
+    now = datetime.utcnow()
+    result = image_refs_collection().update_one(
+        {'_id': key},
+        {'$inc': {'refs': 1}, '$set': {'lastAcquiredAt': now}, '$setOnInsert': {'createdAt': now, 'variants': {}}},
+        upsert=True
+    )
+    return result.upserted_id is not None
+
+
+def release_image(image_url, legacy_variants=None):
+    """
+    Retire une référence à une image ; à la dernière, supprime le fichier et ses variantes.
+
+    Les images antérieures au stockage par contenu (sans compteur) n'ont qu'un seul propriétaire :
+    elles sont supprimées directement, avec les variantes éventuellement passées par l'appelant.
+    Les erreurs sont journalisées, pas propagées.
+
+    À la dernière référence, les fichiers sont d'abord mis de côté, puis le compteur est supprimé
+    seulement s'il est toujours à zéro : si un upload concurrent du même contenu l'a repris entre-temps,
+    les fichiers sont remis en place au lieu d'être supprimés sous une référence active.
+    """
+    key = key_for_url(image_url)
+    if not key:
+        return
+    try:
+        ref = image_refs_collection().find_one_and_update(
+            {'_id': key}, {'$inc': {'refs': -1}}, return_document=ReturnDocument.AFTER
+        )
+        if ref is None:
+            _remove_files([image_url] + _variant_urls(legacy_variants))
+            return
+        if ref['refs'] > 0:
+            return
+        set_aside = _set_aside_files([image_url] + _variant_urls(ref.get('variants')))
+        if image_refs_collection().delete_one({'_id': key, 'refs': {'$lte': 0}}).deleted_count:
+            for _, temp_path in set_aside:
+                os.remove(temp_path)
+        else:
+            for file_path, temp_path in set_aside:
+                os.replace(temp_path, file_path)
+    except Exception as e:
+        current_app.logger.error(f"Error releasing car image {image_url}: {e}")
+
+
+def _set_aside_files(urls):
+    """
+    Renomme les fichiers existants sous un nom temporaire du même dossier (ramassé par flask images gc
+    en cas d'interruption) ; renvoie [(chemin d'origine, chemin temporaire)].
+    """
+    set_aside = []
+    for url in urls:
+        file_path = path_for_url(url)
+        if not file_path:
+            continue
+        temp_path = os.path.join(os.path.dirname(file_path), f"{TEMP_UPLOAD_PREFIX}{uuid.uuid4().hex}")
+        try:
+            os.replace(file_path, temp_path)
+        except FileNotFoundError:
+            continue
+        set_aside.append((file_path, temp_path))
+    return set_aside
+
+
+def replace_image(old_image_url, new_image_url, old_legacy_variants=None):
+    """
+    Libère l'ancienne image d'une voiture une fois new_image_url enregistrée (None : image retirée).
+    Si le même contenu a été ré-uploadé, cela retire la référence ajoutée en trop par store_upload.
+    """
+    if old_image_url:
+        release_image(old_image_url, old_legacy_variants)
+
+
+def get_variants(image_url):
+    """Variantes déjà générées pour ce contenu (partagées par toutes les voitures qui l'utilisent)."""
+    key = key_for_url(image_url)
+    ref = image_refs_collection().find_one({'_id': key}, {'variants': 1}) if key else None
+    return (ref or {}).get('variants') or {}
+
+
+def record_variants(image_url, variants):
+    """Enregistre les variantes d'un contenu ; renvoie False si l'image n'est plus référencée."""
+    key = key_for_url(image_url)
+    if not key:
+        return False
+    return image_refs_collection().update_one({'_id': key}, {'$set': {'variants': variants}}).matched_count > 0
+
+
+def remove_variant_files(variants):
+    """Supprime des variantes générées pour une image qui n'est plus référencée."""
+    _remove_files(_variant_urls(variants))
+
+
+def _variant_urls(variants):
+    return [url for formats in (variants or {}).values() for url in formats.values()]
+
+
+def _remove_files(urls):
+    for url in urls:
+        file_path = path_for_url(url)
+        try:
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+        except Exception as e:
+            current_app.logger.error(f"Error deleting image file {url}: {e}")
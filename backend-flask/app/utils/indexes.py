@@ -0,0 +1,219 @@
+# app/utils/indexes.py
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+from ..extensions import mongo
+
+# Index requis, déclarés par collection : liste de (clés, options)
+INDEXES = {
+    'reservations': [
+        # Les numéros de réservation proviennent d'un compteur ; l'index rend toute collision impossible
+        ([('reservationNumber', ASCENDING)], {'name': 'reservationNumber_unique', 'unique': True}),
+        # Listing paginé (keyset) trié par date de réservation, puis filtré par statut/voiture/client
+        ([('reservationDate', DESCENDING), ('_id', DESCENDING)], {'name': 'reservationDate_id'}),
+        ([('status', ASCENDING), ('reservationDate', DESCENDING), ('_id', DESCENDING)], {'name': 'status_reservationDate_id'}),
+        ([('carId', ASCENDING), ('reservationDate', DESCENDING), ('_id', DESCENDING)], {'name': 'carId_reservationDate_id'}),
+        ([('clientId', ASCENDING), ('reservationDate', DESCENDING), ('_id', DESCENDING)], {'name': 'clientId_reservationDate_id'}),
+        # Dernière location d'un client (stats.lastRentalAt), relue quand sa location la plus récente disparaît
+        ([('clientId', ASCENDING), ('status', ASCENDING), ('startDate', DESCENDING)], {'name': 'clientId_status_startDate'}),
+        # Requêtes par plage de dates (BSON Date) : revenus mensuels et réservations d'une voiture sur une période
+        ([('status', ASCENDING), ('actualReturnDate', ASCENDING)], {'name': 'status_actualReturnDate'}),
+        ([('carId', ASCENDING), ('startDate', ASCENDING), ('endDate', ASCENDING)], {'name': 'carId_startDate_endDate'}),
+    ],
+    'booking_slots': [
+        # Un seul document par voiture et par jour : la détection de double réservation repose sur cette contrainte
+        ([('carId', ASCENDING), ('day', ASCENDING)], {'name': 'carId_day_unique', 'unique': True}),
+        ([('reservationId', ASCENDING)], {'name': 'reservationId'}),
+        # Recherche de disponibilité : voitures occupées sur une plage de jours
+        ([('day', ASCENDING), ('carId', ASCENDING)], {'name': 'day_carId'}),
+    ],
+    'cars': [
+        # Unicité de la plaque et du VIN : les routes traduisent DuplicateKeyError en 409 (duplicate_key_message)
+        ([('licensePlate', ASCENDING)], {'name': 'licensePlate_unique', 'unique': True}),
+        ([('vin', ASCENDING)], {'name': 'vin_unique', 'unique': True}),
+        # Recherche de disponibilité triée par tarif journalier (keyset), éventuellement filtrée par marque
+        ([('dailyRate', ASCENDING), ('_id', ASCENDING)], {'name': 'dailyRate_id'}),
+        ([('make', ASCENDING), ('dailyRate', ASCENDING), ('_id', ASCENDING)], {'name': 'make_dailyRate_id'}),
+        # Listing paginé : filtre par statut, tri par _id (défaut), marque, année ou tarif
+        ([('status', ASCENDING), ('_id', ASCENDING)], {'name': 'status_id'}),
+        ([('status', ASCENDING), ('dailyRate', ASCENDING), ('_id', ASCENDING)], {'name': 'status_dailyRate_id'}),
+        ([('make', ASCENDING), ('_id', ASCENDING)], {'name': 'make_id'}),
+        ([('year', ASCENDING), ('_id', ASCENDING)], {'name': 'year_id'}),
+        # Recherche : préfixes sur les clés normalisées (saisie semi-automatique) et index texte (mots entiers)
+        ([('searchKeys', ASCENDING)], {'name': 'searchKeys'}),
+        ([('make', TEXT), ('model', TEXT), ('licensePlate', TEXT), ('vin', TEXT)],
+         {'name': 'cars_text', 'default_language': 'none',
+          'weights': {'licensePlate': 10, 'vin': 10, 'make': 3, 'model': 3}}),
+        # Ramasse-miettes des images (flask images gc) : voitures référençant un lot d'URLs (requête couverte)
+        ([('imageUrl', ASCENDING)], {'name': 'imageUrl'}),
+    ],
+    'clients': [
+        ([('phone', ASCENDING)], {'name': 'phone_unique', 'unique': True}),
+        ([('CIN', ASCENDING)], {'name': 'CIN_unique', 'unique': True}),
+        # L'email est facultatif : seuls les emails renseignés (chaînes non vides) doivent être uniques
+        ([('email', ASCENDING)], {'name': 'email_unique', 'unique': True,
+                                  'partialFilterExpression': {'email': {'$gt': ''}}}),
+        # Listing trié par date d'inscription
+        ([('registeredAt', ASCENDING)], {'name': 'registeredAt'}),
+        # Recherche de clients : préfixes sur les champs normalisés (voir utils/search.py)
+        ([('phoneDigits', ASCENDING)], {'name': 'phoneDigits'}),
+        ([('cinUpper', ASCENDING)], {'name': 'cinUpper'}),
+        ([('emailLower', ASCENDING)], {'name': 'emailLower'}),
+        ([('nameKeys', ASCENDING)], {'name': 'nameKeys'}),
+    ],
+    'users': [
+        ([('username', ASCENDING)], {'name': 'username_unique', 'unique': True}),
+        # Liste des managers triée par nom d'utilisateur
+        ([('role', ASCENDING), ('username', ASCENDING)], {'name': 'role_username'}),
+    ],
+    'audit_log': [
+        # Journal paginé du plus récent au plus ancien, éventuellement filtré par utilisateur ou entité
+        ([('timestamp', DESCENDING)], {'name': 'timestamp'}),
+        ([('userId', ASCENDING), ('timestamp', DESCENDING)], {'name': 'userId_timestamp'}),
+        ([('entityId', ASCENDING), ('timestamp', DESCENDING)], {'name': 'entityId_timestamp'}),
+    ],
+}
+
+# Requêtes représentatives des routes : (libellé, collection, filtre, tri) ; 'flask indexes explain'
+# vérifie sur une base existante que le plan retenu pour chacune n'inclut aucun COLLSCAN.
+# tests/test_index_plans.py fait de même automatiquement avec les commandes réellement envoyées par les routes.
+_SAMPLE_ID = ObjectId('000000000000000000000000')
+_SAMPLE_DAY = datetime(2025, 1, 1)
+ROUTE_QUERIES = [
+    ('cars: list', 'cars', {}, [('_id', 1)]),
+    ('cars: list by status', 'cars', {'status': 'available'}, [('_id', 1)]),
+    ('cars: list by make', 'cars', {'make': 'Dacia'}, [('_id', 1)]),
+    ('cars: list sorted by year', 'cars', {}, [('year', 1), ('_id', 1)]),
+    ('cars: available by rate', 'cars', {'status': {'$nin': ['maintenance', 'out_of_service']}}, [('dailyRate', 1), ('_id', 1)]),
+    ('cars: search prefix', 'cars', {'searchKeys': {'$regex': '^dac'}}, None),
+    ('cars: search text', 'cars', {'$text': {'$search': 'dacia'}}, None),
+    ('cars: unique licensePlate', 'cars', {'licensePlate': '12345-A-6'}, None),
+    ('cars: unique vin', 'cars', {'vin': 'VF1AAAAAA00000000'}, None),
+    ('cars: images gc', 'cars', {'imageUrl': {'$in': ['/static/uploads/cars/ab/cd/abcd.jpg']}}, None),
+    ('clients: list', 'clients', {}, [('registeredAt', 1)]),
+    ('clients: unique phone', 'clients', {'phone': '0600000000'}, None),
+    ('clients: unique CIN', 'clients', {'CIN': 'AB123456'}, None),
+    ('clients: unique email', 'clients', {'email': 'client@example.com'}, None),
+    ('clients: search', 'clients', {'$or': [{'nameKeys': {'$regex': '^dup'}}, {'cinUpper': {'$regex': '^DUP'}},
+                                            {'emailLower': {'$regex': '^dup'}}]}, None),
+    ('clients: search phone', 'clients', {'phoneDigits': {'$regex': '^612'}}, None),
+    ('clients: search exact', 'clients', {'$or': [{'phoneDigits': '612345678'}, {'cinUpper': 'AB123456'},
+                                                  {'emailLower': 'ab123456'}]}, None),
+    ('users: login', 'users', {'username': 'manager'}, None),
+    ('users: managers', 'users', {'role': 'manager'}, [('username', 1)]),
+    ('reservations: list', 'reservations', {}, [('reservationDate', -1), ('_id', -1)]),
+    ('reservations: by status', 'reservations', {'status': 'confirmed'}, [('reservationDate', -1), ('_id', -1)]),
+    ('reservations: by car', 'reservations', {'carId': _SAMPLE_ID}, [('reservationDate', -1), ('_id', -1)]),
+    ('reservations: by client', 'reservations', {'clientId': _SAMPLE_ID}, [('reservationDate', -1), ('_id', -1)]),
+    ('reservations: client last rental', 'reservations', {'clientId': _SAMPLE_ID, 'status': {'$in': ['active', 'completed']}},
+     [('startDate', -1)]),
+    ('reservations: revenue', 'reservations', {'status': 'completed', 'actualReturnDate': {'$gte': _SAMPLE_DAY}}, None),
+    ('booking_slots: occupied cars', 'booking_slots', {'day': {'$gte': _SAMPLE_DAY, '$lte': _SAMPLE_DAY}}, None),
+    ('booking_slots: by reservation', 'booking_slots', {'reservationId': _SAMPLE_ID}, None),
+    ('audit_log: list', 'audit_log', {}, [('timestamp', -1)]),
+    ('audit_log: by user', 'audit_log', {'userId': _SAMPLE_ID}, [('timestamp', -1)]),
+]
+
+
+def apply_indexes():
+    """
+    Crée (de manière idempotente) les index déclarés dans INDEXES.
+
+    Un index qui ne peut être créé (doublons existants pour un index unique, options différentes
+    d'un index du même nom) n'empêche pas la création des autres.
+
+    Returns:
+        list: (collection, nom de l'index, message d'erreur) pour chaque index non créé.
+    """
+    failures = []
+    for collection_name, specs in INDEXES.items():
+        collection = mongo.db[collection_name]
+        for keys, options in specs:
+            try:
+                collection.create_index(keys, **options)
+            except OperationFailure as e:
+                failures.append((collection_name, options['name'], str(e)))
+    return failures
+
+
+def ensure_indexes(app):
+    """Applique INDEXES au démarrage et journalise les index qui n'ont pas pu être créés."""
+    failures = apply_indexes()
+    for collection_name, name, error in failures:
+        app.logger.error(f"Could not create index {collection_name}.{name}: {error}")
+        if (collection_name, name) == ('booking_slots', 'carId_day_unique'):
+            # Le registre refuse alors toute réservation (booking_ledger.LedgerIndexMissingError)
+            app.logger.critical("Booking ledger unique index is missing: reservations will be refused until it exists.")
+    app.logger.info(f"MongoDB indexes ensured ({len(failures)} failure(s)).")
+
+
+def _index_spec(options):
+    """Options comparables d'un index (déclaré ou lu via list_indexes)."""
+    return {key: options.get(key) for key in ('unique', 'partialFilterExpression') if options.get(key)}
+
+
+def check_indexes():
+    """
+    Compare les index existants aux déclarations.
+
+    Returns:
+        dict: {'missing': [...], 'mismatched': [...], 'undeclared': [...], 'unused': [...]},
+              chaque entrée étant 'collection.nom'. 'unused' liste les index déclarés sans aucune
+              utilisation depuis le dernier redémarrage du serveur ($indexStats).
+    """
+    report = {'missing': [], 'mismatched': [], 'undeclared': [], 'unused': []}
+    for collection_name, specs in INDEXES.items():
+        collection = mongo.db[collection_name]
+        existing = {index['name']: index for index in collection.list_indexes()}
+        declared = {options['name']: (keys, options) for keys, options in specs}
+
+        for name, (keys, options) in declared.items():
+            index = existing.get(name)
+            if index is None:
+                report['missing'].append(f"{collection_name}.{name}")
+            elif TEXT not in [direction for _, direction in keys] and (
+                    list(index['key'].items()) != [(field, direction) for field, direction in keys]
+                    or _index_spec(index) != _index_spec(options)):
+                report['mismatched'].append(f"{collection_name}.{name}")
+        report['undeclared'].extend(f"{collection_name}.{name}" for name in existing if name != '_id_' and name not in declared)
+
+        try:
+            for stats in collection.aggregate([{'$indexStats': {}}]):
+                if stats['name'] in declared and stats['accesses']['ops'] == 0:
+                    report['unused'].append(f"{collection_name}.{stats['name']}")
+        except OperationFailure:
+            # $indexStats demande le privilège indexStats ; le reste du rapport reste valable
+            pass
+    return report
+
+
+def _plan_stages(plan):
+    """Noms de toutes les étapes d'un plan d'exécution (arbre imbriqué inputStage/inputStages/queryPlan)."""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for key in ('inputStage', 'queryPlan', 'outerStage', 'innerStage'):
+            stages.extend(_plan_stages(plan.get(key)))
+        for child in plan.get('inputStages', []):
+            stages.extend(_plan_stages(child))
+    return stages
+
+
+def explain_route_queries():
+    """
+    Explique chaque requête de ROUTE_QUERIES.
+
+    Returns:
+        list: (libellé, étapes du plan retenu, True si le plan n'utilise aucun COLLSCAN)
+    """
+    results = []
+    for label, collection_name, query, sort in ROUTE_QUERIES:
+        cursor = mongo.db[collection_name].find(query).limit(50)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = cursor.explain()
+        stages = _plan_stages(explanation.get('queryPlanner', {}).get('winningPlan', {}))
+        results.append((label, stages, 'COLLSCAN' not in stages))
+    return results
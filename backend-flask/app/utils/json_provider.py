@@ -0,0 +1,85 @@
+# app/utils/json_provider.py
+import dataclasses
+from datetime import date, datetime
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+
+try:
+    import orjson
+except ImportError:  # Dépendance optionnelle : repli sur le module json standard
+    orjson = None
+
+JSON_BACKENDS = ('auto', 'orjson', 'json')
+
+
+def json_default(obj):
+    """
+    Conversion des types BSON / Python non natifs en JSON (mêmes rendus que l'ancien bson_to_json) :
+    ObjectId -> chaîne hexadécimale, datetime / date -> ISO 8601, Decimal / Decimal128 -> chaîne (précision conservée).
+    """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """
+    Fournisseur JSON de l'application : les documents MongoDB (ObjectId, dates) sont encodés en une seule
+    passe par jsonify / le retour d'un dict, sans conversion préalable des données.
+
+    Remplace le BSONProvider installé par Flask-PyMongo (format étendu {"$oid": ...}, {"$date": ...}).
+    Utilise orjson lorsqu'il est installé (JSON_BACKEND = 'auto' ou 'orjson'), sinon le module json standard.
+    """
+
+    default = staticmethod(json_default)
+    ensure_ascii = False
+    # L'ordre des champs des documents est conservé : pas de tri des clés à chaque réponse
+    sort_keys = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        backend = app.config.get('JSON_BACKEND', 'auto')
+        if backend not in JSON_BACKENDS:
+            raise ValueError(f"JSON_BACKEND must be one of: {', '.join(JSON_BACKENDS)}.")
+        if backend == 'orjson' and orjson is None:
+            app.logger.warning("JSON_BACKEND is 'orjson' but orjson is not installed; using the json module.")
+        self.use_orjson = orjson is not None and backend != 'json'
+
+    def _orjson_options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        # Les options propres au module json (indent, separators...) imposent le repli sur celui-ci
+        if self.use_orjson and not kwargs:
+            return orjson.dumps(obj, default=json_default, option=self._orjson_options()).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=json_default, option=self._orjson_options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,87 @@
+# app/utils/pagination.py
+import base64
+from bson import json_util
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Convertit le paramètre 'limit' en taille de page bornée (lève ValueError si invalide)."""
+    if value is None or value == '':
+        return default
+    size = int(value)
+    if size < 1:
+        raise ValueError("limit must be a positive integer.")
+    return min(size, maximum)
+
+
+def encode_cursor(values):
+    """Encode les valeurs de tri du dernier élément d'une page en jeton opaque (base64 url-safe)."""
+    raw = json_util.dumps(list(values))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort_fields):
+    """Décode un jeton produit par encode_cursor (lève ValueError si le jeton est invalide)."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != len(sort_fields):
+        raise ValueError("Invalid cursor.")
+    return values
+
+
+def keyset_filter(sort_fields, values):
+    """
+    Construit le filtre "après le curseur" pour un tri composé.
+
+    Args:
+        sort_fields (list): Liste de (champ, direction) ; le dernier champ doit être unique (ex: _id).
+        values (list): Valeurs de ces champs pour le dernier élément de la page précédente.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort_fields):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort_fields[:i])}
+        clause[field] = {'$lt' if direction < 0 else '$gt': values[i]}
+        clauses.append(clause)
+    return {'$or': clauses}
+
+
+def apply_cursor(query, sort_fields, cursor):
+    """Ajoute la condition de keyset à une requête si un curseur est fourni."""
+    if not cursor:
+        return query
+    after = keyset_filter(sort_fields, decode_cursor(cursor, sort_fields))
+    return {'$and': [query, after]} if query else after
+
+
+def split_page(items, limit, sort_fields):
+    """
+    Tronque une liste récupérée avec limit + 1 éléments et calcule le curseur suivant.
+
+    Les documents peuvent exposer leur identifiant sous '_id' ou 'id' (après mongo_to_dict).
+    """
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    values = []
+    for field, _ in sort_fields:
+        if field == '_id':
+            values.append(last.get('_id', last.get('id')))
+        else:
+            values.append(_get_path(last, field))
+    return items, encode_cursor(values)
+
+
+def _get_path(doc, path):
+    """Lit un champ éventuellement imbriqué ('a.b') dans un document."""
+    value = doc
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
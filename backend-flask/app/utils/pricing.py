@@ -0,0 +1,84 @@
+# app/utils/pricing.py
+from datetime import date
+from flask import current_app
+
+# NumPy est optionnel : sans lui, les devis sont calculés en Python pur (mêmes résultats)
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    np = None
+
+# En dessous de ce nombre de devis, le coût de conversion vers NumPy dépasse le gain
+VECTORIZE_MIN_ITEMS = 16
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class PricingError(ValueError):
+    """Levée lorsqu'un devis ne peut pas être calculé (tarif absent ou invalide, dates incohérentes)."""
+
+
+def get_weekend_multiplier():
+    """Multiplicateur appliqué au tarif journalier les samedis et dimanches (PRICING_WEEKEND_MULTIPLIER)."""
+    return float(current_app.config.get('PRICING_WEEKEND_MULTIPLIER', 1.0))
+
+
+def _weekend_days(first_day, days):
+    """Nombre de samedis/dimanches parmi les `days` jours calendaires commençant à first_day."""
+    full_weeks, remainder = divmod(days, 7)
+    first_weekday = first_day.weekday()
+    return full_weeks * 2 + sum(1 for i in range(remainder) if (first_weekday + i) % 7 >= 5)
+
+
+def _quote_python(daily_rates, starts, ends, weekend_multiplier):
+    quotes = []
+    for rate, start, end in zip(daily_rates, starts, ends):
+        days = (end - start).days + 1
+        weekend_days = _weekend_days(start.date(), days)
+        cost = rate * (days + weekend_days * (weekend_multiplier - 1.0))
+        quotes.append((days, weekend_days, round(cost, 2)))
+    return quotes
+
+
+def _quote_numpy(daily_rates, starts, ends, weekend_multiplier):
+    count = len(daily_rates)
+    rates = np.fromiter(daily_rates, dtype=np.float64, count=count)
+    # Conversion en entiers côté Python : np.asarray sur des datetime est nettement plus lent
+    days = np.fromiter(((end - start).days + 1 for start, end in zip(starts, ends)), dtype=np.int64, count=count)
+    first_days = np.fromiter((start.toordinal() - EPOCH_ORDINAL for start in starts), dtype=np.int64, count=count).astype('datetime64[D]')
+    weekend_days = days - np.busday_count(first_days, first_days + days.astype('timedelta64[D]'))
+    costs = np.round(rates * (days + weekend_days * (weekend_multiplier - 1.0)), 2)
+    return list(zip(days.tolist(), weekend_days.tolist(), costs.tolist()))
+
+
+def quote_costs(daily_rates, starts, ends, weekend_multiplier=None):
+    """
+    Calcule les devis de plusieurs locations en une passe (vectorisée si NumPy est disponible).
+
+    Args:
+        daily_rates (list): Tarifs journaliers (> 0).
+        starts (list): Dates de début (datetime naïfs UTC).
+        ends (list): Dates de fin (datetime naïfs UTC, >= début).
+        weekend_multiplier (float): Par défaut, la valeur de configuration PRICING_WEEKEND_MULTIPLIER.
+
+    Returns:
+        list: (jours facturés, dont jours de week-end, coût estimé) pour chaque location, dans l'ordre.
+    """
+    if not (len(daily_rates) == len(starts) == len(ends)):
+        raise PricingError("daily_rates, starts and ends must have the same length.")
+    if weekend_multiplier is None:
+        weekend_multiplier = get_weekend_multiplier()
+    for rate, start, end in zip(daily_rates, starts, ends):
+        if not rate or rate <= 0:
+            raise PricingError("Car daily rate is not set or invalid.")
+        if end < start:
+            raise PricingError("End date cannot be before start date.")
+    if np is not None and len(daily_rates) >= VECTORIZE_MIN_ITEMS:
+        return _quote_numpy(daily_rates, starts, ends, weekend_multiplier)
+    return _quote_python(daily_rates, starts, ends, weekend_multiplier)
+
+
+def quote_cost(daily_rate, start, end, weekend_multiplier=None):
+    """Devis d'une seule location : renvoie le coût estimé (voir quote_costs)."""
+    return quote_costs([daily_rate], [start], [end], weekend_multiplier)[0][2]
+
@@ -0,0 +1,158 @@
+# app/utils/search.py
+import re
+import unicodedata
+
+# Nombre maximal de documents candidats lus par une recherche par préfixe avant classement
+SEARCH_CANDIDATE_LIMIT = 200
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize_text(value):
+    """Minuscules, sans accents : 'Citroën C3' -> 'citroen c3'."""
+    if value is None:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def search_tokens(value):
+    """Mots alphanumériques normalisés d'une valeur."""
+    return _TOKEN_RE.findall(normalize_text(value))
+
+
+def compact_key(value):
+    """Valeur normalisée sans séparateurs : '12345-A-6' -> '12345a6' (plaques, VIN, téléphones...)."""
+    return ''.join(search_tokens(value))
+
+
+def car_search_keys(car):
+    """
+    Clés de recherche d'une voiture (champ 'searchKeys', index multiclé) : mots de la marque et du modèle,
+    plaque et VIN compactés, ainsi que les mots de la plaque.
+    """
+    keys = set(search_tokens(car.get('make'))) | set(search_tokens(car.get('model')))
+    keys.update(search_tokens(car.get('licensePlate')))
+    for field in ('licensePlate', 'vin'):
+        compact = compact_key(car.get(field))
+        if compact:
+            keys.add(compact)
+    return sorted(keys)
+
+
+def prefix_match_query(field, query_text):
+    """
+    Filtre "chaque mot de la requête est le préfixe d'une clé" sur un champ de clés normalisées.
+    Les expressions ancrées '^...' sur des clés minuscules utilisent les bornes de l'index.
+    Une requête de plusieurs mots (ex: une plaque saisie avec ses tirets) peut aussi correspondre à sa forme compacte.
+
+    Returns:
+        tuple: (filtre MongoDB, liste des mots) ; (None, []) si la requête ne contient aucun mot.
+    """
+    terms = search_tokens(query_text)
+    if not terms:
+        return None, []
+    # Les mots ne contiennent que [a-z0-9] : aucun échappement n'est nécessaire
+    clauses = [{field: {'$regex': f'^{term}'}} for term in terms]
+    query = clauses[0] if len(clauses) == 1 else {'$and': clauses}
+    if len(terms) > 1:
+        query = {'$or': [query, {field: {'$regex': f"^{''.join(terms)}"}}]}
+    return query, terms
+
+
+# Champs source des clés de recherche des clients
+CLIENT_SEARCH_SOURCE_FIELDS = ('firstName', 'lastName', 'phone', 'CIN', 'email')
+_NON_DIGIT_RE = re.compile(r'\D')
+# Longueur des numéros nationaux (Maroc : 9 chiffres après le 0 ou l'indicatif +212)
+NATIONAL_NUMBER_DIGITS = 9
+
+
+def phone_keys(phone):
+    """
+    Formes indexées d'un numéro : tous ses chiffres, sans les zéros initiaux (préfixe national ou '00'),
+    et ses NATIONAL_NUMBER_DIGITS derniers chiffres (numéro national sans indicatif pays).
+    '+212 6 12 34 56 78' et '0612345678' partagent ainsi la clé '612345678'.
+    """
+    digits = _NON_DIGIT_RE.sub('', str(phone or ''))
+    if not digits:
+        return []
+    keys = {digits, digits.lstrip('0') or digits}
+    if len(digits) > NATIONAL_NUMBER_DIGITS:
+        keys.add(digits[-NATIONAL_NUMBER_DIGITS:])
+    return sorted(keys)
+
+
+def client_search_fields(client):
+    """
+    Champs normalisés (et indexés) d'un client : chiffres du téléphone, CIN compact en majuscules,
+    email en minuscules et mots du prénom et du nom.
+    """
+    email = (client.get('email') or '').strip().lower()
+    return {
+        'phoneDigits': phone_keys(client.get('phone')),
+        'cinUpper': compact_key(client.get('CIN')).upper() or None,
+        'emailLower': email or None,
+        'nameKeys': sorted(set(search_tokens(client.get('firstName'))) | set(search_tokens(client.get('lastName')))),
+    }
+
+
+def client_match_query(query_text):
+    """
+    Filtre de recherche de clients : un préfixe sur chacun des champs normalisés auquel la requête peut
+    correspondre (nom, téléphone, CIN, email), combinés par $or pour que chaque branche utilise son index.
+
+    Returns:
+        tuple: (filtre MongoDB ou None, valeurs normalisées de la requête pour le classement)
+    """
+    text = (query_text or '').strip()
+    clauses = []
+    normalized = {'nameKeys': set(), 'phoneDigits': None, 'cinUpper': None, 'emailLower': None}
+
+    name_query, terms = prefix_match_query('nameKeys', text)
+    if name_query:
+        clauses.append(name_query)
+        normalized['nameKeys'] = set(terms)
+
+    digits = _NON_DIGIT_RE.sub('', text)
+    if len(digits) >= 3 and not re.search(r'[^\d\s+().-]', text):
+        # Chaque numéro est aussi indexé sans ses zéros initiaux : '0612...' et '00212...' sont couverts
+        digits = digits.lstrip('0') or digits
+        clauses.append({'phoneDigits': {'$regex': f'^{digits}'}})
+        normalized['phoneDigits'] = digits
+
+    cin = compact_key(text).upper()
+    if cin and (digits or not re.search(r'\s', text)):
+        clauses.append({'cinUpper': {'$regex': f'^{cin}'}})
+        normalized['cinUpper'] = cin
+
+    if text and not re.search(r'\s', text):
+        email = text.lower()
+        clauses.append({'emailLower': {'$regex': f'^{re.escape(email)}'}})
+        normalized['emailLower'] = email
+
+    if not clauses:
+        return None, normalized
+    return (clauses[0] if len(clauses) == 1 else {'$or': clauses}), normalized
+
+
+def client_exact_query(normalized):
+    """
+    Filtre des clients dont le téléphone, le CIN ou l'email est égal à la valeur normalisée de la requête
+    (égalités indexées, quelques documents au plus), lus avant les candidats par préfixe : un préfixe
+    de nom courant ne peut ainsi pas écarter une correspondance exacte de la liste des candidats.
+
+    Returns:
+        dict ou None: filtre MongoDB, None si la requête ne peut correspondre exactement à aucun de ces champs.
+    """
+    clauses = [{field: normalized[field]} for field in ('phoneDigits', 'cinUpper', 'emailLower') if normalized[field]]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$or': clauses}
+
+
+def client_match_rank(client, normalized):
+    """Clé de tri : correspondances exactes (téléphone, CIN, email) puis nombre de mots égaux à un nom."""
+    exact = sum(1 for field in ('cinUpper', 'emailLower') if normalized[field] and client.get(field) == normalized[field])
+    if normalized['phoneDigits'] and normalized['phoneDigits'] in (client.get('phoneDigits') or []):
+        exact += 1
+    return (-exact, -len(normalized['nameKeys'].intersection(client.get('nameKeys') or [])))
@@ -0,0 +1,55 @@
+# app/utils/sequences.py
+import os
+import threading
+from pymongo import ReturnDocument
+from ..extensions import mongo
+
+counters_collection = lambda: mongo.db.counters
+
+
+class BlockSequence:
+    """
+    Séquence monotone adossée à un document de la collection 'counters'.
+
+    Chaque processus réserve un bloc de valeurs avec un seul find_one_and_update($inc) atomique,
+    puis les sert en mémoire : aucune lecture n'est nécessaire pour obtenir une valeur unique.
+    """
+
+    def __init__(self, name, block_size=20):
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+        self._owner = None
+
+    def _allocate_block(self, size):
+        """Réserve atomiquement [début, fin) dans le compteur et renvoie les bornes du bloc."""
+        counter = counters_collection().find_one_and_update(
+            {'_id': self.name},
+            {'$inc': {'value': size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter['value'] - size + 1, counter['value'] + 1
+
+    def next_values(self, count=1):
+        """Renvoie count valeurs uniques, en réservant de nouveaux blocs si nécessaire."""
+        with self._lock:
+            # Un bloc hérité d'un fork (workers gunicorn) ou réservé dans une autre base n'est pas réutilisable
+            owner = (os.getpid(), mongo.db.name)
+            if self._owner != owner:
+                self._next = self._end = 0
+                self._owner = owner
+
+            values = []
+            while len(values) < count:
+                if self._next >= self._end:
+                    self._next, self._end = self._allocate_block(max(self.block_size, count - len(values)))
+                take = min(self._end - self._next, count - len(values))
+                values.extend(range(self._next, self._next + take))
+                self._next += take
+            return values
+
+    def next_value(self):
+        return self.next_values(1)[0]
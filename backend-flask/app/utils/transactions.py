@@ -0,0 +1,25 @@
+# app/utils/transactions.py
+from ..extensions import mongo
+
+# Types de topologie sur lesquels MongoDB accepte les transactions multi-documents
+TRANSACTIONAL_TOPOLOGIES = {'ReplicaSetWithPrimary', 'Sharded', 'LoadBalanced'}
+
+
+def supports_transactions():
+    """Indique si le serveur connecté accepte les transactions (replica set ou cluster shardé)."""
+    if mongo.cx.topology_description.topology_type_name == 'Unknown':
+        # Forcer la découverte de la topologie avant la première requête
+        mongo.db.command('ping')
+    return mongo.cx.topology_description.topology_type_name in TRANSACTIONAL_TOPOLOGIES
+
+
+def run_in_transaction(callback):
+    """
+    Exécute callback(session) dans une transaction multi-documents lorsque le serveur le permet
+    (avec les reprises automatiques de with_transaction), sinon directement avec session=None,
+    par exemple sur un mongod autonome de développement.
+    """
+    if not supports_transactions():
+        return callback(None)
+    with mongo.cx.start_session() as session:
+        return session.with_transaction(callback)
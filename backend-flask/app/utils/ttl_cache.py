@@ -0,0 +1,43 @@
+# app/utils/ttl_cache.py
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Petit cache mémoire par processus : chaque entrée expire ttl secondes après son calcul.
+
+    Le nombre d'entrées est borné (les plus anciennes sont évincées en premier) ; le cache
+    convient aux résultats coûteux mais tolérant un léger retard (tableaux de bord, statistiques).
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key):
+        """Valeur encore valide pour key, ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_entries:
+                # Les dictionnaires conservent l'ordre d'insertion : la première clé est la plus ancienne
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,108 @@
+# app/utils/versions.py
+import hashlib
+from functools import wraps
+from bson import ObjectId
+from flask import current_app, request, g, has_request_context
+from pymongo import UpdateOne
+from ..extensions import mongo
+
+# Un compteur par collection : {_id: 'cars', version: 12, epoch: ObjectId}
+collection_versions = lambda: mongo.db.collection_versions
+
+# Les réponses validées par ETag sont gardées par le navigateur mais toujours revalidées
+VERSIONED_CACHE_CONTROL = 'private, no-cache'
+
+
+def bump_versions(*names):
+    """
+    Incrémente le compteur de version des collections modifiées, en un seul aller-retour.
+
+    À appeler APRÈS l'écriture (et après la validation d'une transaction) : une lecture qui voit
+    l'ancienne version avec les nouvelles données sera simplement revalidée à la requête suivante,
+    alors que l'ordre inverse pourrait associer d'anciennes données à la nouvelle version.
+    L'epoch, fixée à la création du compteur, évite de réutiliser une ETag si les compteurs sont réinitialisés.
+    """
+    if not names:
+        return
+    collection_versions().bulk_write([
+        UpdateOne({'_id': name}, {'$inc': {'version': 1}, '$setOnInsert': {'epoch': ObjectId()}}, upsert=True)
+        for name in names
+    ], ordered=False)
+
+
+def safe_bump_versions(*names):
+    """bump_versions dont l'échec est journalisé sans interrompre l'appelant (l'écriture a déjà eu lieu)."""
+    try:
+        bump_versions(*names)
+    except Exception as e:
+        current_app.logger.error(f"Failed to bump collection versions {', '.join(names)}: {e}")
+
+
+def versions_etag(names):
+    """ETag forte dérivée des compteurs des collections (une seule requête sur collection_versions)."""
+    counters = {doc['_id']: doc for doc in collection_versions().find({'_id': {'$in': list(names)}})}
+    key = '|'.join(
+        f"{name}:{counters.get(name, {}).get('epoch', '')}:{counters.get(name, {}).get('version', 0)}"
+        for name in names
+    )
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+def versioned(*names):
+    """
+    Décorateur des GET (liste ou détail) dont la réponse ne dépend que des collections names :
+    l'ETag est calculée depuis leurs compteurs et un If-None-Match correspondant reçoit un 304
+    sans que la vue ni les collections de données ne soient interrogées.
+    À placer sous login_required, pour que l'authentification soit vérifiée avant.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                etag = versions_etag(names)
+            except Exception as e:
+                current_app.logger.error(f"Failed to read collection versions {', '.join(names)}: {e}")
+                return f(*args, **kwargs)
+
+            # Comparaison faible : la compression rend l'ETag faible (W/"...") côté client
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = VERSIONED_CACHE_CONTROL
+            return response
+        return decorated_function
+    return decorator
+
+
+def mark_written():
+    """
+    Signale à bumps_versions qu'une écriture a eu lieu pendant la requête en cours.
+    Appelée par les fonctions d'écriture (writes, registre, compteurs clients, import) et par les routes
+    qui écrivent directement ; sans effet hors requête (commandes CLI, tâches de fond).
+    """
+    if has_request_context():
+        g.versions_written = True
+
+
+def bumps_versions(*names):
+    """
+    Décorateur des routes d'écriture : incrémente les compteurs des collections names après la vue
+    si une écriture a été signalée (mark_written), quel que soit le code de la réponse :
+    une réponse 4xx peut suivre une écriture partielle (import interrompu, réservation supprimée
+    entre-temps), et une requête refusée avant toute écriture ne change aucune version.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.versions_written = False
+            try:
+                return f(*args, **kwargs)
+            finally:
+                if g.versions_written:
+                    safe_bump_versions(*names)
+        return decorated_function
+    return decorator
@@ -0,0 +1,56 @@
+# app/utils/writes.py
+from pymongo import ReturnDocument
+from .versions import mark_written
+
+
+def update_and_fetch(collection, query, update_fields, projection=None, session=None):
+    """
+    Applique un $set et renvoie le document mis à jour en un seul aller-retour
+    (find_one_and_update avec ReturnDocument.AFTER). Renvoie None si aucun document ne correspond.
+    """
+    updated = collection.find_one_and_update(
+        query,
+        {'$set': update_fields},
+        projection=projection,
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if updated is not None:
+        mark_written()
+    return updated
+
+
+def insert_and_fetch(collection, document, exclude_fields=(), session=None):
+    """
+    Insère un document et renvoie une copie de ce qui a été écrit (avec son _id),
+    sans relire la base. Les champs de exclude_fields (ex: password_hash) sont retirés de la copie.
+    """
+    collection.insert_one(document, session=session)
+    mark_written()
+    created = dict(document)
+    for field in exclude_fields:
+        created.pop(field, None)
+    return created
+
+
+# Libellés des champs soumis à un index unique, pour les messages d'erreur 409
+UNIQUE_FIELD_LABELS = {
+    'licensePlate': 'License plate',
+    'vin': 'VIN',
+    'phone': 'Client with phone number',
+    'CIN': 'Client with CIN',
+    'email': 'Client with email',
+    'username': 'Username',
+}
+
+
+def duplicate_key_message(details):
+    """
+    Message lisible pour une violation d'index unique (DuplicateKeyError.details ou
+    entrée 'writeErrors' d'une BulkWriteError), ex: "VIN 'VF1...' already exists.".
+    """
+    key_value = (details or {}).get('keyValue') or {}
+    if len(key_value) == 1:
+        field, value = next(iter(key_value.items()))
+        return f"{UNIQUE_FIELD_LABELS.get(field, field)} '{value}' already exists."
+    return "A record with the same unique value already exists."
@@ -0,0 +1,111 @@
+# benchmarks/bench_availability.py
+"""
+Benchmark de GET /api/cars/available sur un jeu de données synthétique.
+
+Usage (depuis backend-flask/, avec un serveur MongoDB local) :
+    python -m benchmarks.bench_availability --cars 10000 --reservations 1000000
+
+Les données sont écrites dans une base dédiée (BENCH_MONGO_URI, par défaut locacar_bench)
+qui est vidée au début du benchmark.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+os.environ['MONGO_URI'] = os.environ.get('BENCH_MONGO_URI', 'mongodb://127.0.0.1:27017/locacar_bench')
+
+from app import create_app  # noqa: E402
+from app.extensions import mongo  # noqa: E402
+
+MAKES = ['Dacia', 'Renault', 'Peugeot', 'Toyota', 'Hyundai', 'Kia', 'Volkswagen', 'Fiat']
+PERIOD_START = datetime(2024, 1, 1)
+PERIOD_DAYS = 730
+BATCH_SIZE = 10000
+
+
+def seed(car_count, reservation_count):
+    db = mongo.db
+    for name in ('cars', 'reservations', 'booking_slots'):
+        db[name].delete_many({})
+
+    car_ids = [ObjectId() for _ in range(car_count)]
+    db.cars.insert_many([
+        {'_id': car_id, 'make': random.choice(MAKES), 'model': 'Model', 'year': 2022,
+         'licensePlate': f"BENCH-{i}", 'vin': f"VIN{i:014d}", 'status': 'available',
+         'dailyRate': float(random.randint(200, 1500))}
+        for i, car_id in enumerate(car_ids)
+    ])
+
+    reservations, slots = [], []
+    for i in range(reservation_count):
+        res_id = ObjectId()
+        car_id = random.choice(car_ids)
+        start = PERIOD_START + timedelta(days=random.randrange(PERIOD_DAYS))
+        length = random.randint(1, 7)
+        reservations.append({'_id': res_id, 'carId': car_id, 'startDate': start,
+                             'endDate': start + timedelta(days=length - 1), 'status': 'confirmed',
+                             'reservationDate': start})
+        # Les chevauchements éventuels du tirage aléatoire sont simplement ignorés (insert non ordonné)
+        slots.extend({'carId': car_id, 'day': start + timedelta(days=d), 'reservationId': res_id} for d in range(length))
+        if len(reservations) >= BATCH_SIZE:
+            _flush(db, reservations, slots)
+    _flush(db, reservations, slots)
+
+
+def _flush(db, reservations, slots):
+    if reservations:
+        db.reservations.insert_many(reservations)
+    if slots:
+        try:
+            db.booking_slots.insert_many(slots, ordered=False)
+        except Exception:
+            pass
+    reservations.clear()
+    slots.clear()
+
+
+def run(app, iterations):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = str(ObjectId())
+        sess['user_role'] = 'manager'
+
+    timings = []
+    for _ in range(iterations):
+        start = PERIOD_START + timedelta(days=random.randrange(PERIOD_DAYS - 14))
+        end = start + timedelta(days=random.randint(1, 14))
+        url = f"/api/cars/available?start={start:%Y-%m-%d}&end={end:%Y-%m-%d}&limit=50"
+        t0 = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - t0) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    timings.sort()
+    print(f"{iterations} requests: p50={statistics.median(timings):.1f} ms, "
+          f"p95={timings[int(len(timings) * 0.95) - 1]:.1f} ms, max={timings[-1]:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cars', type=int, default=10000)
+    parser.add_argument('--reservations', type=int, default=1000000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--skip-seed', action='store_true', help="Reuse the data already in the benchmark database.")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if not args.skip_seed:
+            t0 = time.perf_counter()
+            seed(args.cars, args.reservations)
+            print(f"Seeded {args.cars} cars / {args.reservations} reservations in {time.perf_counter() - t0:.1f} s")
+    run(app, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
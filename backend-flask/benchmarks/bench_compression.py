@@ -0,0 +1,73 @@
+# benchmarks/bench_compression.py
+"""
+Benchmark de la compression des réponses : octets transmis et coût CPU pour des charges typiques.
+
+Usage (depuis backend-flask/, sans serveur MongoDB) :
+    python -m benchmarks.bench_compression
+
+Charges mesurées (JSON compact produit par MongoJSONProvider) :
+  - une page de 50 réservations enrichies (limit par défaut du listing) ;
+  - une page de 200 réservations (limit maximum) ;
+  - un export NDJSON de 10 000 réservations, compressé morceau par morceau comme en flux.
+brotli n'est mesuré que s'il est installé (pip install brotli).
+"""
+import argparse
+import statistics
+import time
+
+from app.utils.compression import _Compressor, brotli
+from app.utils.export import EXPORT_CHUNK_BYTES
+from .bench_json import make_app, make_documents
+
+LEVELS = [('gzip', 1), ('gzip', 6), ('gzip', 9), ('br', 4), ('br', 11)]
+
+
+def payloads(app):
+    documents = make_documents(10000)
+    with app.app_context():
+        dumps = app.json.dumps
+        page_50 = dumps({'reservations': documents[:50], 'nextCursor': 'x' * 40, 'limit': 50}).encode('utf-8')
+        page_200 = dumps({'reservations': documents[:200], 'nextCursor': 'x' * 40, 'limit': 200}).encode('utf-8')
+        export = ''.join(dumps(document) + '\n' for document in documents).encode('utf-8')
+    # L'export est envoyé en morceaux d'environ EXPORT_CHUNK_BYTES, chacun vidé (flush) aussitôt
+    export_chunks = [export[i:i + EXPORT_CHUNK_BYTES] for i in range(0, len(export), EXPORT_CHUNK_BYTES)]
+    return [('page 50', [page_50]), ('page 200', [page_200]), ('export 10k', export_chunks)]
+
+
+def compress(chunks, encoding, level):
+    compressor = _Compressor(encoding, gzip_level=level, brotli_quality=level)
+    if len(chunks) == 1:
+        return len(compressor.compress(chunks[0]) + compressor.finish())
+    size = 0
+    for chunk in chunks:
+        size += len(compressor.compress(chunk) + compressor.flush())
+    return size + len(compressor.finish())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=10)
+    args = parser.parse_args()
+
+    app = make_app('auto')
+    for label, chunks in payloads(app):
+        raw = sum(len(chunk) for chunk in chunks)
+        print(f"{label}: {raw / 1024:.1f} KB uncompressed")
+        for encoding, level in LEVELS:
+            if encoding == 'br' and brotli is None:
+                continue
+            timings = []
+            size = 0
+            for _ in range(args.iterations):
+                t0 = time.process_time()
+                size = compress(chunks, encoding, level)
+                timings.append(time.process_time() - t0)
+            cpu = statistics.median(timings)
+            print(f"  {encoding:4s} level {level:2d}: {size / 1024:8.1f} KB ({size / raw:6.1%})  "
+                  f"cpu {cpu * 1000:7.2f} ms  {raw / cpu / 1e6 if cpu else float('inf'):7.1f} MB/s")
+        if brotli is None:
+            print("  br: not installed (pip install brotli)")
+
+
+if __name__ == '__main__':
+    main()
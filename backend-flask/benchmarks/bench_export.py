@@ -0,0 +1,99 @@
+# benchmarks/bench_export.py
+"""
+Benchmark de GET /api/reservations/export : débit et mémoire de pointe selon le nombre de réservations.
+
+Usage (depuis backend-flask/, avec un serveur MongoDB local) :
+    python -m benchmarks.bench_export --sizes 1000,100000,1000000 --format csv
+
+Pour chaque taille, la réponse est consommée morceau par morceau (comme un client HTTP) ;
+la mémoire de pointe Python (tracemalloc) doit rester du même ordre quelle que soit la taille.
+Les données sont écrites dans une base dédiée (BENCH_MONGO_URI, par défaut locacar_bench)
+qui est vidée avant chaque taille.
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+os.environ['MONGO_URI'] = os.environ.get('BENCH_MONGO_URI', 'mongodb://127.0.0.1:27017/locacar_bench')
+os.environ.setdefault('MONGO_ENSURE_INDEXES', 'false')
+
+from app import create_app  # noqa: E402
+from app.extensions import mongo  # noqa: E402
+
+BATCH_SIZE = 10000
+CAR_COUNT = 500
+CLIENT_COUNT = 5000
+
+
+def seed(reservation_count):
+    db = mongo.db
+    for name in ('cars', 'clients', 'reservations'):
+        db[name].delete_many({})
+
+    car_ids = [ObjectId() for _ in range(CAR_COUNT)]
+    client_ids = [ObjectId() for _ in range(CLIENT_COUNT)]
+    db.cars.insert_many([{'_id': car_id, 'make': 'Dacia', 'model': 'Logan', 'licensePlate': f"BENCH-{i}", 'vin': f"VIN{i:014d}"}
+                         for i, car_id in enumerate(car_ids)])
+    db.clients.insert_many([{'_id': client_id, 'firstName': f"Client{i}", 'lastName': 'Bench', 'CIN': f"BE{i}",
+                             'phone': f"06{i:08d}"}
+                            for i, client_id in enumerate(client_ids)])
+
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(reservation_count):
+        day = start + timedelta(minutes=i)
+        batch.append({'reservationNumber': f"R{i:09d}", 'carId': car_ids[i % CAR_COUNT],
+                      'clientId': client_ids[i % CLIENT_COUNT], 'status': 'completed',
+                      'startDate': day, 'endDate': day + timedelta(days=2), 'reservationDate': day,
+                      'estimatedTotalCost': 600.0, 'finalTotalCost': 600.0,
+                      'paymentDetails': {'amountPaid': 600.0, 'remainingBalance': 0.0, 'transactionDate': day}})
+        if len(batch) >= BATCH_SIZE:
+            db.reservations.insert_many(batch)
+            batch = []
+    if batch:
+        db.reservations.insert_many(batch)
+
+
+def run(app, export_format, batch_size):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = str(ObjectId())
+        sess['user_role'] = 'manager'
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    response = client.get(f"/api/reservations/export?format={export_format}&batchSize={batch_size}", buffered=False)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    total_bytes = 0
+    for chunk in response.response:
+        total_bytes += len(chunk)
+    response.close()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, total_bytes, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,100000,1000000', help="Comma-separated reservation counts.")
+    parser.add_argument('--format', default='ndjson', choices=['ndjson', 'csv'])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_app()
+    for size in (int(value) for value in args.sizes.split(',')):
+        with app.app_context():
+            seed(size)
+        elapsed, total_bytes, peak = run(app, args.format, args.batch_size)
+        print(f"{size:>9d} rows  {elapsed:7.2f} s  {size / elapsed:9.0f} rows/s  "
+              f"{total_bytes / 1e6:8.1f} MB sent  peak memory {peak / 1e6:6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
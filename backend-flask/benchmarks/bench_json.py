@@ -0,0 +1,102 @@
+# benchmarks/bench_json.py
+"""
+Micro-benchmark de la sérialisation des réponses JSON sur une liste de documents de type réservation.
+
+Usage (depuis backend-flask/, sans serveur MongoDB) :
+    python -m benchmarks.bench_json --documents 10000
+
+Compare :
+  - legacy : ancien chemin, bson_to_json (json.dumps + json.loads) puis jsonify via le BSONProvider
+             de Flask-PyMongo (bson.json_util.dumps), soit trois passes sur les données ;
+  - json   : MongoJSONProvider avec le module json standard (une passe) ;
+  - orjson : MongoJSONProvider avec orjson (une passe), si orjson est installé.
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId, json_util
+from flask import Flask
+
+from app.utils.json_provider import MongoJSONProvider, orjson
+
+
+def make_documents(count):
+    start = datetime(2024, 1, 1)
+    documents = []
+    for i in range(count):
+        day = start + timedelta(minutes=i)
+        documents.append({
+            '_id': ObjectId(), 'reservationNumber': f"R{i:09d}", 'carId': ObjectId(), 'clientId': ObjectId(),
+            'startDate': day, 'endDate': day + timedelta(days=3), 'actualPickupDate': None, 'actualReturnDate': None,
+            'status': 'confirmed', 'estimatedTotalCost': 900.0, 'finalTotalCost': None, 'notes': "Livraison à l'aéroport",
+            'reservationDate': day, 'createdBy': ObjectId(), 'lastModifiedAt': day, 'lastModifiedBy': ObjectId(),
+            'paymentDetails': {'amountPaid': 300.0, 'remainingBalance': 600.0, 'transactionDate': day},
+            'carDetails': {'make': 'Dacia', 'model': 'Logan', 'licensePlate': f"{i}-A-1"},
+            'clientDetails': {'firstName': 'Client', 'lastName': f"N{i}", 'phone': '0612345678'},
+        })
+    return documents
+
+
+def _legacy_serializer(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def legacy_response(documents):
+    data = json.loads(json.dumps(documents, default=_legacy_serializer))
+    return json_util.dumps({'reservations': data, 'nextCursor': None, 'limit': len(documents)}).encode('utf-8')
+
+
+def provider_response(app, documents):
+    with app.app_context():
+        return app.json.response({'reservations': documents, 'nextCursor': None, 'limit': len(documents)}).get_data()
+
+
+def make_app(backend):
+    app = Flask(__name__)
+    app.config['JSON_BACKEND'] = backend
+    app.json = MongoJSONProvider(app)
+    # Sortie compacte de production, même si FLASK_DEBUG est défini dans .env
+    app.json.compact = True
+    return app
+
+
+def measure(label, serialize, iterations, documents):
+    timings = []
+    size = 0
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        size = len(serialize())
+        timings.append(time.perf_counter() - t0)
+    median = statistics.median(timings)
+    print(f"{label:7s} p50={median * 1000:8.1f} ms  {len(documents) / median:10.0f} docs/s  {size / 1e6:6.2f} MB")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents)
+    legacy = measure('legacy', lambda: legacy_response(documents), args.iterations, documents)
+    json_app = make_app('json')
+    single = measure('json', lambda: provider_response(json_app, documents), args.iterations, documents)
+    print(f"        json is {legacy / single:.1f}x faster than legacy")
+    if orjson is not None:
+        orjson_app = make_app('orjson')
+        fast = measure('orjson', lambda: provider_response(orjson_app, documents), args.iterations, documents)
+        print(f"        orjson is {legacy / fast:.1f}x faster than legacy")
+    else:
+        print("orjson  not installed (pip install orjson)")
+
+
+if __name__ == '__main__':
+    main()
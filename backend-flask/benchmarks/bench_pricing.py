@@ -0,0 +1,52 @@
+# benchmarks/bench_pricing.py
+"""
+Benchmark du moteur de devis (app/utils/pricing.py) : chemin Python pur contre chemin NumPy.
+
+Usage (depuis backend-flask/, aucune base de données requise) :
+    python -m benchmarks.bench_pricing --quotes 10000 --weekend-multiplier 1.2
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.utils import pricing
+
+
+def make_quotes(count):
+    rates = [float(random.randint(200, 1500)) for _ in range(count)]
+    starts = [datetime(2025, 1, 1) + timedelta(days=random.randrange(365)) for _ in range(count)]
+    ends = [start + timedelta(days=random.randrange(30)) for start in starts]
+    return rates, starts, ends
+
+
+def timed(func, args, repeat):
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quotes', type=int, default=10000)
+    parser.add_argument('--weekend-multiplier', type=float, default=1.2)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rates, starts, ends = make_quotes(args.quotes)
+    quote_args = (rates, starts, ends, args.weekend_multiplier)
+
+    print(f"{args.quotes} quotes, median of {args.repeat} runs")
+    print(f"  python: {timed(pricing._quote_python, quote_args, args.repeat):8.2f} ms")
+    if pricing.np is None:
+        print("  numpy : not installed")
+    else:
+        print(f"  numpy : {timed(pricing._quote_numpy, quote_args, args.repeat):8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+# tests/conftest.py
+"""
+Fixtures communes des tests de l'API.
+
+Les tests s'exécutent contre un vrai serveur MongoDB (TEST_MONGO_URI, par défaut
+mongodb://127.0.0.1:27017/locacar_test) dont la base est vidée après chaque test ;
+ils sont ignorés si aucun serveur ne répond. Les tests transactionnels demandent un replica set.
+
+Usage (depuis backend-flask/) :
+    python -m pytest -q
+"""
+import os
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+
+TEST_MONGO_URI = os.environ.get('TEST_MONGO_URI', 'mongodb://127.0.0.1:27017/locacar_test')
+os.environ['MONGO_URI'] = TEST_MONGO_URI
+
+# Commandes du pilote qui ne sont pas des allers-retours de l'application ; listIndexes n'est envoyée
+# qu'une fois par processus (vérification de l'index unique du registre)
+IGNORED_COMMANDS = {'hello', 'ismaster', 'isMaster', 'ping', 'endSessions', 'saslStart', 'saslContinue', 'buildInfo',
+                    'listIndexes'}
+
+
+class CommandCounter(monitoring.CommandListener):
+    """
+    Enregistre (commande, collection) de chaque commande envoyée au serveur (command monitoring),
+    ainsi que le document de la commande (documents) pour pouvoir la rejouer avec explain.
+    """
+
+    def __init__(self):
+        self.commands = []
+        self.documents = []
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        target = event.command.get(event.command_name)
+        self.commands.append((event.command_name, target if isinstance(target, str) else None))
+        self.documents.append(dict(event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.commands = []
+        self.documents = []
+
+    def names(self, collection=None):
+        """Noms des commandes, éventuellement limitées à une collection."""
+        return [name for name, target in self.commands if collection is None or target == collection]
+
+
+# Enregistré avant la création des clients MongoDB pour que tous le reçoivent
+_command_counter = CommandCounter()
+monitoring.register(_command_counter)
+
+
+def _server_info():
+    """Renvoie hello du serveur de test, ou None s'il ne répond pas."""
+    probe = MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=1000)
+    try:
+        return probe.admin.command('hello')
+    except PyMongoError:
+        return None
+    finally:
+        probe.close()
+
+
+@pytest.fixture(scope='session')
+def mongo_server():
+    info = _server_info()
+    if info is None:
+        pytest.skip(f"MongoDB server not available at {TEST_MONGO_URI}")
+    return info
+
+
+@pytest.fixture
+def app(mongo_server, tmp_path):
+    from app import create_app
+    from app.extensions import mongo
+
+    app = create_app()
+    app.config.update(TESTING=True, UPLOAD_FOLDER_CARS=str(tmp_path), IMAGE_PIPELINE_SYNC=True)
+    yield app
+    mongo.cx.drop_database(mongo.db.name)
+    mongo.cx.close()
+
+
+@pytest.fixture
+def db(app):
+    from app.extensions import mongo
+    return mongo.db
+
+
+@pytest.fixture
+def client(app):
+    """Client HTTP connecté en tant qu'administrateur."""
+    test_client = app.test_client()
+    with test_client.session_transaction() as sess:
+        sess['user_id'] = str(ObjectId())
+        sess['user_role'] = 'admin'
+        sess['username'] = 'test_admin'
+    return test_client
+
+
+@pytest.fixture
+def commands():
+    _command_counter.reset()
+    return _command_counter
+
+
+@pytest.fixture
+def car(db):
+    car = {'_id': ObjectId(), 'make': 'Dacia', 'model': 'Logan', 'year': 2022, 'licensePlate': '12345-A-6',
+           'vin': 'VF1AAAAAA00000001', 'status': 'available', 'dailyRate': 300.0, 'createdAt': datetime.utcnow()}
+    db.cars.insert_one(car)
+    return car
+
+
+@pytest.fixture
+def customer(db):
+    customer = {'_id': ObjectId(), 'firstName': 'Sara', 'lastName': 'Alami', 'phone': '0600000001',
+                'CIN': 'AB123456', 'email': 'sara@example.com', 'registeredAt': datetime.utcnow()}
+    db.clients.insert_one(customer)
+    return customer
@@ -0,0 +1,37 @@
+# tests/test_booking_ledger.py
+"""Registre des jours réservés : aucune écriture sans l'index unique (carId, day) qui empêche les doubles réservations."""
+import pytest
+
+from app.utils import booking_ledger
+
+
+@pytest.fixture
+def unverified_ledger(monkeypatch):
+    """Oublie les vérifications déjà faites par ce processus, pour que l'index soit relu."""
+    monkeypatch.setattr(booking_ledger, '_verified_ledgers', set())
+
+
+def _reserve(client, car, customer, start='2025-07-01', end='2025-07-03'):
+    return client.post('/api/reservations', json={'carId': str(car['_id']), 'clientId': str(customer['_id']),
+                                                  'startDate': start, 'endDate': end, 'status': 'confirmed'})
+
+
+def test_reservations_are_refused_without_the_unique_index(client, db, car, customer, unverified_ledger):
+    db.booking_slots.drop_index('carId_day_unique')
+
+    first = _reserve(client, car, customer)
+    overlapping = _reserve(client, car, customer, '2025-07-02', '2025-07-04')
+
+    assert first.status_code == overlapping.status_code == 500
+    assert db.booking_slots.count_documents({}) == 0
+    assert db.reservations.count_documents({}) == 0
+
+
+def test_overlap_is_rejected_once_the_index_is_verified(client, db, car, customer, unverified_ledger):
+    first = _reserve(client, car, customer)
+    overlapping = _reserve(client, car, customer, '2025-07-03', '2025-07-05')
+
+    assert first.status_code == 201
+    assert overlapping.status_code == 409
+    assert overlapping.get_json()['conflictingDays'] == ['2025-07-03']
+    assert db.name in booking_ledger._verified_ledgers
@@ -0,0 +1,38 @@
+# tests/test_car_import.py
+"""Import CSV des voitures : une erreur de lecture en cours de flux conserve le rapport des lignes déjà écrites."""
+
+HEADER = b'make,model,year,licensePlate,vin,status,dailyRate\n'
+
+
+def _row(index):
+    return f'Dacia,Sandero,2022,IMP-{index},VF1IMPORT{index:08d},available,250\n'.encode()
+
+
+def _import(client, body, chunk_size=2):
+    return client.post(f'/api/cars/import?format=csv&chunkSize={chunk_size}', data=body, content_type='text/csv')
+
+
+def test_read_error_after_committed_chunks_returns_partial_report(client, db):
+    response = _import(client, HEADER + b''.join(_row(i) for i in range(1, 4)) + b'Dacia,\xff\xfe,2022\n')
+
+    assert response.status_code == 207
+    report = response.get_json()
+    assert report['created'] == 3
+    assert 'Could not read the import file' in report['readError']
+    assert db.cars.count_documents({}) == 3
+
+
+def test_read_error_before_any_insert_returns_400(client, db):
+    response = _import(client, HEADER + b'Dacia,\xff\xfe,2022\n' + _row(1))
+
+    assert response.status_code == 400
+    assert response.get_json()['created'] == 0
+    assert db.cars.count_documents({}) == 0
+
+
+def test_valid_file_is_fully_imported(client, db):
+    response = _import(client, HEADER + b''.join(_row(i) for i in range(1, 6)))
+
+    assert response.status_code == 201
+    assert response.get_json()['readError'] is None
+    assert db.cars.count_documents({}) == 5
@@ -0,0 +1,63 @@
+# tests/test_cars_api.py
+"""Réponses de l'API des voitures : les clés de recherche internes (searchKeys) ne sont jamais renvoyées."""
+
+NEW_CAR = {'make': 'Renault', 'model': 'Clio', 'year': '2023', 'licensePlate': '54321-B-1',
+           'vin': 'VF1BBBBBB00000002', 'status': 'available', 'dailyRate': '350'}
+
+
+def test_car_responses_hide_search_keys(client, db):
+    created = client.post('/api/cars', data=NEW_CAR)
+    assert created.status_code == 201
+    car_id = created.get_json()['id']
+    assert db.cars.find_one()['searchKeys']
+
+    updated = client.put(f'/api/cars/{car_id}', data={'model': 'Clio V'})
+    detail = client.get(f'/api/cars/{car_id}')
+    full_list = client.get('/api/cars?fields=full')
+
+    assert updated.status_code == detail.status_code == full_list.status_code == 200
+    for car in (created.get_json(), updated.get_json(), detail.get_json(), full_list.get_json()['cars'][0]):
+        assert 'searchKeys' not in car
+    assert detail.get_json()['model'] == 'Clio V'
+
+
+def test_create_is_one_insert(client, commands):
+    response = client.post('/api/cars', data=NEW_CAR)
+
+    assert response.status_code == 201
+    # Pas de vérification préalable de la plaque ni du VIN : les index uniques tranchent
+    assert commands.commands == [('insert', 'cars'), ('insert', 'audit_log'), ('update', 'collection_versions')]
+
+
+def test_update_is_one_find_and_modify(client, car, commands):
+    response = client.put(f"/api/cars/{car['_id']}", data={'model': 'Sandero', 'licensePlate': '99999-Z-9'})
+
+    assert response.status_code == 200
+    assert response.get_json()['licensePlate'] == '99999-Z-9'
+    assert commands.commands == [('find', 'cars'), ('findAndModify', 'cars'), ('insert', 'audit_log'),
+                                 ('update', 'collection_versions')]
+
+
+def test_duplicate_plate_is_rejected_by_the_index(client, car):
+    create = client.post('/api/cars', data={**NEW_CAR, 'licensePlate': car['licensePlate']})
+    other = client.post('/api/cars', data=NEW_CAR).get_json()
+    update = client.put(f"/api/cars/{other['id']}", data={'vin': car['vin']})
+
+    assert create.status_code == update.status_code == 409
+    assert create.get_json()['message'] == f"License plate '{car['licensePlate']}' already exists."
+    assert update.get_json()['message'] == f"VIN '{car['vin']}' already exists."
+
+
+def test_available_compares_utc_days(client, car, customer):
+    reservation = client.post('/api/reservations', json={'carId': str(car['_id']), 'clientId': str(customer['_id']),
+                                                         'startDate': '2025-07-02', 'endDate': '2025-07-03',
+                                                         'status': 'confirmed'})
+    assert reservation.status_code == 201
+
+    # 2025-07-01T23:30-02:00 est le 2 juillet en UTC, jour occupé dans le registre
+    offset = client.get('/api/cars/available?start=2025-07-01T23:30:00-02:00&end=2025-07-01T23:45:00-02:00')
+    day_before = client.get('/api/cars/available?start=2025-07-01&end=2025-07-01')
+
+    assert offset.status_code == day_before.status_code == 200
+    assert offset.get_json()['cars'] == []
+    assert [found['id'] for found in day_before.get_json()['cars']] == [str(car['_id'])]
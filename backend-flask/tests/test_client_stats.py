@@ -0,0 +1,41 @@
+# tests/test_client_stats.py
+"""Compteurs des clients : la dernière location (stats.lastRentalAt) recule quand la plus récente disparaît."""
+from datetime import datetime
+
+
+def _rental(client, car, customer, start, end):
+    created = client.post('/api/reservations', json={'carId': str(car['_id']), 'clientId': str(customer['_id']),
+                                                     'startDate': start, 'endDate': end, 'status': 'confirmed'})
+    assert created.status_code == 201
+    reservation_id = created.get_json()['id']
+    assert client.put(f'/api/reservations/{reservation_id}/status', json={'status': 'active'}).status_code == 200
+    return reservation_id
+
+
+def _last_rental(db, customer):
+    return db.clients.find_one({'_id': customer['_id']})['stats']['lastRentalAt']
+
+
+def test_last_rental_follows_cancel_and_delete(client, db, car, customer):
+    older = _rental(client, car, customer, '2025-06-01', '2025-06-03')
+    newer = _rental(client, car, customer, '2025-07-01', '2025-07-03')
+    assert _last_rental(db, customer) == datetime(2025, 7, 1)
+
+    cancelled = client.put(f'/api/reservations/{newer}/status', json={'status': 'cancelled_by_agency'})
+    assert cancelled.status_code == 200
+    assert _last_rental(db, customer) == datetime(2025, 6, 1)
+
+    assert client.delete(f'/api/reservations/{older}').status_code == 204
+    assert _last_rental(db, customer) is None
+
+
+def test_completing_the_last_rental_keeps_it(client, db, car, customer, commands):
+    reservation_id = _rental(client, car, customer, '2025-07-01', '2025-07-03')
+
+    commands.reset()
+    completed = client.put(f'/api/reservations/{reservation_id}/status', json={'status': 'completed'})
+
+    assert completed.status_code == 200
+    assert _last_rental(db, customer) == datetime(2025, 7, 1)
+    # active -> completed : la location reste la même, aucune relecture de la dernière location
+    assert commands.names('reservations') == ['find', 'findAndModify']
@@ -0,0 +1,67 @@
+# tests/test_clients_api.py
+"""Réponses de l'API des clients : champs de recherche normalisés internes, recherche et nombre de commandes."""
+from app.routes import clients as clients_routes
+from app.routes.clients import CLIENT_INTERNAL_FIELDS
+from app.utils.search import client_search_fields
+
+NEW_CLIENT = {'firstName': 'Youssef', 'lastName': 'Benali', 'phone': '+212 612-345-678', 'CIN': 'ab987654',
+              'email': 'Youssef.Benali@Example.com'}
+
+
+def test_client_responses_hide_search_fields(client, db):
+    created = client.post('/api/clients', json=NEW_CLIENT)
+    assert created.status_code == 201
+    client_id = created.get_json()['id']
+    assert all(field in db.clients.find_one() for field in CLIENT_INTERNAL_FIELDS)
+
+    updated = client.put(f'/api/clients/{client_id}', json={'lastName': 'Bennani'})
+    detail = client.get(f'/api/clients/{client_id}')
+    listing = client.get('/api/clients')
+
+    assert updated.status_code == detail.status_code == listing.status_code == 200
+    for document in (created.get_json(), updated.get_json(), detail.get_json(), listing.get_json()[0]):
+        assert not set(CLIENT_INTERNAL_FIELDS) & set(document)
+    assert detail.get_json()['lastName'] == 'Bennani'
+
+
+def test_create_is_one_insert(client, commands):
+    response = client.post('/api/clients', json=NEW_CLIENT)
+
+    assert response.status_code == 201
+    # Pas de vérification préalable du téléphone, du CIN ni de l'email : les index uniques tranchent
+    assert commands.commands == [('insert', 'clients'), ('insert', 'audit_log'), ('update', 'collection_versions')]
+
+
+def test_update_is_one_find_and_modify(client, customer, commands):
+    response = client.put(f"/api/clients/{customer['_id']}", json={'phone': '0611111111'})
+
+    assert response.status_code == 200
+    assert commands.commands == [('find', 'clients'), ('findAndModify', 'clients'), ('insert', 'audit_log'),
+                                 ('update', 'collection_versions')]
+
+
+def test_duplicate_fields_are_rejected_by_the_indexes(client, customer):
+    create = client.post('/api/clients', json={**NEW_CLIENT, 'CIN': customer['CIN']})
+    other = client.post('/api/clients', json=NEW_CLIENT).get_json()
+    update = client.put(f"/api/clients/{other['id']}", json={'email': customer['email']})
+
+    assert create.status_code == update.status_code == 409
+    assert create.get_json()['message'] == f"Client with CIN '{customer['CIN']}' already exists."
+    assert update.get_json()['message'] == f"Client with email '{customer['email']}' already exists."
+
+
+def test_search_keeps_exact_match_beyond_prefix_candidates(client, db, monkeypatch):
+    # Plus de candidats par préfixe de nom que la limite : le client dont le CIN est exact est inséré en dernier
+    namesakes = [{'firstName': 'Sara', 'lastName': f'Ab1{i}', 'phone': f'06000000{i:02d}', 'CIN': f'ZZ{i}'}
+                 for i in range(5)]
+    exact = {'firstName': 'Omar', 'lastName': 'Idrissi', 'phone': '0699999999', 'CIN': 'AB1'}
+    for customer in namesakes + [exact]:
+        db.clients.insert_one({**customer, **client_search_fields(customer)})
+    monkeypatch.setattr(clients_routes, 'SEARCH_CANDIDATE_LIMIT', 2)
+
+    response = client.get('/api/clients/search?q=ab1&limit=3')
+
+    assert response.status_code == 200
+    found = response.get_json()['clients']
+    assert found[0]['CIN'] == 'AB1'
+    assert len(found) == 3
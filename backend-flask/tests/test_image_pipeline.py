@@ -0,0 +1,32 @@
+# tests/test_image_pipeline.py
+"""Génération des variantes d'images : écriture atomique, y compris pour deux travaux sur le même contenu."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from app.utils.image_pipeline import _generate_variants  # noqa: E402
+from app.utils.image_store import TEMP_UPLOAD_PREFIX  # noqa: E402
+
+
+def test_concurrent_jobs_leave_complete_variants(tmp_path):
+    source = tmp_path / 'abcdef.jpg'
+    Image.new('RGB', (1200, 800), 'navy').save(source, 'JPEG')
+
+    def job(_):
+        return _generate_variants(str(source), '/static/uploads/cars/abcdef.jpg', (320, 960), 80, 85)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(job, range(4)))
+
+    assert all(result == results[0] for result in results)
+    assert results[0]['w320']['webp'] == '/static/uploads/cars/abcdef_w320.webp'
+    names = sorted(os.listdir(tmp_path))
+    assert not [name for name in names if name.startswith(TEMP_UPLOAD_PREFIX)]
+    for name in names:
+        with Image.open(tmp_path / name) as variant:
+            variant.load()
+    with Image.open(tmp_path / 'abcdef_w960.jpeg') as variant:
+        assert variant.size == (960, 640)
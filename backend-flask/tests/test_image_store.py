@@ -0,0 +1,70 @@
+# tests/test_image_store.py
+"""Stockage par contenu : un upload concurrent du même contenu ne perd jamais son fichier lors d'une libération."""
+import io
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app.utils import image_store
+from app.utils.image_store import TEMP_UPLOAD_PREFIX, path_for_url, release_image, store_upload
+
+CONTENT = b'\xff\xd8\xff\xe0' + b'car-image' * 100
+
+
+def _upload():
+    return store_upload(FileStorage(stream=io.BytesIO(CONTENT), filename='photo.jpg'))
+
+
+def _temp_files(root):
+    return [name for _, _, names in os.walk(root) for name in names if name.startswith(TEMP_UPLOAD_PREFIX)]
+
+
+def test_same_content_is_stored_once(app, db):
+    with app.test_request_context():
+        first_path, first_url = _upload()
+        second_path, second_url = _upload()
+
+        assert (first_path, first_url) == (second_path, second_url)
+        assert db.image_refs.find_one({'_id': image_store.key_for_url(first_url)})['refs'] == 2
+        release_image(first_url)
+        assert os.path.exists(first_path)
+        release_image(second_url)
+        assert not os.path.exists(first_path)
+        assert db.image_refs.count_documents({}) == 0
+
+
+@pytest.mark.parametrize('upload_moment', ['before_set_aside', 'after_set_aside'])
+def test_upload_racing_last_release_keeps_file(app, db, monkeypatch, upload_moment):
+    set_aside = image_store._set_aside_files
+    raced = {}
+
+    def racing_set_aside(urls):
+        # Un upload du même contenu arrive entre le passage du compteur à zéro et sa suppression
+        if upload_moment == 'before_set_aside':
+            raced['upload'] = _upload()
+            return set_aside(urls)
+        result = set_aside(urls)
+        raced['upload'] = _upload()
+        return result
+
+    with app.test_request_context():
+        file_path, image_url = _upload()
+        monkeypatch.setattr(image_store, '_set_aside_files', racing_set_aside)
+        release_image(image_url)
+
+        assert raced['upload'] == (file_path, image_url)
+        assert db.image_refs.find_one({'_id': image_store.key_for_url(image_url)})['refs'] == 1
+        with open(path_for_url(image_url), 'rb') as stored:
+            assert stored.read() == CONTENT
+        assert not _temp_files(app.config['UPLOAD_FOLDER_CARS'])
+
+
+def test_upload_after_counter_deleted_rewrites_file(app, db):
+    with app.test_request_context():
+        file_path, image_url = _upload()
+        release_image(image_url)
+        assert not os.path.exists(file_path)
+
+        assert _upload() == (file_path, image_url)
+        assert os.path.exists(file_path)
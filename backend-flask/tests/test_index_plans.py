@@ -0,0 +1,184 @@
+# tests/test_index_plans.py
+"""
+Plans d'exécution des requêtes des routes : aucune ne doit parcourir une collection (COLLSCAN).
+
+Les requêtes ne sont pas recopiées ici : chaque route est appelée sur un petit jeu de données,
+les commandes qu'elle envoie sont capturées (command monitoring) puis rejouées avec explain.
+Une requête ajoutée ou modifiée dans une route est donc vérifiée sans mise à jour de ce fichier.
+Les statistiques globales (tableaux de bord, analytics) lisent volontairement toute une collection
+et ne figurent pas dans ROUTE_CALLS.
+"""
+import os
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.utils.helpers import hash_password
+from app.utils.image_store import url_for_key
+from app.utils.search import car_search_keys, client_search_fields
+
+# Commandes dont le plan peut être expliqué (les insertions n'en ont pas)
+EXPLAINABLE_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'findAndModify', 'update', 'delete'}
+# Champs ajoutés par le pilote, refusés ou sans objet dans une commande explain
+DRIVER_FIELDS = {'lsid', 'txnNumber', 'autocommit', 'startTransaction', 'readConcern', 'writeConcern'}
+# Champs des commandes d'écriture listant les instructions (explain n'en accepte qu'une à la fois)
+WRITE_STATEMENTS = {'update': 'updates', 'delete': 'deletes'}
+
+CAR_ID = ObjectId()
+OTHER_CAR_ID = ObjectId()
+CLIENT_ID = ObjectId()
+MANAGER_ID = ObjectId()
+IMAGE_KEY = 'ab/cd/abcdef.jpg'
+
+
+@pytest.fixture
+def dataset(client, db):
+    """Quelques voitures, clients, un manager et des réservations créées par l'API (registre, compteurs, audit)."""
+    cars = [
+        {'_id': car_id, 'make': make, 'model': model, 'year': 2020 + i, 'licensePlate': f'PLAN-{i}',
+         'vin': f'VF1PLAN{i:010d}', 'status': 'available', 'dailyRate': 200.0 + 50 * i,
+         'imageUrl': url_for_key(IMAGE_KEY) if i == 0 else None}
+        for i, (car_id, make, model) in enumerate([(CAR_ID, 'Dacia', 'Duster'), (OTHER_CAR_ID, 'Renault', 'Clio'),
+                                                   (ObjectId(), 'Peugeot', '208')])
+    ]
+    for car in cars:
+        car['searchKeys'] = car_search_keys(car)
+    db.cars.insert_many(cars)
+
+    clients = [{'_id': CLIENT_ID, 'firstName': 'Youssef', 'lastName': 'Benali', 'phone': '0612345678', 'CIN': 'AB1',
+                'email': 'youssef@example.com', 'registeredAt': datetime(2024, 1, 1)},
+               {'_id': ObjectId(), 'firstName': 'Sara', 'lastName': 'Alami', 'phone': '0698765432', 'CIN': 'CD2',
+                'email': 'sara@example.com', 'registeredAt': datetime(2024, 2, 1)}]
+    for customer in clients:
+        customer.update(client_search_fields(customer))
+    db.clients.insert_many(clients)
+
+    db.users.insert_one({'_id': MANAGER_ID, 'username': 'manager1', 'password_hash': hash_password('secret'),
+                         'role': 'manager', 'fullName': 'Manager One', 'isActive': True})
+
+    reservations = []
+    for car_id, start, end in ((CAR_ID, '2025-07-01', '2025-07-03'), (OTHER_CAR_ID, '2025-07-02', '2025-07-06')):
+        response = client.post('/api/reservations', json={'carId': str(car_id), 'clientId': str(CLIENT_ID),
+                                                          'startDate': start, 'endDate': end, 'status': 'confirmed'})
+        assert response.status_code == 201
+        reservations.append(response.get_json()['id'])
+    return {'reservation_id': reservations[0]}
+
+
+def _get(url):
+    return lambda client, ids: client.get(url.format(**ids))
+
+
+# (identifiant, appel de la route) ; ids contient reservation_id, car_id, client_id, manager_id
+ROUTE_CALLS = [
+    ('cars list', _get('/api/cars')),
+    ('cars list by status', _get('/api/cars?status=available')),
+    ('cars list by make', _get('/api/cars?make=Dacia')),
+    ('cars list sorted by year', _get('/api/cars?sort=year')),
+    ('cars list by status sorted by rate', _get('/api/cars?status=available&sort=-dailyRate')),
+    ('cars prefix search', _get('/api/cars/search?q=dac')),
+    ('cars text search', _get('/api/cars/search?q=Dacia&mode=text')),
+    ('cars available', _get('/api/cars/available?start=2025-07-01&end=2025-07-04')),
+    ('car detail', _get('/api/cars/{car_id}')),
+    ('car create', lambda client, ids: client.post('/api/cars', data={
+        'make': 'Kia', 'model': 'Picanto', 'year': '2024', 'licensePlate': 'PLAN-NEW', 'vin': 'VF1PLANNEW0000000',
+        'status': 'available', 'dailyRate': '180'})),
+    ('car update', lambda client, ids: client.put('/api/cars/{car_id}'.format(**ids), data={'licensePlate': 'PLAN-UPD'})),
+    ('clients list', _get('/api/clients')),
+    ('clients search', _get('/api/clients/search?q=ben')),
+    ('clients search by phone', _get('/api/clients/search?q=0612')),
+    ('client detail', _get('/api/clients/{client_id}')),
+    ('client history', _get('/api/clients/{client_id}/history')),
+    ('client create', lambda client, ids: client.post('/api/clients', json={
+        'firstName': 'Omar', 'lastName': 'Idrissi', 'phone': '0655555555', 'CIN': 'EF3', 'email': 'omar@example.com'})),
+    ('client update', lambda client, ids: client.put('/api/clients/{client_id}'.format(**ids), json={'phone': '0611111111'})),
+    ('reservations list', _get('/api/reservations')),
+    ('reservations by status', _get('/api/reservations?status=confirmed')),
+    ('reservations by car', _get('/api/reservations?carId={car_id}')),
+    ('reservations by client', _get('/api/reservations?clientId={client_id}')),
+    ('reservations by date window', _get('/api/reservations?startDate=2025-07-01&endDate=2025-07-31')),
+    ('reservation detail', _get('/api/reservations/{reservation_id}')),
+    ('reservation create', lambda client, ids: client.post('/api/reservations', json={
+        'carId': ids['car_id'], 'clientId': ids['client_id'], 'startDate': '2025-08-01', 'endDate': '2025-08-03'})),
+    ('reservation update dates', lambda client, ids: client.put('/api/reservations/{reservation_id}'.format(**ids),
+                                                                json={'startDate': '2025-07-02', 'endDate': '2025-07-04'})),
+    ('reservation status', lambda client, ids: client.put('/api/reservations/{reservation_id}/status'.format(**ids),
+                                                          json={'status': 'active'})),
+    ('reservation delete', lambda client, ids: client.delete('/api/reservations/{reservation_id}'.format(**ids))),
+    ('managers list', _get('/api/managers')),
+    ('audit log by user', _get('/api/audit-logs/?userId={manager_id}')),
+    ('login', lambda client, ids: client.application.test_client().post(
+        '/api/auth/login', json={'username': 'manager1', 'password': 'secret'})),
+]
+
+
+def _explain_commands(document):
+    """Commandes explain équivalentes à une commande capturée (une par instruction d'écriture)."""
+    name = next(iter(document))
+    command = {key: value for key, value in document.items() if key not in DRIVER_FIELDS and not key.startswith('$')}
+    statements_field = WRITE_STATEMENTS.get(name)
+    if statements_field:
+        return [{**command, statements_field: [statement]} for statement in command[statements_field]]
+    return [command]
+
+
+def _winning_stages(node, in_winning_plan=False):
+    """Étapes des plans retenus d'une sortie explain (find, aggregate, écritures, moteurs classique et SBE)."""
+    stages = []
+    if isinstance(node, dict):
+        if in_winning_plan and 'stage' in node:
+            stages.append(node['stage'])
+            if node.get('strategy') == 'NestedLoopJoin':
+                stages.append('COLLSCAN')  # $lookup sans index sur la collection étrangère
+        for key, value in node.items():
+            if key == 'rejectedPlans':
+                continue
+            stages.extend(_winning_stages(value, in_winning_plan or key in ('winningPlan', 'queryPlan')))
+    elif isinstance(node, list):
+        for item in node:
+            stages.extend(_winning_stages(item, in_winning_plan))
+    return stages
+
+
+def _route_plans(db, commands):
+    """(commande, collection, étapes) pour chaque commande expliquable capturée."""
+    plans = []
+    for document in commands.documents:
+        name = next(iter(document))
+        if name not in EXPLAINABLE_COMMANDS:
+            continue
+        for command in _explain_commands(document):
+            explanation = db.command('explain', command, verbosity='queryPlanner')
+            plans.append((name, document[name], _winning_stages(explanation)))
+    return plans
+
+
+@pytest.mark.parametrize('route_call', [call for _, call in ROUTE_CALLS], ids=[label for label, _ in ROUTE_CALLS])
+def test_route_queries_use_indexes(client, db, dataset, commands, route_call):
+    ids = {'reservation_id': dataset['reservation_id'], 'car_id': str(CAR_ID), 'client_id': str(CLIENT_ID),
+           'manager_id': str(MANAGER_ID)}
+
+    commands.reset()
+    response = route_call(client, ids)
+
+    assert response.status_code < 400, response.get_json()
+    plans = _route_plans(db, commands)
+    assert plans
+    collection_scans = [(name, collection, stages) for name, collection, stages in plans if 'COLLSCAN' in stages]
+    assert not collection_scans
+
+
+def test_images_gc_batch_query_uses_index(app, db, dataset, commands):
+    image_path = os.path.join(app.config['UPLOAD_FOLDER_CARS'], *IMAGE_KEY.split('/'))
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+    with open(image_path, 'wb') as image_file:
+        image_file.write(b'image')
+
+    commands.reset()
+    result = app.test_cli_runner().invoke(args=['images', 'gc', '--dry-run', '--min-age', '0'])
+
+    assert result.exit_code == 0, result.output
+    plans = _route_plans(db, commands)
+    assert ('find', 'cars') in [(name, collection) for name, collection, _ in plans]
+    assert not [plan for plan in plans if 'COLLSCAN' in plan[2]]
@@ -0,0 +1,35 @@
+# tests/test_managers_api.py
+"""Création et mise à jour des managers : nombre de commandes MongoDB et unicité du username."""
+
+NEW_MANAGER = {'username': 'manager1', 'fullName': 'Manager One', 'password': 'secret'}
+
+
+def test_create_is_one_insert(client, commands):
+    response = client.post('/api/managers', json=NEW_MANAGER)
+
+    assert response.status_code == 201
+    assert 'password_hash' not in response.get_json()
+    # Pas de vérification préalable du username : l'index unique tranche
+    assert commands.commands == [('insert', 'users'), ('update', 'collection_versions')]
+
+
+def test_update_is_one_find_and_modify(client, commands):
+    manager = client.post('/api/managers', json=NEW_MANAGER).get_json()
+
+    commands.reset()
+    response = client.put(f"/api/managers/{manager['id']}", json={'username': 'manager2', 'fullName': 'Manager Two'})
+
+    assert response.status_code == 200
+    assert response.get_json()['username'] == 'manager2'
+    assert commands.commands == [('findAndModify', 'users'), ('update', 'collection_versions')]
+
+
+def test_duplicate_username_is_rejected_by_the_index(client):
+    first = client.post('/api/managers', json=NEW_MANAGER).get_json()
+    second = client.post('/api/managers', json={**NEW_MANAGER, 'username': 'manager2'}).get_json()
+
+    create = client.post('/api/managers', json=NEW_MANAGER)
+    update = client.put(f"/api/managers/{second['id']}", json={'username': first['username']})
+
+    assert create.status_code == update.status_code == 409
+    assert create.get_json()['message'] == update.get_json()['message'] == "Username 'manager1' already exists."
@@ -0,0 +1,113 @@
+# tests/test_reservation_status.py
+"""Transitions de statut (PUT /api/reservations/<id>/status) : allers-retours, conflits et repli sans transaction."""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.utils import transactions
+from app.utils.transactions import run_in_transaction
+
+
+def _create_reservation(client, car, customer, start='2025-07-01', end='2025-07-03', status='confirmed'):
+    response = client.post('/api/reservations', json={
+        'carId': str(car['_id']), 'clientId': str(customer['_id']),
+        'startDate': start, 'endDate': end, 'status': status
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()
+
+
+def _set_status(client, reservation_id, status):
+    return client.put(f'/api/reservations/{reservation_id}/status', json={'status': status})
+
+
+@pytest.fixture(params=['transaction', 'standalone'])
+def transaction_mode(request, app, monkeypatch):
+    """Exécute le test avec de vraies transactions (replica set requis) puis avec le repli session=None."""
+    if request.param == 'transaction':
+        with app.app_context():
+            if not transactions.supports_transactions():
+                pytest.skip("MongoDB server does not support transactions (replica set required)")
+    else:
+        monkeypatch.setattr(transactions, 'supports_transactions', lambda: False)
+    return request.param
+
+
+def test_transition_round_trips(client, car, customer, commands, transaction_mode):
+    reservation = _create_reservation(client, car, customer)
+
+    commands.reset()
+    response = _set_status(client, reservation['id'], 'active')
+
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'active'
+    # Lecture de la réservation puis find_one_and_update : aucune relecture ni enrichissement ligne par ligne
+    assert commands.names('reservations') == ['find', 'findAndModify']
+    assert commands.names('cars') == ['update']
+    assert commands.names('audit_log') == ['insert']
+    expected = ['commitTransaction'] if transaction_mode == 'transaction' else []
+    assert [name for name in commands.names() if name.endswith('Transaction')] == expected
+    # réservation (2) + voiture + compteurs client + audit + compteur de version, + commit en transaction
+    assert len(commands.commands) <= 6 + len(expected)
+
+
+def test_transition_updates_car_and_audit_log(client, db, car, customer, transaction_mode):
+    reservation = _create_reservation(client, car, customer)
+
+    assert _set_status(client, reservation['id'], 'active').status_code == 200
+
+    assert db.cars.find_one({'_id': car['_id']})['status'] == 'rented'
+    actions = [entry['action'] for entry in db.audit_log.find({'action': {'$in': ['update_car_status', 'update_reservation_status']}})]
+    assert sorted(actions) == ['update_car_status', 'update_reservation_status']
+
+
+def test_reinstate_after_cancel_conflict_returns_409(client, db, car, customer, commands, transaction_mode):
+    cancelled = _create_reservation(client, car, customer)
+    assert _set_status(client, cancelled['id'], 'cancelled_by_client').status_code == 200
+    # Les jours libérés par l'annulation sont repris par une autre réservation
+    other = _create_reservation(client, car, customer, start='2025-07-02', end='2025-07-04')
+
+    commands.reset()
+    started = datetime.utcnow()
+    response = _set_status(client, cancelled['id'], 'confirmed')
+
+    assert response.status_code == 409
+    assert response.get_json()['conflictingDays'] == ['2025-07-02', '2025-07-03']
+    # Pas de reprise de with_transaction : une seule tentative d'insertion dans le registre
+    assert commands.names('booking_slots').count('insert') == 1
+    assert (datetime.utcnow() - started).total_seconds() < 5
+
+    stored = db.reservations.find_one({'_id': ObjectId(cancelled['id'])})
+    assert stored['status'] == 'cancelled_by_client'
+    slots = list(db.booking_slots.find({}, {'_id': 0, 'reservationId': 1, 'day': 1}).sort('day', 1))
+    assert [slot['day'].day for slot in slots] == [2, 3, 4]
+    assert {str(slot['reservationId']) for slot in slots} == {other['id']}
+
+
+def test_reinstate_after_cancel_without_conflict(client, db, car, customer, transaction_mode):
+    reservation = _create_reservation(client, car, customer)
+    assert _set_status(client, reservation['id'], 'cancelled_by_agency').status_code == 200
+    assert db.booking_slots.count_documents({}) == 0
+
+    response = _set_status(client, reservation['id'], 'confirmed')
+
+    assert response.status_code == 200
+    assert db.booking_slots.count_documents({}) == 3
+
+
+def test_run_in_transaction_standalone_fallback(monkeypatch):
+    monkeypatch.setattr(transactions, 'supports_transactions', lambda: False)
+    calls = []
+
+    result = run_in_transaction(lambda session: calls.append(session) or 'done')
+
+    assert result == 'done'
+    assert calls == [None]
+
+
+def test_supports_transactions_matches_topology(app, mongo_server):
+    # Replica set (setName) ou mongos (isdbgrid) : transactions ; mongod autonome : repli session=None
+    expected = 'setName' in mongo_server or mongo_server.get('msg') == 'isdbgrid'
+    with app.app_context():
+        assert transactions.supports_transactions() == expected
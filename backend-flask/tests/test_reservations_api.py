@@ -0,0 +1,104 @@
+# tests/test_reservations_api.py
+"""Listing, détail, création et mise à jour des réservations : réponses enrichies et nombre de commandes MongoDB."""
+from bson import ObjectId
+
+
+def _create_reservation(client, car, customer, start='2025-07-01', end='2025-07-03'):
+    response = client.post('/api/reservations', json={
+        'carId': str(car['_id']), 'clientId': str(customer['_id']), 'startDate': start, 'endDate': end
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()
+
+
+def test_list_is_one_aggregate(client, car, customer, commands):
+    for start, end in (('2025-07-01', '2025-07-03'), ('2025-08-01', '2025-08-02')):
+        _create_reservation(client, car, customer, start, end)
+
+    commands.reset()
+    response = client.get('/api/reservations')
+
+    assert response.status_code == 200
+    reservations = response.get_json()['reservations']
+    assert len(reservations) == 2
+    assert all(res['carDetails']['licensePlate'] == car['licensePlate'] for res in reservations)
+    # Compteurs de version (ETag) puis un seul aggregate() avec $lookup, quel que soit le nombre de lignes
+    assert commands.commands == [('find', 'collection_versions'), ('aggregate', 'reservations')]
+
+
+def test_detail_is_one_aggregate(client, car, customer, commands):
+    reservation = _create_reservation(client, car, customer)
+
+    commands.reset()
+    response = client.get(f"/api/reservations/{reservation['id']}")
+
+    assert response.status_code == 200
+    assert response.get_json()['clientDetails']['lastName'] == customer['lastName']
+    assert commands.commands == [('find', 'collection_versions'), ('aggregate', 'reservations')]
+
+
+def test_create_returns_details_in_known_commands(client, car, customer, commands):
+    commands.reset()
+    reservation = _create_reservation(client, car, customer)
+
+    assert reservation['carDetails']['licensePlate'] == car['licensePlate']
+    assert reservation['clientDetails']['phone'] == customer['phone']
+    assert reservation['reservationNumber'].startswith('R')
+    # Insertion puis enrichissement : pas de find_one de relecture. Le bloc de numéros (counters)
+    # n'est réservé qu'une fois pour plusieurs créations et n'est donc pas compté.
+    assert [command for command in commands.commands if command[1] != 'counters'] == [
+        ('find', 'cars'), ('find', 'clients'), ('insert', 'booking_slots'), ('insert', 'reservations'),
+        ('update', 'clients'), ('insert', 'audit_log'), ('aggregate', 'reservations'), ('update', 'collection_versions'),
+    ]
+
+
+def test_update_returns_details_in_known_commands(client, car, customer, commands):
+    reservation = _create_reservation(client, car, customer)
+
+    commands.reset()
+    response = client.put(f"/api/reservations/{reservation['id']}", json={'notes': 'Siège bébé'})
+
+    assert response.status_code == 200
+    updated = response.get_json()
+    assert updated['notes'] == 'Siège bébé'
+    assert updated['carDetails']['licensePlate'] == car['licensePlate']
+    assert commands.commands == [
+        ('find', 'reservations'), ('findAndModify', 'reservations'), ('insert', 'audit_log'),
+        ('aggregate', 'reservations'), ('update', 'collection_versions'),
+    ]
+
+
+def test_update_dates_resyncs_slots_in_known_commands(client, db, car, customer, commands):
+    reservation = _create_reservation(client, car, customer)
+
+    commands.reset()
+    response = client.put(f"/api/reservations/{reservation['id']}", json={'startDate': '2025-07-02', 'endDate': '2025-07-05'})
+    sent = list(commands.commands)
+
+    assert response.status_code == 200
+    assert response.get_json()['estimatedTotalCost'] == 4 * car['dailyRate']
+    days = [slot['day'].day for slot in db.booking_slots.find({'reservationId': ObjectId(reservation['id'])}).sort('day', 1)]
+    assert days == [2, 3, 4, 5]
+    # + tarif de la voiture et registre (lecture, insertion des nouveaux jours, retrait des anciens)
+    assert sent == [
+        ('find', 'reservations'), ('find', 'cars'), ('find', 'booking_slots'), ('insert', 'booking_slots'),
+        ('delete', 'booking_slots'), ('findAndModify', 'reservations'), ('update', 'clients'), ('insert', 'audit_log'),
+        ('aggregate', 'reservations'), ('update', 'collection_versions'),
+    ]
+
+
+def test_bulk_retries_items_that_only_overlapped_a_rejected_item(client, car, customer):
+    _create_reservation(client, car, customer, '2025-07-05', '2025-07-06')
+
+    def item(start, end):
+        return {'carId': str(car['_id']), 'clientId': str(customer['_id']), 'startDate': start, 'endDate': end,
+                'status': 'confirmed'}
+
+    # A perd le 07-05 (déjà réservé) ; B ne chevauche que A, retiré du registre après son refus
+    response = client.post('/api/reservations/bulk', json={'reservations': [item('2025-07-03', '2025-07-05'),
+                                                                             item('2025-07-01', '2025-07-03')]})
+
+    assert response.status_code == 207
+    rejected, created = response.get_json()['results']
+    assert rejected['code'] == 409 and '2025-07-05' in rejected['message']
+    assert created['status'] == 'created'
@@ -0,0 +1,50 @@
+# tests/test_versions.py
+"""Compteurs de version (ETag) : incrémentés dès qu'une route a écrit, quel que soit le code de la réponse."""
+from app.routes import reservations as reservations_routes
+
+HEADER = b'make,model,year,licensePlate,vin,status,dailyRate\n'
+
+
+def _versions(db):
+    return {doc['_id']: doc['version'] for doc in db.collection_versions.find()}
+
+
+def _import(client, body):
+    return client.post('/api/cars/import?format=csv&chunkSize=2', data=body, content_type='text/csv')
+
+
+def test_partial_import_bumps_cars(client, db):
+    rows = b''.join(f'Dacia,Sandero,2022,VER-{i},VF1VERSION{i:07d},available,250\n'.encode() for i in range(1, 4))
+
+    response = _import(client, HEADER + rows + b'Dacia,\xff\xfe,2022\n')
+
+    assert response.status_code == 207
+    assert _versions(db).get('cars') == 1
+
+
+def test_request_refused_before_any_write_does_not_bump(client, db, car):
+    failed_import = _import(client, HEADER + b'Dacia,\xff\xfe,2022\n')
+    invalid_update = client.put(f"/api/cars/{car['_id']}", data={'year': 'not-a-year'})
+
+    assert failed_import.status_code == invalid_update.status_code == 400
+    assert _versions(db) == {}
+
+
+def test_not_found_after_ledger_write_bumps_reservations(client, db, car, customer, monkeypatch):
+    created = client.post('/api/reservations', json={'carId': str(car['_id']), 'clientId': str(customer['_id']),
+                                                     'startDate': '2025-07-01', 'endDate': '2025-07-03'})
+    reservation_id = created.get_json()['id']
+    versions_before = _versions(db)
+
+    # Réservation supprimée par une autre requête entre la mise à jour du registre et celle de la réservation
+    def update_deleted_reservation(collection, query, update_fields, **kwargs):
+        collection.delete_one(query)
+        return update_and_fetch(collection, query, update_fields, **kwargs)
+
+    update_and_fetch = reservations_routes.update_and_fetch
+    monkeypatch.setattr(reservations_routes, 'update_and_fetch', update_deleted_reservation)
+    response = client.put(f'/api/reservations/{reservation_id}', json={'startDate': '2025-07-02', 'endDate': '2025-07-05'})
+
+    assert response.status_code == 404
+    assert _versions(db)['reservations'] == versions_before['reservations'] + 1
+    assert db.booking_slots.count_documents({}) == 0
@@ -12,6 +12,9 @@ export interface Car {
   dailyRate: number
   description?: string
   imageUrl?: string
+  // Variantes générées en arrière-plan, par largeur ("w320", "w960", ...)
+  imageVariants?: Record<string, { webp: string; jpeg: string }>
+  imageStatus?: "pending" | "ready" | "failed" | "original_only" | null
   addedAt?: string
   addedBy?: string
   updatedAt?: string
@@ -37,9 +40,69 @@ export interface CarUpdateInput extends Partial<Omit<CarCreateInput, 'imageFile'
   imageUrl?: string | null
 }
 
-// Get all cars
-export async function getCars(): Promise<Car[]> {
-  return apiGet<Car[]>("/cars")
+export interface CarListParams {
+  limit?: number
+  cursor?: string | null
+  status?: Car["status"] | Car["status"][]
+  make?: string
+  minYear?: number
+  maxYear?: number
+  minRate?: number
+  maxRate?: number
+  // Champ de tri ("dailyRate", "-year", ...) ; par défaut, ordre de création
+  sort?: string
+  // "full" pour recevoir tous les champs (description, addedAt, ...) au lieu de la projection réduite
+  fields?: "full"
+}
+
+export interface CarPage {
+  cars: Car[]
+  nextCursor: string | null
+  limit: number
+}
+
+// Get one page of cars (server-side filters, keyset pagination)
+export async function getCars(params: CarListParams = {}): Promise<CarPage> {
+  const query = new URLSearchParams()
+  if (params.limit) query.set("limit", String(params.limit))
+  if (params.cursor) query.set("cursor", params.cursor)
+  if (params.status) query.set("status", Array.isArray(params.status) ? params.status.join(",") : params.status)
+  if (params.make) query.set("make", params.make)
+  if (params.minYear !== undefined) query.set("minYear", String(params.minYear))
+  if (params.maxYear !== undefined) query.set("maxYear", String(params.maxYear))
+  if (params.minRate !== undefined) query.set("minRate", String(params.minRate))
+  if (params.maxRate !== undefined) query.set("maxRate", String(params.maxRate))
+  if (params.sort) query.set("sort", params.sort)
+  if (params.fields) query.set("fields", params.fields)
+  const queryString = query.toString()
+  return apiGet<CarPage>(`/cars${queryString ? `?${queryString}` : ""}`)
+}
+
+// Get every car matching the filters by following the cursors (e.g. for select lists)
+export async function getAllCars(params: Omit<CarListParams, "cursor"> = {}): Promise<Car[]> {
+  const cars: Car[] = []
+  let cursor: string | null = null
+  do {
+    const page: CarPage = await getCars({ limit: 200, ...params, cursor })
+    cars.push(...page.cars)
+    cursor = page.nextCursor
+  } while (cursor)
+  return cars
+}
+
+export interface CarSearchPage {
+  cars: Car[]
+  nextOffset: number | null
+  limit: number
+}
+
+// Search cars by make, model, license plate or VIN ("prefix" for type-ahead, "text" for whole words)
+export async function searchCars(q: string, options: { limit?: number; offset?: number; mode?: "prefix" | "text" } = {}): Promise<CarSearchPage> {
+  const query = new URLSearchParams({ q })
+  if (options.limit) query.set("limit", String(options.limit))
+  if (options.offset) query.set("offset", String(options.offset))
+  if (options.mode) query.set("mode", options.mode)
+  return apiGet<CarSearchPage>(`/cars/search?${query.toString()}`)
 }
 
 // Get a single car by ID
@@ -52,6 +115,20 @@ export async function createCar(formData: FormData): Promise<Car> {
   return apiPost<Car>("/cars", formData)
 }
 
+export interface CarImportReport {
+  created: number
+  failed: number
+  errors: { row: number; code: number; message: string }[]
+  dryRun: boolean
+}
+
+// Bulk import cars from a .csv or .ndjson file (rows are validated and inserted server-side in chunks)
+export async function importCars(file: File, options: { dryRun?: boolean } = {}): Promise<CarImportReport> {
+  const formData = new FormData()
+  formData.append("file", file)
+  return apiPost<CarImportReport>(`/cars/import${options.dryRun ? "?dryRun=true" : ""}`, formData)
+}
+
 // Update an existing car - Modifié pour utiliser FormData
 export async function updateCar(id: string, formData: FormData): Promise<Car> {
   return apiPut<Car>(`/cars/${id}`, formData)
@@ -13,6 +13,36 @@ export interface Client {
   registeredBy?: string
   updatedAt?: string
   updatedBy?: string
+  stats?: ClientStats
+}
+
+// Lifetime counters, maintained by the server on every reservation write
+export interface ClientStats {
+  reservationCount: number
+  totalSpent: number
+  outstandingBalance: number
+  lastRentalAt: string | null
+}
+
+export interface ClientHistoryReservation {
+  id: string
+  reservationNumber: string
+  carId: string
+  carDetails: { make: string; model: string; licensePlate: string } | null
+  startDate: string
+  endDate: string
+  status: string
+  estimatedTotalCost: number
+  finalTotalCost?: number | null
+  paymentDetails?: { amountPaid: number; remainingBalance: number; transactionDate?: string | null }
+  reservationDate: string
+}
+
+export interface ClientHistoryPage {
+  stats: ClientStats
+  reservations: ClientHistoryReservation[]
+  nextCursor: string | null
+  limit: number
 }
 
 export interface ClientCreateInput {
@@ -34,6 +64,23 @@ export async function getClients(): Promise<Client[]> {
   return apiGet<Client[]>("/clients")
 }
 
+export type ClientSearchResult = Pick<Client, "id" | "firstName" | "lastName" | "phone" | "CIN" | "email">
+
+// Search clients by name, phone, CIN or email prefix (top matches only, for pickers)
+export async function searchClients(q: string, limit = 10): Promise<ClientSearchResult[]> {
+  const query = new URLSearchParams({ q, limit: String(limit) })
+  const page = await apiGet<{ clients: ClientSearchResult[]; limit: number }>(`/clients/search?${query.toString()}`)
+  return page.clients
+}
+
+// Get a client's reservation history (newest first, keyset-paginated) and lifetime stats
+export async function getClientHistory(id: string, options: { limit?: number; cursor?: string | null } = {}): Promise<ClientHistoryPage> {
+  const query = new URLSearchParams()
+  if (options.limit) query.set("limit", String(options.limit))
+  if (options.cursor) query.set("cursor", options.cursor)
+  return apiGet<ClientHistoryPage>(`/clients/${id}/history?${query.toString()}`)
+}
+
 // Get a single client by ID
 export async function getClient(id: string): Promise<Client> {
   return apiGet<Client>(`/clients/${id}`)
@@ -81,4 +81,54 @@ export async function getFullManagerDashboardData(): Promise<FullManagerDashboar
     recentClients,
     recentReservations,
   };
-}
\ No newline at end of file
+}
+// --- Fleet Analytics ---
+
+export type AnalyticsPeriod = "day" | "week" | "month";
+
+export interface FleetPeriodStats {
+  period: string; // e.g. "2026-01", "2026-W05", "2026-01-29"
+  availableDays: number;
+  rentedDays: number;
+  revenue: number;
+  utilization: number; // 0..1
+}
+
+export interface CarUtilization {
+  id: string;
+  make: string;
+  model: string;
+  licensePlate: string;
+  status: string;
+  rentedDays: number;
+  availableDays: number;
+  utilization: number; // 0..1
+  revenue: number;
+  completedReservations: number;
+  periods: Record<string, { rentedDays: number; revenue: number; completedReservations: number; utilization: number }>;
+}
+
+export interface FleetAnalytics {
+  start: string;
+  end: string;
+  period: AnalyticsPeriod;
+  totals: { cars: number; availableDays: number; rentedDays: number; utilization: number; revenue: number };
+  periods: FleetPeriodStats[];
+  cars: CarUtilization[];
+  generatedAt: string;
+}
+
+/**
+ * Fetches per-car utilization and revenue over a window (dates as YYYY-MM-DD, end inclusive).
+ * Results are cached server-side per window; pass refresh to recompute.
+ */
+export async function getFleetAnalytics(
+  params: { start?: string; end?: string; period?: AnalyticsPeriod; refresh?: boolean } = {}
+): Promise<FleetAnalytics> {
+  const query = new URLSearchParams();
+  if (params.start) query.set("start", params.start);
+  if (params.end) query.set("end", params.end);
+  if (params.period) query.set("period", params.period);
+  if (params.refresh) query.set("refresh", "true");
+  return apiGet<FleetAnalytics>(`/manager/analytics/fleet?${query.toString()}`);
+}
@@ -84,9 +84,58 @@ export interface ReservationStatusUpdateInput {
   finalTotalCost?: number;
 }
 
+export interface ReservationListParams {
+  limit?: number;
+  cursor?: string | null;
+  status?: ReservationStatus | ReservationStatus[];
+  carId?: string;
+  clientId?: string;
+  startDate?: string;
+  endDate?: string;
+}
+
+export interface ReservationPage {
+  reservations: Reservation[];
+  nextCursor: string | null;
+  limit: number;
+}
+
+export interface QuoteItem {
+  carId: string;
+  startDate: string;
+  endDate: string;
+}
+
+// Soit une liste de (voiture, début, fin), soit une période unique pour plusieurs voitures (ou toute la flotte)
+export type QuoteRequest =
+  | { items: QuoteItem[] }
+  | { startDate: string; endDate: string; carIds?: string[] };
+
+export interface Quote extends QuoteItem {
+  dailyRate: number;
+  days: number;
+  weekendDays: number;
+  estimatedTotalCost: number;
+}
+
+export interface QuoteResponse {
+  quotes: Quote[];
+  errors: { index: number; carId: string; message: string }[];
+  weekendMultiplier: number;
+}
+
 // --- FONCTIONS API ---
-export async function getReservations(): Promise<Reservation[]> {
-  return apiGet<Reservation[]>("/reservations");
+export async function getReservations(params: ReservationListParams = {}): Promise<ReservationPage> {
+  const query = new URLSearchParams();
+  if (params.limit) query.set("limit", String(params.limit));
+  if (params.cursor) query.set("cursor", params.cursor);
+  if (params.status) query.set("status", Array.isArray(params.status) ? params.status.join(",") : params.status);
+  if (params.carId) query.set("carId", params.carId);
+  if (params.clientId) query.set("clientId", params.clientId);
+  if (params.startDate) query.set("startDate", params.startDate);
+  if (params.endDate) query.set("endDate", params.endDate);
+  const queryString = query.toString();
+  return apiGet<ReservationPage>(`/reservations${queryString ? `?${queryString}` : ""}`);
 }
 
 export async function getReservation(id: string): Promise<Reservation> {
@@ -108,3 +157,7 @@ export async function deleteReservation(id: string): Promise<void> {
 export async function updateReservationStatus(id: string, statusUpdateData: ReservationStatusUpdateInput): Promise<Reservation> {
   return apiPut<Reservation>(`/reservations/${id}/status`, statusUpdateData);
 }
+
+export async function getQuotes(quoteRequest: QuoteRequest): Promise<QuoteResponse> {
+  return apiPost<QuoteResponse>("/reservations/quote", quoteRequest);
+}
@@ -20,14 +20,18 @@ import { API_URL } from "@/lib/api-client";
 import {
   type Car,
   deleteCar,
+  getCar,
   getCars,
+  searchCars,
 } from "@/lib/api/car-service";
-import { Filter, Plus, X } from "lucide-react"; // Added Filter and X icons
+import { Filter, Plus, Search, X } from "lucide-react"; // Added Filter and X icons
 import { useEffect, useMemo, useState } from "react"; // Added useMemo
 import { toast } from "sonner";
 import { CarDetails } from "./CarDetails";
 import { CarForm } from "./CarForm";
 
+const CARS_PAGE_SIZE = 50;
+
 export default function CarsPage() {
   const [cars, setCars] = useState<Car[]>([]);
   const [isLoading, setIsLoading] = useState(true);
@@ -50,12 +54,26 @@ export default function CarsPage() {
   const carStatuses: Array<Car["status"] | "all"> = ["all", "available", "rented", "maintenance"];
 
 
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+
+  // Recherche serveur (marque, modèle, plaque, VIN) : remplace le listing tant qu'une requête est saisie
+  const [searchQuery, setSearchQuery] = useState("");
+  const [searchResults, setSearchResults] = useState<Car[] | null>(null);
+
+  // Le filtre de statut est appliqué côté serveur (listing paginé par curseur) ; les autres restent locaux
+  const buildListParams = () => ({
+    limit: CARS_PAGE_SIZE,
+    status: statusFilter !== "all" ? statusFilter : undefined,
+  });
+
   const fetchCars = async () => {
     setIsLoading(true);
     setError(null);
     try {
-      const data = await getCars();
-      setCars(data);
+      const page = await getCars(buildListParams());
+      setCars(page.cars);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       console.error("Error fetching cars:", err);
       const errorMessage = err instanceof Error ? err.message : "Failed to load cars.";
@@ -66,12 +84,49 @@ export default function CarsPage() {
     }
   };
 
+  const fetchMoreCars = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const page = await getCars({ ...buildListParams(), cursor: nextCursor });
+      setCars((prev) => [...prev, ...page.cars]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error("Error fetching more cars:", err);
+      toast.error(err instanceof Error ? err.message : "Failed to load more cars.");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchCars();
-  }, []);
+  }, [statusFilter]);
+
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const page = await searchCars(query, { limit: 50 });
+        if (!cancelled) setSearchResults(page.cars);
+      } catch (err) {
+        console.error("Error searching cars:", err);
+        if (!cancelled) toast.error(err instanceof Error ? err.message : "Failed to search cars.");
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery]);
 
   const filteredCars = useMemo(() => {
-    return cars.filter((car) => {
+    return (searchResults ?? cars).filter((car) => {
       const statusMatch = statusFilter === "all" || car.status === statusFilter;
       return (
         car.make.toLowerCase().includes(makeFilter.toLowerCase()) &&
@@ -82,7 +137,7 @@ export default function CarsPage() {
         (car.color || "").toLowerCase().includes(colorFilter.toLowerCase())
       );
     });
-  }, [cars, makeFilter, modelFilter, licensePlateFilter, vinFilter, statusFilter, colorFilter]);
+  }, [cars, searchResults, makeFilter, modelFilter, licensePlateFilter, vinFilter, statusFilter, colorFilter]);
 
   const handleClearFilters = () => {
     setMakeFilter("");
@@ -124,12 +179,18 @@ export default function CarsPage() {
       header: "Image",
       accessorKey: "imageUrl" as keyof Car,
       cell: (car: Car) => {
+        // Miniature WebP (repli JPEG) dès que les variantes sont prêtes, image d'origine sinon
+        const thumbnail = car.imageVariants?.w320;
         return car.imageUrl ? (
-          <img
-            src={`${API_URL}${car.imageUrl}`}
-            alt={`${car.make} ${car.model}`}
-            className="h-10 w-16 object-cover rounded"
-          />
+          <picture>
+            {thumbnail && <source srcSet={`${API_URL}${thumbnail.webp}`} type="image/webp" />}
+            <img
+              src={`${API_URL}${thumbnail ? thumbnail.jpeg : car.imageUrl}`}
+              alt={`${car.make} ${car.model}`}
+              loading="lazy"
+              className="h-10 w-16 object-cover rounded"
+            />
+          </picture>
         ) : (
           <div className="h-10 w-16 bg-gray-200 rounded flex items-center justify-center text-xs text-gray-500">No Image</div>
         );
@@ -211,14 +272,29 @@ export default function CarsPage() {
     setIsFormOpen(true);
   };
 
-  const handleEditCar = (car: Car) => {
+  // Le listing ne renvoie que les colonnes du tableau : le document complet est chargé à l'ouverture
+  const loadFullCar = async (car: Car): Promise<Car | null> => {
+    try {
+      return await getCar(car.id);
+    } catch (err) {
+      console.error("Error fetching car details:", err);
+      toast.error(err instanceof Error ? err.message : "Failed to load car details.");
+      return null;
+    }
+  };
+
+  const handleEditCar = async (car: Car) => {
+    const fullCar = await loadFullCar(car);
+    if (!fullCar) return;
     setFormMode("edit");
-    setCurrentCar(car);
+    setCurrentCar(fullCar);
     setIsFormOpen(true);
   };
 
-  const handleViewCar = (car: Car) => {
-    setCurrentCar(car);
+  const handleViewCar = async (car: Car) => {
+    const fullCar = await loadFullCar(car);
+    if (!fullCar) return;
+    setCurrentCar(fullCar);
     setIsDetailsOpen(true);
   };
 
@@ -268,6 +344,15 @@ export default function CarsPage() {
       <div className="flex items-center justify-between">
         <h1 className="text-3xl font-bold tracking-tight">Cars</h1>
         <div className="flex items-center gap-2">
+          <div className="relative">
+            <Search className="absolute left-2 top-1/2 h-4 w-4 -translate-y-1/2 text-muted-foreground" />
+            <Input
+              value={searchQuery}
+              onChange={(e) => setSearchQuery(e.target.value)}
+              placeholder="Search make, model, plate, VIN..."
+              className="h-9 w-64 pl-8"
+            />
+          </div>
           <Popover open={isFiltersPopoverOpen} onOpenChange={setIsFiltersPopoverOpen}>
             <PopoverTrigger asChild>
               <Button variant="outline" size="sm" className="relative">
@@ -382,6 +467,14 @@ export default function CarsPage() {
         onView={handleViewCar}
       />
 
+      {nextCursor && searchResults === null && (
+        <div className="flex justify-center">
+          <Button variant="outline" onClick={fetchMoreCars} disabled={isLoadingMore}>
+            {isLoadingMore ? "Loading..." : "Load more"}
+          </Button>
+        </div>
+      )}
+
       <CarForm
         open={isFormOpen}
         onOpenChange={setIsFormOpen}
@@ -7,9 +7,13 @@ import {
     DialogHeader,
     DialogTitle,
 } from "@/components/ui/dialog";
-import { type Client } from "@/lib/api/client-service";
+import { type Client, type ClientHistoryReservation, type ClientStats, getClientHistory } from "@/lib/api/client-service";
 import { format } from "date-fns";
-import { Calendar, CreditCard, FileText, Mail, Phone, User } from "lucide-react";
+import { Calendar, CreditCard, FileText, History, Mail, Phone, User } from "lucide-react";
+import { useEffect, useState } from "react";
+import { toast } from "sonner";
+
+const HISTORY_PAGE_SIZE = 10;
 
 interface ClientDetailsProps {
   open: boolean;
@@ -18,8 +22,39 @@ interface ClientDetailsProps {
 }
 
 export function ClientDetails({ open, onOpenChange, client }: ClientDetailsProps) {
+  const [stats, setStats] = useState<ClientStats | null>(null);
+  const [history, setHistory] = useState<ClientHistoryReservation[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingHistory, setIsLoadingHistory] = useState(false);
+
+  const loadHistory = async (clientId: string, cursor: string | null) => {
+    setIsLoadingHistory(true);
+    try {
+      const page = await getClientHistory(clientId, { limit: HISTORY_PAGE_SIZE, cursor });
+      setStats(page.stats);
+      setHistory((previous) => (cursor ? [...previous, ...page.reservations] : page.reservations));
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error("Error loading client history:", error);
+      toast.error("Failed to load reservation history.");
+    } finally {
+      setIsLoadingHistory(false);
+    }
+  };
+
+  useEffect(() => {
+    setStats(null);
+    setHistory([]);
+    setNextCursor(null);
+    if (open && client) {
+      loadHistory(client.id, null);
+    }
+  }, [open, client?.id]);
+
   if (!client) return null;
 
+  const formatAmount = (value?: number | null) => `${(value ?? 0).toFixed(2)} MAD`;
+
   const formatDate = (dateString?: string) => {
     if (!dateString) return "N/A";
     try {
@@ -118,6 +153,37 @@ export function ClientDetails({ open, onOpenChange, client }: ClientDetailsProps
             )}
           </div>
 
+          {/* Historique et valeur du client */}
+          <div className="space-y-2">
+            <h4 className="text-sm font-semibold text-muted-foreground uppercase tracking-wide">
+              Reservation History
+            </h4>
+            {stats && (
+              <div className="grid grid-cols-2 gap-2 text-sm sm:grid-cols-4">
+                <div><div className="text-muted-foreground">Reservations</div><div className="font-medium">{stats.reservationCount}</div></div>
+                <div><div className="text-muted-foreground">Total Spent</div><div className="font-medium">{formatAmount(stats.totalSpent)}</div></div>
+                <div><div className="text-muted-foreground">Outstanding</div><div className="font-medium">{formatAmount(stats.outstandingBalance)}</div></div>
+                <div><div className="text-muted-foreground">Last Rental</div><div className="font-medium">{stats.lastRentalAt ? format(new Date(stats.lastRentalAt), "PP") : "Never"}</div></div>
+              </div>
+            )}
+            {history.map((reservation) => (
+              <DetailRow
+                key={reservation.id}
+                icon={History}
+                label={`${reservation.reservationNumber} · ${reservation.status}`}
+                value={`${reservation.carDetails ? `${reservation.carDetails.make} ${reservation.carDetails.model} (${reservation.carDetails.licensePlate})` : "Unknown car"} · ${format(new Date(reservation.startDate), "PP")} – ${format(new Date(reservation.endDate), "PP")} · ${formatAmount(reservation.finalTotalCost ?? reservation.estimatedTotalCost)}`}
+              />
+            ))}
+            {!isLoadingHistory && history.length === 0 && (
+              <div className="text-sm text-muted-foreground">No reservations yet.</div>
+            )}
+            {nextCursor && (
+              <Button type="button" variant="outline" size="sm" disabled={isLoadingHistory} onClick={() => loadHistory(client.id, nextCursor)}>
+                {isLoadingHistory ? "Loading..." : "Load more"}
+              </Button>
+            )}
+          </div>
+
           {/* Notes */}
           {client.notes && (
             <div className="space-y-2">
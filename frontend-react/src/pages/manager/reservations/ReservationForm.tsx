@@ -18,13 +18,14 @@ import {
   SelectValue,
 } from "@/components/ui/select";
 import { Textarea } from "@/components/ui/textarea";
-import { type Car, getCars } from "@/lib/api/car-service";
-import { type Client, getClients } from "@/lib/api/client-service";
+import { type Car, getAllCars, getCar } from "@/lib/api/car-service";
+import { type ClientSearchResult, getClient, searchClients } from "@/lib/api/client-service";
 import {
   type Reservation,
   type ReservationCreateInput,
   type ReservationUpdateInput,
   createReservation,
+  getQuotes,
   getReservations,
   updateReservation,
 } from "@/lib/api/reservation-service";
@@ -73,7 +74,10 @@ export function ReservationForm({
 
   const [formData, setFormData] = useState<ReservationFormData>(initialFormData);
   const [cars, setCars] = useState<Car[]>([]);
-  const [clients, setClients] = useState<Client[]>([]);
+  // Sélecteur de clients : résultats de la recherche serveur, plus le client déjà sélectionné
+  const [clientQuery, setClientQuery] = useState("");
+  const [clientResults, setClientResults] = useState<ClientSearchResult[]>([]);
+  const [selectedClient, setSelectedClient] = useState<ClientSearchResult | null>(null);
   const [isLoading, setIsLoading] = useState(false);
   const [isLoadingData, setIsLoadingData] = useState(false);
 
@@ -86,13 +90,17 @@ export function ReservationForm({
     if (open) {
       setIsLoadingData(true);
       try {
-        const [carsData, clientsData] = await Promise.all([
-          getCars(),
-          getClients(),
+        const [carsData, clientData] = await Promise.all([
+          getAllCars({ status: ["available", "rented"] }),
+          mode === 'edit' && reservation?.clientId ? getClient(reservation.clientId) : Promise.resolve(null),
         ]);
 
-        setCars(carsData.filter(c => c.status === 'available' || (mode === 'edit' && c.id === reservation?.carId) || c.status === 'rented'));
-        setClients(clientsData);
+        // En modification, la voiture de la réservation reste sélectionnable quel que soit son statut
+        if (mode === 'edit' && reservation?.carId && !carsData.some(c => c.id === reservation.carId)) {
+          carsData.push(await getCar(reservation.carId));
+        }
+        setCars(carsData);
+        setSelectedClient(clientData);
 
       } catch (error) {
         console.error("Error loading base data:", error);
@@ -103,11 +111,24 @@ export function ReservationForm({
     }
   };
 
-  const fetchReservationAvailabilities = async () => {
+  // Ne charge que les réservations confirmées/actives de la voiture sélectionnée, encore en cours ou à venir
+  const fetchReservationAvailabilities = async (carId: string) => {
     if (open && (mode === 'add' || mode === 'edit')) {
       setIsLoadingCarAvailability(true);
       try {
-        const reservationsData = await getReservations();
+        const reservationsData: Reservation[] = [];
+        let cursor: string | null = null;
+        do {
+          const page = await getReservations({
+            carId,
+            status: ["confirmed", "active"],
+            startDate: format(startOfToday(), "yyyy-MM-dd"),
+            limit: 200,
+            cursor,
+          });
+          reservationsData.push(...page.reservations);
+          cursor = page.nextCursor;
+        } while (cursor);
         setAllReservations(reservationsData);
       } catch (error) {
         console.error("Error loading reservation availabilities:", error);
@@ -120,9 +141,44 @@ export function ReservationForm({
 
   useEffect(() => {
     fetchBaseData();
-    fetchReservationAvailabilities();
   }, [open, mode, reservation?.carId]);
 
+  useEffect(() => {
+    const query = clientQuery.trim();
+    if (!open || !query) {
+      setClientResults([]);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const results = await searchClients(query, 20);
+        if (!cancelled) setClientResults(results);
+      } catch (error) {
+        console.error("Error searching clients:", error);
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [open, clientQuery]);
+
+  const clientOptions = useMemo(() => {
+    if (!selectedClient || clientResults.some((c) => c.id === selectedClient.id)) {
+      return clientResults;
+    }
+    return [selectedClient, ...clientResults];
+  }, [clientResults, selectedClient]);
+
+  useEffect(() => {
+    if (formData.carId) {
+      fetchReservationAvailabilities(formData.carId);
+    } else {
+      setAllReservations([]);
+    }
+  }, [open, mode, formData.carId]);
+
   useEffect(() => {
     if (mode === "edit" && reservation) {
       setFormData({
@@ -149,7 +205,7 @@ export function ReservationForm({
   }, [mode, reservation, open]);
 
   useEffect(() => {
-    if (formData.carId && allReservations.length > 0) {
+    if (formData.carId) {
       const carReservations = allReservations.filter(
         (res) => res.carId === formData.carId && 
                  res.id !== reservation?.id &&
@@ -184,19 +240,25 @@ export function ReservationForm({
     if (formData.carId && formData.startDate && formData.endDate) {
       const selectedCar = cars.find(c => c.id === formData.carId);
       if (selectedCar && selectedCar.dailyRate) {
-        try {
-          const start = parseISO(formData.startDate);
-          const end = parseISO(formData.endDate);
-          if (isValid(start) && isValid(end) && end >= start) {
-            const days = differenceInDays(end, start) + 1;
-            const cost = days * selectedCar.dailyRate;
-            setFormData(prev => ({ ...prev, estimatedTotalCost: cost.toFixed(2) }));
-          } else {
-            setFormData(prev => ({ ...prev, estimatedTotalCost: "0.00" }));
-          }
-        } catch {
+        const start = parseISO(formData.startDate);
+        const end = parseISO(formData.endDate);
+        if (!isValid(start) || !isValid(end) || end < start) {
           setFormData(prev => ({ ...prev, estimatedTotalCost: "0.00" }));
+          return;
         }
+        // Le devis est calculé par le serveur (tarifs week-end compris) ; calcul local en secours
+        let cancelled = false;
+        getQuotes({ items: [{ carId: formData.carId, startDate: formData.startDate, endDate: formData.endDate }] })
+          .then(({ quotes }) => quotes[0]?.estimatedTotalCost ?? (differenceInDays(end, start) + 1) * selectedCar.dailyRate)
+          .catch(() => (differenceInDays(end, start) + 1) * selectedCar.dailyRate)
+          .then(cost => {
+            if (!cancelled) {
+              setFormData(prev => ({ ...prev, estimatedTotalCost: cost.toFixed(2) }));
+            }
+          });
+        return () => {
+          cancelled = true;
+        };
       }
     } else {
       setFormData(prev => ({ ...prev, estimatedTotalCost: "0.00" }));
@@ -368,16 +430,25 @@ export function ReservationForm({
             <Label htmlFor="clientId">
               Client <span className="text-red-500">*</span>
             </Label>
+            <Input
+              value={clientQuery}
+              onChange={(e) => setClientQuery(e.target.value)}
+              placeholder="Search by name, phone, CIN or email..."
+              disabled={isLoadingData}
+            />
             <Select
               value={formData.clientId}
-              onValueChange={(value) => handleSelectChange("clientId", value)}
+              onValueChange={(value) => {
+                handleSelectChange("clientId", value);
+                setSelectedClient(clientOptions.find((c) => c.id === value) ?? null);
+              }}
               disabled={isLoadingData}
             >
               <SelectTrigger>
                 <SelectValue placeholder={isLoadingData ? "Loading clients..." : "Select a client"} />
               </SelectTrigger>
               <SelectContent>
-                {clients.map((client) => (
+                {clientOptions.map((client) => (
                   <SelectItem key={client.id} value={client.id}>
                     {client.firstName} {client.lastName} ({client.CIN})
                   </SelectItem>
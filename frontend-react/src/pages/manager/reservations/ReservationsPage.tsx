@@ -30,7 +30,7 @@ import {
   deleteReservation,
   getReservations,
 } from "@/lib/api/reservation-service";
-import { format, isValid, parseISO } from "date-fns"; // Added isValid, parseISO
+import { format, parseISO } from "date-fns";
 import { Edit, Edit3, Eye, Filter, MoreHorizontal, Plus, Trash2, X } from "lucide-react"; // Added Filter, X
 import { useEffect, useMemo, useState } from "react"; // Added useMemo
 import { toast } from "sonner";
@@ -57,6 +57,8 @@ export const formatStatus = (status: ReservationStatus): string => {
   return status.replace(/_/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
 };
 
+const RESERVATIONS_PAGE_SIZE = 50;
+
 const reservationStatusesList: Array<ReservationStatus | "all"> = [
   "all", "pending_confirmation", "confirmed", "active", "completed", "cancelled_by_client", "cancelled_by_agency", "no_show"
 ];
@@ -81,12 +83,24 @@ export default function ReservationsPage() {
   const [statusFilter, setStatusFilter] = useState<ReservationStatus | "all">("all");
   const [isFiltersPopoverOpen, setIsFiltersPopoverOpen] = useState(false);
 
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
+
+  // Les filtres statut/dates sont appliqués côté serveur (listing paginé par curseur)
+  const buildListParams = () => ({
+    limit: RESERVATIONS_PAGE_SIZE,
+    status: statusFilter !== "all" ? statusFilter : undefined,
+    startDate: startDateFilter || undefined,
+    endDate: endDateFilter || undefined,
+  });
+
   const fetchReservations = async () => {
     setIsLoading(true);
     setError(null);
     try {
-      const data = await getReservations();
-      setReservations(data);
+      const page = await getReservations(buildListParams());
+      setReservations(page.reservations);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       console.error("Error fetching reservations:", err);
       const errorMessage = err instanceof Error ? err.message : "Failed to fetch reservations.";
@@ -97,9 +111,24 @@ export default function ReservationsPage() {
     }
   };
 
+  const fetchMoreReservations = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const page = await getReservations({ ...buildListParams(), cursor: nextCursor });
+      setReservations((prev) => [...prev, ...page.reservations]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error("Error fetching more reservations:", err);
+      toast.error(err instanceof Error ? err.message : "Failed to fetch more reservations.");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchReservations();
-  }, []);
+  }, [statusFilter, startDateFilter, endDateFilter]);
 
   const formatDate = (dateString?: string) => {
     if (!dateString) return "N/A";
@@ -112,8 +141,6 @@ export default function ReservationsPage() {
 
   const filteredReservations = useMemo(() => {
     return reservations.filter((reservation) => {
-      const statusMatch = statusFilter === "all" || reservation.status === statusFilter;
-
       const carDetails = reservation.carDetails;
       const carMatch = carFilter === "" || (carDetails &&
         ( (carDetails.make?.toLowerCase() || "").includes(carFilter.toLowerCase()) ||
@@ -129,44 +156,13 @@ export default function ReservationsPage() {
         )
       );
       
-      let startDateMatch = true;
-      if (startDateFilter) {
-        try {
-          const filterDate = parseISO(startDateFilter);
-          const reservationStartDate = parseISO(reservation.startDate);
-          if (isValid(filterDate) && isValid(reservationStartDate)) {
-            // Filter for reservations starting on or after the filter date
-            startDateMatch = reservationStartDate >= filterDate;
-          } else {
-            startDateMatch = true; // Or false if strict, depends on desired behavior for invalid input
-          }
-        } catch { startDateMatch = true; } // Ignore invalid date filter
-      }
-
-      let endDateMatch = true;
-      if (endDateFilter) {
-        try {
-          const filterDate = parseISO(endDateFilter);
-          const reservationEndDate = parseISO(reservation.endDate);
-          if (isValid(filterDate) && isValid(reservationEndDate)) {
-            // Filter for reservations ending on or before the filter date
-            endDateMatch = reservationEndDate <= filterDate;
-          } else {
-            endDateMatch = true;
-          }
-        } catch { endDateMatch = true; } // Ignore invalid date filter
-      }
-
       return (
         (reservation.reservationNumber?.toLowerCase() || "").includes(reservationNumberFilter.toLowerCase()) &&
         carMatch &&
-        clientMatch &&
-        statusMatch &&
-        startDateMatch &&
-        endDateMatch
+        clientMatch
       );
     });
-  }, [reservations, reservationNumberFilter, carFilter, clientFilter, statusFilter, startDateFilter, endDateFilter]);
+  }, [reservations, reservationNumberFilter, carFilter, clientFilter]);
 
   const handleClearFilters = () => {
     setReservationNumberFilter("");
@@ -242,8 +238,9 @@ export default function ReservationsPage() {
   };
 
   const handleStatusUpdateSuccess = (updatedReservation: Reservation) => {
+    // L'API renvoie le document mis à jour sans les détails joints : on conserve ceux déjà chargés
     setReservations((prev) =>
-      prev.map((r) => (r.id === updatedReservation.id ? updatedReservation : r))
+      prev.map((r) => (r.id === updatedReservation.id ? { ...r, ...updatedReservation } : r))
     );
     setIsStatusUpdateOpen(false);
   };
@@ -447,6 +444,14 @@ export default function ReservationsPage() {
         // No searchKey needed here as we are handling filtering outside
       />
 
+      {nextCursor && (
+        <div className="flex justify-center">
+          <Button variant="outline" onClick={fetchMoreReservations} disabled={isLoadingMore}>
+            {isLoadingMore ? "Loading..." : "Load more"}
+          </Button>
+        </div>
+      )}
+
       <ReservationForm
         open={isFormOpen}
         onOpenChange={setIsFormOpen}